@@ -0,0 +1,384 @@
+import heapq
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+
+import synthetic_data as sd
+
+# 被测的转换在仓库根目录的 ros2_convert 包中
+sys.path.insert(0, sd.REPO_DIR)
+
+from ros2_convert import (
+    bag2txt,
+    csv2bag,
+    csv2pcd,
+    db3_extract,
+    db3_to_csv,
+    image_db3_to_png,
+    imu2csv,
+    pcd2csv_v2,
+)
+
+# 结果保存路径
+results_file = "benchmark_results.json"
+# 基线文件：存在时与本次结果比较，save_baseline 为 True 时把本次结果保存为基线
+baseline_file = "benchmark_baseline.json"
+save_baseline = False
+# 吞吐量（条/秒）比基线低超过该比例，或峰值内存高超过该比例时标记为回退
+regression_tolerance = 0.10
+
+# 数据规模倍数，1.0 为默认规模，调试时可以设为 0.1
+scale = 1.0
+# 每项测试重复次数，取最快的一次
+repeat = 1
+# 只运行指定的测试，None 表示全部
+selected_benchmarks = None
+# 合成数据和输出的临时目录，None 表示使用系统临时目录，运行结束后删除
+work_dir = None
+
+
+def _scaled(count):
+    return max(1, int(count * scale))
+
+
+def _file_size(path):
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(root, file))
+            for root, _, files in os.walk(path)
+            for file in files
+        )
+    return os.path.getsize(path)
+
+
+# ---------------- 合成数据 ----------------
+# 每个 prepare 函数在 data_dir 中生成输入，返回 (输入参数, 条数, 单位)
+
+
+def prepare_pointcloud_db3(data_dir):
+    count = _scaled(200)
+    db3_file = sd.write_db3(
+        os.path.join(data_dir, "pointcloud"),
+        {"/lidar/points": "sensor_msgs/msg/PointCloud2"},
+        sd.pointcloud_messages("/lidar/points", count, num_points=30_000),
+    )
+    return {"db3_file": db3_file}, count, "messages"
+
+
+def prepare_image_db3(data_dir):
+    count = _scaled(100)
+    messages = heapq.merge(
+        sd.image_messages("/camera/image_raw", count, 480, 640),
+        sd.image_messages("/camera/compressed", count, 480, 640, compressed=True),
+        key=lambda message: message[1],
+    )
+    db3_file = sd.write_db3(
+        os.path.join(data_dir, "image"),
+        {
+            "/camera/image_raw": "sensor_msgs/msg/Image",
+            "/camera/compressed": "sensor_msgs/msg/CompressedImage",
+        },
+        messages,
+    )
+    return {"db3_file": db3_file}, 2 * count, "messages"
+
+
+# 雷达 + 相机 + IMU 的混合 bag
+MIXED_TOPICS = {
+    "/radar/points": "sensor_msgs/msg/PointCloud2",
+    "/camera/compressed": "sensor_msgs/msg/CompressedImage",
+    "/imu/data": "sensor_msgs/msg/Imu",
+}
+
+
+def _mixed_messages(seconds):
+    return heapq.merge(
+        sd.pointcloud_messages("/radar/points", seconds * 10, num_points=5_000),
+        sd.image_messages("/camera/compressed", seconds * 10, 480, 640, compressed=True, rate_hz=10),
+        sd.imu_messages("/imu/data", seconds * 1000),
+        key=lambda message: message[1],
+    )
+
+
+def prepare_mixed_db3(data_dir):
+    seconds = max(1, int(10 * scale))
+    db3_file = sd.write_db3(
+        os.path.join(data_dir, "mixed"), MIXED_TOPICS, _mixed_messages(seconds)
+    )
+    return {"db3_file": db3_file}, seconds * 1020, "messages"
+
+
+def prepare_mixed_mcap(data_dir):
+    seconds = max(1, int(10 * scale))
+    mcap_file = sd.write_mcap(
+        os.path.join(data_dir, "mixed.mcap"), MIXED_TOPICS, _mixed_messages(seconds)
+    )
+    return {"db3_file": mcap_file}, seconds * 1020, "messages"
+
+
+def prepare_imu_bag(data_dir):
+    # 1 kHz IMU，默认 60 秒
+    count = _scaled(60_000)
+    start_ns = 1_700_000_000_000_000_000
+    bag_file = sd.write_ros1_bag(
+        os.path.join(data_dir, "imu.bag"),
+        {"/imu/data_raw": "sensor_msgs/Imu"},
+        (
+            ("/imu/data_raw", start_ns + i * 1_000_000, sd.imu_ros1(i, start_ns + i * 1_000_000))
+            for i in range(count)
+        ),
+    )
+    return {"bag_file": bag_file}, count, "messages"
+
+
+def prepare_pointcloud_bag(data_dir):
+    count = _scaled(100)
+    start_ns = 1_700_000_000_000_000_000
+    points = sd.random_points(20_000)
+    bag_file = sd.write_ros1_bag(
+        os.path.join(data_dir, "points.bag"),
+        {"/point_cloud_raw": "sensor_msgs/PointCloud2"},
+        (
+            ("/point_cloud_raw", start_ns + i * 100_000_000,
+             sd.pointcloud2_ros1(i, start_ns + i * 100_000_000, points))
+            for i in range(count)
+        ),
+        messages_per_chunk=10,
+    )
+    return {"bag_file": bag_file}, count, "messages"
+
+
+def prepare_points_csv(data_dir):
+    count = _scaled(500_000)
+    csv_file = sd.write_points_csv(os.path.join(data_dir, "radar_points.csv"), count)
+    return {"csv_file": csv_file}, count, "rows"
+
+
+def prepare_pcd_folder(data_dir):
+    count = _scaled(500)
+    folder = sd.write_pcd_folder(os.path.join(data_dir, "pcd"), count, num_points=5_000)
+    return {"folder": folder}, count, "files"
+
+
+def prepare_imu_csv(data_dir):
+    count = _scaled(200_000)
+    csv_file = sd.write_imu_csv(os.path.join(data_dir, "imu.csv"), count)
+    return {"csv_file": csv_file}, count, "rows"
+
+
+# ---------------- 被测转换 ----------------
+# 每个 run 函数在子进程中执行：用显式传入的设置把输入转换到 out_dir
+
+
+def run_db3_to_csv(inputs, out_dir):
+    options = db3_to_csv.Options(use_cache=False, checkpoint_interval=None)
+    db3_to_csv.process_db3_file(inputs["db3_file"], out_dir, options)
+
+
+def run_image_db3_to_png(inputs, out_dir):
+    options = image_db3_to_png.Options(use_cache=False, checkpoint_interval=None)
+    image_db3_to_png.process_db3_file(inputs["db3_file"], out_dir, options)
+
+
+def run_db3_extract(inputs, out_dir):
+    db3_extract.process_db3_file(inputs["db3_file"], out_dir, db3_extract.Options())
+
+
+def run_imu2csv(inputs, out_dir):
+    # imu2csv 把结果写到当前目录
+    os.chdir(out_dir)
+    imu2csv.process_bag_file(inputs["bag_file"], ["/imu/data_raw"])
+
+
+def run_bag2txt(inputs, out_dir, data_mode="hex"):
+    os.chdir(out_dir)
+    bag2txt.process_bag_file(inputs["bag_file"], ["/point_cloud_raw"], data_mode)
+
+
+def run_bag2txt_fields(inputs, out_dir):
+    run_bag2txt(inputs, out_dir, "fields")
+
+
+def run_csv2pcd(inputs, out_dir, data_format="ascii"):
+    csv2pcd.csv_to_pcd(
+        inputs["csv_file"],
+        os.path.join(out_dir, "radar_points.pcd"),
+        sd.RADAR_COLUMNS,
+        data_format,
+    )
+
+
+def run_csv2pcd_binary(inputs, out_dir):
+    run_csv2pcd(inputs, out_dir, "binary")
+
+
+def run_csv2pcd_binary_compressed(inputs, out_dir):
+    run_csv2pcd(inputs, out_dir, "binary_compressed")
+
+
+def run_pcd2csv(inputs, out_dir):
+    pcd2csv_v2.convert_pcd_folder_to_csv(inputs["folder"], out_dir, incremental=False)
+
+
+def run_csv2bag(inputs, out_dir):
+    csv2bag.csv_to_db3(inputs["csv_file"], os.path.join(out_dir, "imu_data"))
+
+
+# 测试名 -> (准备数据, 执行转换)；使用同一份输入的测试共用 prepare 函数
+BENCHMARKS = {
+    "db3_to_csv": (prepare_pointcloud_db3, run_db3_to_csv),
+    "image-db3_to_png": (prepare_image_db3, run_image_db3_to_png),
+    "db3_extract": (prepare_mixed_db3, run_db3_extract),
+    "db3_extract_mcap": (prepare_mixed_mcap, run_db3_extract),
+    "imu2csv": (prepare_imu_bag, run_imu2csv),
+    "bag2txt_hex": (prepare_pointcloud_bag, run_bag2txt),
+    "bag2txt_fields": (prepare_pointcloud_bag, run_bag2txt_fields),
+    "csv2pcd_ascii": (prepare_points_csv, run_csv2pcd),
+    "csv2pcd_binary": (prepare_points_csv, run_csv2pcd_binary),
+    "csv2pcd_binary_compressed": (prepare_points_csv, run_csv2pcd_binary_compressed),
+    "pcd2csv": (prepare_pcd_folder, run_pcd2csv),
+    "csv2bag": (prepare_imu_csv, run_csv2bag),
+}
+
+
+def _peak_rss_mb():
+    """当前进程及其已结束子进程的峰值内存（Linux 上 ru_maxrss 单位为 KB）"""
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(self_rss, children_rss) / 1024
+
+
+def _child_main(name, inputs, out_dir, queue):
+    """在独立的子进程中执行一次转换，峰值内存不受其它测试影响"""
+    run = BENCHMARKS[name][1]
+    try:
+        start = time.perf_counter()
+        run(inputs, out_dir)
+        seconds = time.perf_counter() - start
+        queue.put({"status": "ok", "seconds": seconds, "peak_rss_mb": _peak_rss_mb()})
+    except ModuleNotFoundError as e:
+        # 缺少 ROS2 (rclpy) / OpenCV 等依赖时跳过该项
+        queue.put({"status": "skipped", "reason": f"missing module '{e.name}'"})
+    except Exception:
+        queue.put({"status": "failed", "reason": traceback.format_exc()})
+
+
+def run_benchmark(name, inputs, items, unit, input_bytes, base_dir):
+    """运行 repeat 次，取最快的一次"""
+    context = multiprocessing.get_context("spawn")
+    best = None
+    for i in range(repeat):
+        out_dir = os.path.join(base_dir, "out", f"{name}_{i}")
+        os.makedirs(out_dir, exist_ok=True)
+        queue = context.Queue()
+        process = context.Process(target=_child_main, args=(name, inputs, out_dir, queue))
+        process.start()
+        process.join()
+        result = queue.get() if not queue.empty() else {
+            "status": "failed", "reason": f"exit code {process.exitcode}"
+        }
+        shutil.rmtree(out_dir, ignore_errors=True)
+        if result["status"] != "ok":
+            return result
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+
+    best.update(
+        {
+            "items": items,
+            "unit": unit,
+            "input_mb": input_bytes / 1e6,
+            "items_per_s": items / best["seconds"],
+            "mb_per_s": input_bytes / 1e6 / best["seconds"],
+        }
+    )
+    return best
+
+
+def compare_with_baseline(results, baseline):
+    """与基线比较，返回回退的测试名列表"""
+    regressions = []
+    print("")
+    print(f"{'benchmark':<28}{'items/s':>14}{'baseline':>14}{'ratio':>8}{'RSS MB':>10}{'base RSS':>10}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if result["status"] != "ok" or not base or base.get("status") != "ok":
+            continue
+        ratio = result["items_per_s"] / base["items_per_s"]
+        rss_ratio = result["peak_rss_mb"] / base["peak_rss_mb"]
+        flag = ""
+        if ratio < 1 - regression_tolerance or rss_ratio > 1 + regression_tolerance:
+            flag = "  <-- regression"
+            regressions.append(name)
+        print(
+            f"{name:<28}{result['items_per_s']:>14.1f}{base['items_per_s']:>14.1f}"
+            f"{ratio:>8.2f}{result['peak_rss_mb']:>10.1f}{base['peak_rss_mb']:>10.1f}{flag}"
+        )
+    return regressions
+
+
+def main():
+    names = selected_benchmarks or list(BENCHMARKS)
+    base_dir = tempfile.mkdtemp(prefix="ros2_tools_bench_", dir=work_dir)
+    results = {}
+    try:
+        prepared = {}
+        for name in names:
+            prepare, _ = BENCHMARKS[name]
+            if prepare not in prepared:
+                data_dir = os.path.join(base_dir, "data", prepare.__name__)
+                os.makedirs(data_dir, exist_ok=True)
+                print(f"生成测试数据 {prepare.__name__} ...")
+                inputs, items, unit = prepare(data_dir)
+                input_bytes = sum(_file_size(path) for path in inputs.values())
+                prepared[prepare] = (inputs, items, unit, input_bytes)
+
+            print(f"运行 {name} ...")
+            result = run_benchmark(name, *prepared[prepare], base_dir)
+            results[name] = result
+            if result["status"] == "ok":
+                print(
+                    f"  {result['items_per_s']:.1f} {result['unit']}/s, "
+                    f"{result['mb_per_s']:.1f} MB/s, 峰值内存 {result['peak_rss_mb']:.1f} MB"
+                )
+            else:
+                print(f"  {result['status']}: {result['reason']}")
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scale": scale,
+        "results": results,
+    }
+    with open(results_file, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"结果已保存到 {results_file}")
+
+    regressions = []
+    if os.path.isfile(baseline_file):
+        with open(baseline_file, "r") as f:
+            baseline = json.load(f)
+        if baseline.get("scale") != scale:
+            print(f"基线的数据规模 ({baseline.get('scale')}) 与本次 ({scale}) 不同，结果不可直接比较")
+        regressions = compare_with_baseline(results, baseline["results"])
+        if regressions:
+            print(f"性能回退：{', '.join(regressions)}")
+    if save_baseline:
+        shutil.copyfile(results_file, baseline_file)
+        print(f"已保存为基线 {baseline_file}")
+    return regressions
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,534 @@
+import importlib
+import os
+import struct
+import sys
+import zlib
+import numpy as np
+
+# 仓库根目录，各转换脚本所在的文件夹都在这里
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_module(module_name):
+    """从仓库根目录的 ros2_convert 包导入模块（如 db3_writer、pcd_format）"""
+    if REPO_DIR not in sys.path:
+        sys.path.append(REPO_DIR)
+    return importlib.import_module(f"ros2_convert.{module_name}")
+
+
+# PointField.datatype 与 numpy 类型的对应关系
+POINTFIELD_DATATYPES = {
+    "i1": 1, "u1": 2, "i2": 3, "u2": 4, "i4": 5, "u4": 6, "f4": 7, "f8": 8,
+}
+
+# 默认的点云字段
+DEFAULT_POINT_FIELDS = [("x", "f4"), ("y", "f4"), ("z", "f4"), ("intensity", "f4")]
+
+# sensor_msgs/Imu 中 header 之后的 float64 个数
+IMU_FLOAT_COUNT = 37
+
+
+class CdrWriter:
+    """按 ROS2 CDR（小端）格式顺序写入数据，对齐位置从 4 字节封装头之后开始计算"""
+
+    def __init__(self):
+        self.buf = bytearray(b"\x00\x01\x00\x00")
+
+    def align(self, size):
+        self.buf += b"\x00" * (-(len(self.buf) - 4) % size)
+
+    def uint8(self, value):
+        self.buf.append(value)
+
+    def uint32(self, value):
+        self.align(4)
+        self.buf += struct.pack("<I", value)
+
+    def int32(self, value):
+        self.align(4)
+        self.buf += struct.pack("<i", value)
+
+    def float64_array(self, values):
+        self.align(8)
+        self.buf += struct.pack(f"<{len(values)}d", *values)
+
+    def string(self, value):
+        data = value.encode() + b"\x00"
+        self.uint32(len(data))
+        self.buf += data
+
+    def raw(self, data):
+        """sequence<uint8>"""
+        self.uint32(len(data))
+        self.buf += data
+
+    def header(self, stamp_ns, frame_id):
+        sec, nanosec = divmod(stamp_ns, 1_000_000_000)
+        self.int32(sec)
+        self.uint32(nanosec)
+        self.string(frame_id)
+
+    def getvalue(self):
+        return bytes(self.buf)
+
+
+class Ros1Writer:
+    """按 ROS1 序列化格式（小端、无对齐）顺序写入数据"""
+
+    def __init__(self):
+        self.buf = bytearray()
+
+    def uint8(self, value):
+        self.buf.append(value)
+
+    def uint32(self, value):
+        self.buf += struct.pack("<I", value)
+
+    def float64_array(self, values):
+        self.buf += struct.pack(f"<{len(values)}d", *values)
+
+    def string(self, value):
+        self.raw(value.encode())
+
+    def raw(self, data):
+        self.uint32(len(data))
+        self.buf += data
+
+    def header(self, seq, stamp_ns, frame_id):
+        secs, nsecs = divmod(stamp_ns, 1_000_000_000)
+        self.buf += struct.pack("<III", seq, secs, nsecs)
+        self.string(frame_id)
+
+    def getvalue(self):
+        return bytes(self.buf)
+
+
+def random_points(num_points, point_fields=DEFAULT_POINT_FIELDS, seed=0):
+    """生成随机点云的结构化数组"""
+    rng = np.random.default_rng(seed)
+    points = np.empty(num_points, dtype=[(name, "<" + fmt) for name, fmt in point_fields])
+    for name, fmt in point_fields:
+        if fmt.startswith("f"):
+            points[name] = rng.uniform(-100, 100, num_points)
+        else:
+            points[name] = rng.integers(0, 100, num_points)
+    return points
+
+
+def _write_pointfields(writer, points):
+    writer.uint32(len(points.dtype.names))
+    for name in points.dtype.names:
+        field_dtype, offset = points.dtype.fields[name][:2]
+        writer.string(name)
+        writer.uint32(offset)
+        writer.uint8(POINTFIELD_DATATYPES[field_dtype.str[1:]])
+        writer.uint32(1)
+
+
+def pointcloud2_cdr(stamp_ns, points, frame_id="lidar"):
+    """sensor_msgs/msg/PointCloud2"""
+    writer = CdrWriter()
+    writer.header(stamp_ns, frame_id)
+    writer.uint32(1)  # height
+    writer.uint32(len(points))  # width
+    _write_pointfields(writer, points)
+    writer.uint8(0)  # is_bigendian
+    writer.uint32(points.dtype.itemsize)  # point_step
+    writer.uint32(points.dtype.itemsize * len(points))  # row_step
+    writer.raw(points.tobytes())
+    writer.uint8(1)  # is_dense
+    return writer.getvalue()
+
+
+def pointcloud2_ros1(seq, stamp_ns, points, frame_id="lidar"):
+    """sensor_msgs/PointCloud2（ROS1）"""
+    writer = Ros1Writer()
+    writer.header(seq, stamp_ns, frame_id)
+    writer.uint32(1)
+    writer.uint32(len(points))
+    _write_pointfields(writer, points)
+    writer.uint8(0)
+    writer.uint32(points.dtype.itemsize)
+    writer.uint32(points.dtype.itemsize * len(points))
+    writer.raw(points.tobytes())
+    writer.uint8(1)
+    return writer.getvalue()
+
+
+def imu_values(index):
+    """第 index 条 IMU 消息的 37 个 float64"""
+    values = [0.0] * IMU_FLOAT_COUNT
+    values[3] = 1.0  # orientation.w
+    values[13:16] = [0.01 * index, 0.02, 0.03]  # angular_velocity
+    values[25:28] = [0.1, 0.2, 9.8]  # linear_acceleration
+    return values
+
+
+def imu_cdr(stamp_ns, index, frame_id="imu"):
+    """sensor_msgs/msg/Imu"""
+    writer = CdrWriter()
+    writer.header(stamp_ns, frame_id)
+    writer.float64_array(imu_values(index))
+    return writer.getvalue()
+
+
+def imu_ros1(seq, stamp_ns, frame_id="imu"):
+    """sensor_msgs/Imu（ROS1）"""
+    writer = Ros1Writer()
+    writer.header(seq, stamp_ns, frame_id)
+    writer.float64_array(imu_values(seq))
+    return writer.getvalue()
+
+
+def synthetic_image(height, width, index=0):
+    """生成带渐变和噪声的 RGB 图像，压缩率接近真实相机图像"""
+    rng = np.random.default_rng(index)
+    rows = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    cols = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[..., 0] = (rows + index) % 256
+    image[..., 1] = (cols + index) % 256
+    image[..., 2] = rng.integers(0, 32, (height, width), dtype=np.uint8)
+    return image
+
+
+def encode_png(image):
+    """不依赖 OpenCV，把 uint8 RGB 图像编码为 PNG"""
+    height, width = image.shape[:2]
+    raw = b"".join(b"\x00" + row.tobytes() for row in image)
+
+    def chunk(tag, data):
+        crc = zlib.crc32(tag + data) & 0xFFFFFFFF
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", crc)
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", ihdr)
+        + chunk(b"IDAT", zlib.compress(raw, 1))
+        + chunk(b"IEND", b"")
+    )
+
+
+def image_cdr(stamp_ns, image, frame_id="camera"):
+    """sensor_msgs/msg/Image（rgb8）"""
+    height, width = image.shape[:2]
+    writer = CdrWriter()
+    writer.header(stamp_ns, frame_id)
+    writer.uint32(height)
+    writer.uint32(width)
+    writer.string("rgb8")
+    writer.uint8(0)
+    writer.uint32(width * 3)
+    writer.raw(image.tobytes())
+    return writer.getvalue()
+
+
+def compressed_image_cdr(stamp_ns, png_data, frame_id="camera"):
+    """sensor_msgs/msg/CompressedImage（png）"""
+    writer = CdrWriter()
+    writer.header(stamp_ns, frame_id)
+    writer.string("png")
+    writer.raw(png_data)
+    return writer.getvalue()
+
+
+def write_db3(bag_dir, topics, messages):
+    """用 imu-csv_to_db3/db3_writer.py 写 rosbag2 (db3) 包
+
+    topics 为 {话题: 消息类型}，messages 为按时间排序的 (话题, 时间戳, 数据)。
+    返回 db3 文件路径。
+    """
+    db3_writer = _import_module("db3_writer")
+    with db3_writer.Db3Writer(bag_dir) as writer:
+        for topic, msg_type in topics.items():
+            writer.add_topic(topic, msg_type)
+        # 同一话题的连续消息按批写入
+        batch_topic, stamps, datas = None, [], []
+        for topic, stamp_ns, data in messages:
+            if topic != batch_topic or len(stamps) >= 1000:
+                if stamps:
+                    writer.write_batch(batch_topic, stamps, datas)
+                batch_topic, stamps, datas = topic, [], []
+            stamps.append(stamp_ns)
+            datas.append(data)
+        if stamps:
+            writer.write_batch(batch_topic, stamps, datas)
+    return writer.db3_file
+
+
+def pointcloud_messages(topic, count, num_points, rate_hz=10, start_ns=1_700_000_000_000_000_000,
+                        point_fields=DEFAULT_POINT_FIELDS):
+    """点云话题的 (话题, 时间戳, CDR 数据)"""
+    points = random_points(num_points, point_fields)
+    period_ns = 1_000_000_000 // rate_hz
+    for i in range(count):
+        stamp_ns = start_ns + i * period_ns
+        yield topic, stamp_ns, pointcloud2_cdr(stamp_ns, points)
+
+
+def image_messages(topic, count, height, width, compressed=False, rate_hz=30,
+                   start_ns=1_700_000_000_000_000_000):
+    """图像话题的 (话题, 时间戳, CDR 数据)，compressed 为 True 时为 PNG 压缩图像"""
+    period_ns = 1_000_000_000 // rate_hz
+    for i in range(count):
+        stamp_ns = start_ns + i * period_ns
+        image = synthetic_image(height, width, i)
+        if compressed:
+            yield topic, stamp_ns, compressed_image_cdr(stamp_ns, encode_png(image))
+        else:
+            yield topic, stamp_ns, image_cdr(stamp_ns, image)
+
+
+def imu_messages(topic, count, rate_hz=1000, start_ns=1_700_000_000_000_000_000):
+    """IMU 话题的 (话题, 时间戳, CDR 数据)"""
+    period_ns = 1_000_000_000 // rate_hz
+    for i in range(count):
+        stamp_ns = start_ns + i * period_ns
+        yield topic, stamp_ns, imu_cdr(stamp_ns, i)
+
+
+def _bag_field(name, value):
+    data = name.encode() + b"=" + value
+    return struct.pack("<I", len(data)) + data
+
+
+def _bag_record(header, data):
+    header_bytes = b"".join(_bag_field(name, value) for name, value in header.items())
+    return (
+        struct.pack("<I", len(header_bytes)) + header_bytes
+        + struct.pack("<I", len(data)) + data
+    )
+
+
+def _bag_time(stamp_ns):
+    return struct.pack("<II", *divmod(stamp_ns, 1_000_000_000))
+
+
+def write_ros1_bag(path, connections, messages, messages_per_chunk=1000):
+    """写 ROS1 bag v2.0（不压缩）
+
+    connections 为 {话题: 消息类型}，messages 为按时间排序的 (话题, 时间戳, ROS1 数据)。
+    """
+    conn_ids = {topic: i for i, topic in enumerate(connections)}
+    out = bytearray(b"#ROSBAG V2.0\n")
+    bag_header_pos = len(out)
+    out += b"\x00" * 4096  # bag 头记录固定 4096 字节，最后填写
+
+    chunk_infos = []
+    messages = list(messages)
+    for chunk_start in range(0, len(messages), messages_per_chunk):
+        chunk_messages = messages[chunk_start:chunk_start + messages_per_chunk]
+        body = bytearray()
+        index = {}
+        for topic, stamp_ns, data in chunk_messages:
+            conn = conn_ids[topic]
+            index.setdefault(conn, []).append((stamp_ns, len(body)))
+            body += _bag_record(
+                {"op": b"\x02", "conn": struct.pack("<I", conn), "time": _bag_time(stamp_ns)},
+                data,
+            )
+        chunk_pos = len(out)
+        out += _bag_record(
+            {"op": b"\x05", "compression": b"none", "size": struct.pack("<I", len(body))},
+            bytes(body),
+        )
+        for conn, entries in index.items():
+            out += _bag_record(
+                {
+                    "op": b"\x04",
+                    "ver": struct.pack("<I", 1),
+                    "conn": struct.pack("<I", conn),
+                    "count": struct.pack("<I", len(entries)),
+                },
+                b"".join(_bag_time(t) + struct.pack("<I", offset) for t, offset in entries),
+            )
+        stamps = [stamp_ns for _, stamp_ns, _ in chunk_messages]
+        counts = {conn: len(entries) for conn, entries in index.items()}
+        chunk_infos.append((chunk_pos, min(stamps), max(stamps), counts))
+
+    index_pos = len(out)
+    for topic, conn in conn_ids.items():
+        out += _bag_record(
+            {"op": b"\x07", "conn": struct.pack("<I", conn), "topic": topic.encode()},
+            _bag_field("topic", topic.encode())
+            + _bag_field("type", connections[topic].encode())
+            + _bag_field("md5sum", b"0" * 32)
+            + _bag_field("message_definition", b""),
+        )
+    for chunk_pos, start_ns, end_ns, counts in chunk_infos:
+        out += _bag_record(
+            {
+                "op": b"\x06",
+                "ver": struct.pack("<I", 1),
+                "chunk_pos": struct.pack("<Q", chunk_pos),
+                "start_time": _bag_time(start_ns),
+                "end_time": _bag_time(end_ns),
+                "count": struct.pack("<I", len(counts)),
+            },
+            b"".join(struct.pack("<II", conn, count) for conn, count in counts.items()),
+        )
+
+    bag_header = _bag_record(
+        {
+            "op": b"\x03",
+            "index_pos": struct.pack("<Q", index_pos),
+            "conn_count": struct.pack("<I", len(conn_ids)),
+            "chunk_count": struct.pack("<I", len(chunk_infos)),
+        },
+        b"",
+    )[:-4]
+    padding = 4096 - len(bag_header) - 4
+    bag_header += struct.pack("<I", padding) + b" " * padding
+    out[bag_header_pos:bag_header_pos + 4096] = bag_header
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+def _mcap_record(opcode, content):
+    return struct.pack("<BQ", opcode, len(content)) + content
+
+
+def _mcap_string(value):
+    data = value.encode()
+    return struct.pack("<I", len(data)) + data
+
+
+def _mcap_u16_u64_map(mapping):
+    data = b"".join(struct.pack("<HQ", key, value) for key, value in mapping.items())
+    return struct.pack("<I", len(data)) + data
+
+
+def write_mcap(path, topics, messages, messages_per_chunk=100, compression=""):
+    """写 rosbag2 MCAP 文件（带 summary：schema、channel、统计信息和块索引）
+
+    topics 为 {话题: 消息类型}，messages 为按时间排序的 (话题, 时间戳, CDR 数据)。
+    compression 为 ""、"zstd"（需要 zstandard）或 "lz4"（需要 lz4）。
+    """
+    channel_ids = {topic: i + 1 for i, topic in enumerate(topics)}
+    schema_ids = {msg_type: i + 1 for i, msg_type in enumerate(dict.fromkeys(topics.values()))}
+    definitions = b"".join(
+        _mcap_record(
+            0x03,
+            struct.pack("<H", schema_id) + _mcap_string(msg_type) + _mcap_string("ros2msg")
+            + struct.pack("<I", 0),
+        )
+        for msg_type, schema_id in schema_ids.items()
+    ) + b"".join(
+        _mcap_record(
+            0x04,
+            struct.pack("<HH", channel_id, schema_ids[topics[topic]]) + _mcap_string(topic)
+            + _mcap_string("cdr") + struct.pack("<I", 0),
+        )
+        for topic, channel_id in channel_ids.items()
+    )
+
+    out = bytearray(b"\x89MCAP0\r\n")
+    out += _mcap_record(0x01, _mcap_string("ros2") + _mcap_string("synthetic_data"))
+    out += definitions
+
+    chunk_indexes = []
+    counts = {channel_id: 0 for channel_id in channel_ids.values()}
+    all_stamps = []
+    messages = list(messages)
+    for chunk_start in range(0, len(messages), messages_per_chunk):
+        chunk_messages = messages[chunk_start:chunk_start + messages_per_chunk]
+        records = bytearray()
+        index = {}
+        for sequence, (topic, stamp_ns, data) in enumerate(chunk_messages):
+            channel_id = channel_ids[topic]
+            index.setdefault(channel_id, []).append((stamp_ns, len(records)))
+            records += _mcap_record(
+                0x05, struct.pack("<HIQQ", channel_id, sequence, stamp_ns, stamp_ns) + data
+            )
+            counts[channel_id] += 1
+        records = bytes(records)
+        if compression == "zstd":
+            import zstandard
+
+            compressed = zstandard.ZstdCompressor().compress(records)
+        elif compression == "lz4":
+            import lz4.frame
+
+            compressed = lz4.frame.compress(records)
+        else:
+            compressed = records
+        stamps = [stamp_ns for _, stamp_ns, _ in chunk_messages]
+        all_stamps += [min(stamps), max(stamps)]
+
+        chunk_pos = len(out)
+        out += _mcap_record(
+            0x06,
+            struct.pack("<QQQI", min(stamps), max(stamps), len(records), 0)
+            + _mcap_string(compression) + struct.pack("<Q", len(compressed)) + compressed,
+        )
+        chunk_length = len(out) - chunk_pos
+        index_offsets = {}
+        for channel_id, entries in index.items():
+            index_offsets[channel_id] = len(out)
+            entry_data = b"".join(struct.pack("<QQ", *entry) for entry in entries)
+            out += _mcap_record(
+                0x07, struct.pack("<HI", channel_id, len(entry_data)) + entry_data
+            )
+        chunk_indexes.append(
+            struct.pack("<QQQQ", min(stamps), max(stamps), chunk_pos, chunk_length)
+            + _mcap_u16_u64_map(index_offsets)
+            + struct.pack("<Q", len(out) - chunk_pos - chunk_length)
+            + _mcap_string(compression)
+            + struct.pack("<QQ", len(compressed), len(records))
+        )
+    out += _mcap_record(0x0F, struct.pack("<I", 0))
+
+    summary_start = len(out)
+    out += definitions
+    out += _mcap_record(
+        0x0B,
+        struct.pack(
+            "<QHIIIIQQ", len(messages), len(schema_ids), len(channel_ids), 0, 0,
+            len(chunk_indexes), min(all_stamps, default=0), max(all_stamps, default=0),
+        )
+        + _mcap_u16_u64_map(counts),
+    )
+    for chunk_index in chunk_indexes:
+        out += _mcap_record(0x08, chunk_index)
+    out += _mcap_record(0x02, struct.pack("<QQI", summary_start, 0, 0))
+    out += b"\x89MCAP0\r\n"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+def write_imu_csv(path, num_rows, rate_hz=1000):
+    """csv2bag.py 的输入：表头 + 8 列（序号、加速度 xyz、角速度 xyz（度/秒）、毫秒时间戳）"""
+    rng = np.random.default_rng(0)
+    index = np.arange(num_rows)
+    columns = [index] + [rng.normal(0, 1, num_rows) for _ in range(6)]
+    columns.append(1_700_000_000_000 + index * 1000 // rate_hz)
+    data = np.column_stack(columns)
+    header = "index,ax,ay,az,gx,gy,gz,timestamp_ms"
+    np.savetxt(path, data, delimiter=",", header=header, comments="", fmt="%.6f")
+    return path
+
+
+# csv2pcd.py 输入 CSV 的列（雷达点）
+RADAR_COLUMNS = ["X_m", "Y_m", "Z_m", "Vx_ms", "RCS_dbm2", "Time_ms", "probability", "snr"]
+
+
+def write_points_csv(path, num_rows):
+    """csv2pcd.py 的输入：雷达点 CSV"""
+    rng = np.random.default_rng(0)
+    data = np.column_stack([rng.uniform(-100, 100, num_rows) for _ in RADAR_COLUMNS])
+    np.savetxt(path, data, delimiter=",", header=",".join(RADAR_COLUMNS), comments="", fmt="%.6f")
+    return path
+
+
+def write_pcd_folder(folder, num_files, num_points, data_format="binary"):
+    """pcd2csv 的输入：num_files 个 PCD 文件"""
+    pcd_format = _import_module("pcd_format")
+    os.makedirs(folder, exist_ok=True)
+    points = random_points(num_points)
+    for i in range(num_files):
+        pcd_format.write_pcd(os.path.join(folder, f"{i:06d}.pcd"), points, data_format)
+    return folder
@@ -1,54 +1,56 @@
-import csv
-import rosbag
-from sensor_msgs.msg import Imu
-from std_msgs.msg import Header
 import math  # 用于角度转弧度
+import os
+import sys
 
-# CSV 文件路径
-csv_file_path = '/media/sax/新加卷/常工航天光学/2024-11-5.csv'
-
-# 创建 rosbag 文件
-bag = rosbag.Bag('imu_data.bag', 'w')
-
-# 打开 CSV 文件并读取数据
-with open(csv_file_path, 'r') as csvfile:
-    reader = csv.reader(csvfile)
-
-    # 跳过第一行（表头）
-    header_row = next(reader)
-
-    # 获取第一个时间戳，作为基准时间（单位 ms）
-    first_row = next(reader)
-    first_timestamp_ms = int(first_row[7])  # 假设时间戳在第 8 列
+# 转换代码在仓库根目录的 ros2_convert 包中，这里只保留设置
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-    # 写入第一行数据
-    for row in reader:
-        current_timestamp_ms = int(row[7])  # 当前行的时间戳（单位 ms）
+from ros2_convert import csv2bag
 
-        # 计算相对于第一个时间戳的时间
-        elapsed_time_ms = current_timestamp_ms - first_timestamp_ms
-
-        # 转换为 ROS 时间戳格式（秒和纳秒）
-        secs = elapsed_time_ms // 1000
-        nsecs = (elapsed_time_ms % 1000) * 1_000_000
-
-        # 创建 IMU 消息
-        imu_msg = Imu()
-        imu_msg.header = Header()
-        imu_msg.header.frame_id = 'imu_frame'
-        imu_msg.header.stamp.secs = secs
-        imu_msg.header.stamp.nsecs = nsecs
-
-        # 填充 IMU 数据
-        imu_msg.linear_acceleration.x = float(row[1])
-        imu_msg.linear_acceleration.y = float(row[2])
-        imu_msg.linear_acceleration.z = float(row[3])
-        imu_msg.angular_velocity.x = float(row[4]) * math.pi / 180  # 转换为 rad/s
-        imu_msg.angular_velocity.y = float(row[5]) * math.pi / 180  # 转换为 rad/s
-        imu_msg.angular_velocity.z = float(row[6]) * math.pi / 180  # 转换为 rad/s
-
-        # 写入 Bag 文件
-        bag.write('/imu/data', imu_msg)
+# CSV 文件路径
+csv_file_path = '/media/sax/新加卷/常工航天光学/2024-11-5.csv'
 
-# 关闭 Bag 文件
-bag.close()
+# 输出的 rosbag2 目录（包含 imu_data_0.db3 和 metadata.yaml）
+bag_dir = 'imu_data'
+
+# 话题名和 frame_id
+topic_name = '/imu/data'
+frame_id = 'imu_frame'
+
+# 时间戳所在的列（从 0 开始，第 8 列）以及换算为纳秒的系数（ms -> ns）
+timestamp_column = 7
+timestamp_to_ns = 1_000_000
+# 是否以第一个时间戳为 0 计算相对时间
+relative_time = True
+
+# CSV 列与 Imu 字段的对应关系：字段名 -> (列号, 单位换算系数)
+column_mapping = {
+    'linear_acceleration_x': (1, 1.0),
+    'linear_acceleration_y': (2, 1.0),
+    'linear_acceleration_z': (3, 1.0),
+    'angular_velocity_x': (4, math.pi / 180),  # 转换为 rad/s
+    'angular_velocity_y': (5, math.pi / 180),  # 转换为 rad/s
+    'angular_velocity_z': (6, math.pi / 180),  # 转换为 rad/s
+}
+
+# 每次读取和序列化的行数
+chunk_rows = 200_000
+
+
+def main():
+    options = csv2bag.Options(
+        csv_file_path=csv_file_path,
+        bag_dir=bag_dir,
+        topic_name=topic_name,
+        frame_id=frame_id,
+        timestamp_column=timestamp_column,
+        timestamp_to_ns=timestamp_to_ns,
+        relative_time=relative_time,
+        column_mapping=column_mapping,
+        chunk_rows=chunk_rows,
+    )
+    return csv2bag.convert(options)
+
+
+if __name__ == '__main__':
+    main()
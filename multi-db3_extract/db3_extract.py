@@ -0,0 +1,75 @@
+import os
+import sys
+
+# 转换代码在仓库根目录的 ros2_convert 包中，这里只保留设置
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ros2_convert import db3_extract
+
+# 主文件夹路径，包含多个 DB3 文件
+parent_dir = "/media/sax/新加卷/db3"
+# 输出目录路径
+output_parent_dir = "/media/sax/新加卷/processed_db3"
+
+# 需要读取的指定话题列表，None 表示读取所有话题
+topics_to_process = None
+
+# 需要运行的提取器及其选项，读取一遍 bag，按消息类型把消息交给对应的提取器；
+# 不需要的提取器注释掉即可，选项含义与单独的脚本相同
+extractors = {
+    # 点云：db3_to_csv.py
+    "pointcloud": {"chunk_points": 200_000, "output_format": "csv", "layout": "flat"},
+    # 图像：image-db3_to_png.py
+    "image": {
+        "num_threads": 4,
+        "queue_size": 64,
+        "compressed_passthrough": False,
+        "normalize_16bit": False,
+    },
+    # IMU：imu2csv.py（输出格式 csv / parquet / feather）
+    "imu": {"output_format": "csv"},
+}
+
+# 时间窗口（秒），只提取窗口内（闭区间）的消息，None 表示该端不限制
+start_time = None
+end_time = None
+# 时间窗口的基准："bag" 为录制时间（messages.timestamp），"header" 为消息头时间戳
+time_base = "bag"
+# True 时 start_time/end_time 为相对 bag 最早时间戳的秒数，False 时为 Unix 时间戳（秒）
+window_relative = True
+# 时间索引文件（<文件名>.db3.index）所在目录，None 表示放在 db3 文件旁边
+index_dir = None
+
+# 每隔多少秒输出一行进度（条数、速率、剩余时间），None 表示不输出
+progress_interval = 5
+# 是否用 tracemalloc 统计 Python 内存峰值（会明显变慢）
+trace_memory = False
+# 是否在输出目录写出 JSON 运行报告（<文件名>.extract.report.json），
+# 记录各阶段（所有提取器合计）和各话题的耗时与字节数
+run_report = True
+
+# 并行处理的进程数，None 表示使用全部 CPU 核数，1 表示逐个顺序处理
+num_workers = None
+
+
+def main():
+    options = db3_extract.Options(
+        parent_dir=parent_dir,
+        output_parent_dir=output_parent_dir,
+        topics_to_process=topics_to_process,
+        extractors=extractors,
+        start_time=start_time,
+        end_time=end_time,
+        time_base=time_base,
+        window_relative=window_relative,
+        index_dir=index_dir,
+        progress_interval=progress_interval,
+        trace_memory=trace_memory,
+        run_report=run_report,
+        num_workers=num_workers,
+    )
+    return db3_extract.convert(options)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,20 @@
 import os
-import pandas as pd
-from sensor_msgs.msg import PointCloud, PointCloud2
-from rosbag2_py import SequentialReader, StorageOptions, ConverterOptions
-from rclpy.serialization import deserialize_message
-from sensor_msgs_py import point_cloud2 as pc2
+import sys
+
+# 转换代码在仓库根目录的 ros2_convert 包中，这里只保留设置
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ros2_convert import db3_to_csv
 
 # 主文件夹路径，包含多个 DB3 文件
 parent_dir = "/media/sax/新加卷/db3"
 # 输出目录路径
 output_parent_dir = "/media/sax/新加卷/processed_db3"
 
-# # 需要读取的指定话题列表
+# 需要读取的指定话题列表，None 表示读取所有点云话题
+topics_to_process = None
+
+# # 注意，如果想指定话题进行读取，请开启这部分代码。
 # topics_to_process = [
 #     # "/usb_cam_1/compressed",  # 话题1
 #     # "/camera/depth/image_raw",  # 话题2
@@ -18,182 +22,84 @@ output_parent_dir = "/media/sax/新加卷/processed_db3"
 #     # # 添加其他你需要处理的话题
 # ]
 
-# 确保输出目录存在
-os.makedirs(output_parent_dir, exist_ok=True)
-
-
-def save_pointcloud_data(data, columns, output_csv, output_txt):
-    """将点云数据保存为 CSV 和 TXT 文件"""
-    if data:
-        try:
-            # 保存为 CSV 文件
-            df = pd.DataFrame(data, columns=columns)
-            df.to_csv(output_csv, index=False)
-            print(f"点云数据已保存到 {output_csv}")
-
-            # 保存为 TXT 文件
-            df.to_csv(output_txt, sep=" ", index=False, header=True)
-            print(f"点云数据已保存到 {output_txt}")
-        except Exception as e:
-            print(f"Error saving PointCloud data: {e}")
-    else:
-        # print("没有点云数据需要保存")
-        print("")
-
-
-def process_db3_file(db3_file, output_dir):
-    """处理单个 DB3 文件并提取并保存点云数据"""
-    if not os.path.isfile(db3_file):
-        print(f"Error: DB3 file '{db3_file}' not found.")
-        return
-
-    # 直接使用 db3 文件的基础名称创建输出目录
-    db3_base_name = os.path.splitext(os.path.basename(db3_file))[0]
-
-    # 设置存储选项
-    storage_options = StorageOptions(uri=db3_file, storage_id="sqlite3")
-    converter_options = ConverterOptions("", "")
-    reader = SequentialReader()
-    reader.open(storage_options, converter_options)
-
-    print(f"开始处理 db3 文件 '{db3_file}' 中的点云数据...")
-
-    # 为每个 topic 初始化独立的 frame_id
-    topic_frame_counters = {}
-
-    # 获取所有话题类型
-    topics_metadata = reader.get_all_topics_and_types()
-    topic_types = {topic.name: topic.type for topic in topics_metadata}
-
-    # 用于存储点云数据
-    all_data_pc2 = []
-    all_data_pc = []
-    columns_pc2 = None  # PointCloud2 的列名
-    columns_pc = None  # PointCloud 的列名
-
-    # 读取消息
-    while reader.has_next():
-        topic, serialized_msg, timestamp_ns = reader.read_next()
-
-        # # 注意，如果想指定话题进行读取，请开启这部分代码。
-        # # 判断当前话题是否在需要处理的列表中
-        # if topic not in topics_to_process:
-        #     print(f"No topic in the list !!! ")
-        #     print(f"No topic in the list !!! ")
-        #     print(f"No topic in the list !!! ")
-        #     return  # 如果当前话题不在指定列表中，跳过此话题
-
-        # 判断消息类型并反序列化
-        msg_type = topic_types.get(topic)
-        if not msg_type:
-            print(f"Warning: Unknown message type for topic '{topic}'")
-            continue
-
-        if msg_type not in [
-            "sensor_msgs/msg/PointCloud2",
-            "sensor_msgs/msg/PointCloud",
-        ]:
-            print(f"Skipping non-pointcloud topic '{topic}'")
-            continue
-        else:
-            print(f"Processing topic: {topic}")
-
-        try:
-            if msg_type == "sensor_msgs/msg/PointCloud2":  # 处理 PointCloud2 消息
-                msg = deserialize_message(serialized_msg, PointCloud2)
-                if columns_pc2 is None:
-                    columns_pc2 = ["frame_id", "timestamp"] + [
-                        field.name for field in msg.fields
-                    ]
-
-                # 提取时间戳并格式化为 "sec.nsec"
-                timestamp_sec = msg.header.stamp.sec
-                timestamp_nsec = msg.header.stamp.nanosec
-                timestamp = f"{timestamp_sec}.{timestamp_nsec:09d}"
-
-                # 提取点云数据
-                pc_gen = pc2.read_points(
-                    msg,
-                    field_names=[field.name for field in msg.fields],
-                    skip_nans=True,
-                )
-
-                frame_id_pc2 = topic_frame_counters.get(topic, 0)
-                topic_frame_counters[topic] = frame_id_pc2 + 1
-
-                # 存储每个点的数据
-                for point in pc_gen:
-                    all_data_pc2.append((frame_id_pc2, timestamp) + tuple(point))
-
-            elif msg_type == "sensor_msgs/msg/PointCloud":  # 处理 PointCloud 消息
-                msg = deserialize_message(serialized_msg, PointCloud)
-                if columns_pc is None:
-                    columns_pc = ["frame_id", "timestamp"] + [
-                        field.name for field in msg.fields
-                    ]
-
-                # 提取时间戳并格式化为 "sec.nsec"
-                timestamp_sec = msg.header.stamp.sec
-                timestamp_nsec = msg.header.stamp.nanosec
-                timestamp = f"{timestamp_sec}.{timestamp_nsec:09d}"
-
-                # 提取点云数据
-                pc_gen = pc2.read_points(
-                    msg,
-                    field_names=[field.name for field in msg.fields],
-                    skip_nans=True,
-                )
-
-                frame_id_pc = topic_frame_counters.get(topic, 0)
-                topic_frame_counters[topic] = frame_id_pc + 1
-
-                # 存储每个点的数据
-                for point in pc_gen:
-                    all_data_pc.append((frame_id_pc, timestamp) + tuple(point))
-
-        except Exception as e:
-            print(f"Error processing message from topic '{topic}': {e}")
-            continue
-
-    # 为每个话题创建输出子目录
-    topic_name = topic.replace("/", "_")  # 将话题名称中的斜杠替换为下划线
-    topic_output_dir = os.path.join(output_dir, topic_name)
-
-    # 确保话题子目录存在
-    os.makedirs(topic_output_dir, exist_ok=True)
-
-    # 保存 PointCloud2 数据
-    save_pointcloud_data(
-        all_data_pc2,
-        columns_pc2,
-        os.path.join(topic_output_dir, "PointCloud2.csv"),
-        os.path.join(topic_output_dir, "PointCloud2.txt"),
-    )
-
-    # 保存 PointCloud 数据
-    save_pointcloud_data(
-        all_data_pc,
-        columns_pc,
-        os.path.join(topic_output_dir, "PointCloud.csv"),
-        os.path.join(topic_output_dir, "PointCloud.txt"),
+# 每个话题缓冲多少个点后写出一次，决定内存占用上限
+chunk_points = 200_000
+
+# 输出格式："csv"（CSV + TXT）、"parquet"（每帧一个 row group）或 "feather"（Arrow IPC）
+# parquet/feather 需要安装 pyarrow，列保留原始类型，时间戳为 int64 纳秒
+output_format = "csv"
+
+# 输出布局："flat" 每个点一行，重复 frame_id/timestamp；
+# "normalized" 输出帧表（<类型>_frames）和只含点字段的点表（<类型>_points），
+# 帧表记录每帧的消息头/接收时间戳（int64 纳秒）、点数和在点表中的位置
+output_layout = "flat"
+
+# 时间窗口（秒），只提取窗口内（闭区间）的消息，None 表示该端不限制
+start_time = None
+end_time = None
+# 时间窗口的基准："bag" 为录制时间（messages.timestamp），"header" 为消息头时间戳
+time_base = "bag"
+# True 时 start_time/end_time 为相对 bag 最早时间戳的秒数，False 时为 Unix 时间戳（秒）
+window_relative = True
+# 时间索引文件（<文件名>.db3.index）所在目录，None 表示放在 db3 文件旁边
+index_dir = None
+
+# 按话题抽帧，None 表示保留所有帧；{话题: 规则}，"*" 为其它话题的默认规则：
+#   {"stride": 10}                  每 10 帧保留一帧
+#   {"rate_hz": 2}                  按录制时间每 0.5 秒保留一帧
+#   {"timestamps": [...]}           只保留这些录制时间戳（纳秒）的帧，可加 "tolerance_ms": 5
+# 只根据 bag 录制时间戳判断，被跳过的消息不反序列化、不解码、不写出；
+# frame_id 仍为该话题在 bag 中的序号，可以对应回原始数据
+sampling = None
+# # 例如：激光雷达每 10 帧取一帧，其它点云话题 1 Hz
+# sampling = {
+#     "/lidar/points": {"stride": 10},
+#     "*": {"rate_hz": 1},
+# }
+
+# 跳过已经完成的 db3 文件：bag 大小/修改时间（content_hash 为 True 时加上内容 sha256）、
+# 话题列表和上面的输出选项都没变时不再重新提取
+use_cache = True
+content_hash = False
+# 每隔多少秒保存一次断点，中断后从断点继续（仅 csv 格式），None 表示不保存断点
+checkpoint_interval = 60
+
+# 每隔多少秒输出一行进度（条数、速率、剩余时间），None 表示不输出
+progress_interval = 5
+# 是否用 tracemalloc 统计 Python 内存峰值（会明显变慢）
+trace_memory = False
+# 是否在输出目录写出 JSON 运行报告（<文件名>.pointcloud.report.json），
+# 记录读取、反序列化、解码、写出各阶段和各话题的耗时与字节数
+run_report = True
+
+# 并行处理的进程数，None 表示使用全部 CPU 核数，1 表示逐个顺序处理
+num_workers = None
+
+
+def main():
+    options = db3_to_csv.Options(
+        parent_dir=parent_dir,
+        output_parent_dir=output_parent_dir,
+        topics_to_process=topics_to_process,
+        chunk_points=chunk_points,
+        output_format=output_format,
+        output_layout=output_layout,
+        start_time=start_time,
+        end_time=end_time,
+        time_base=time_base,
+        window_relative=window_relative,
+        index_dir=index_dir,
+        sampling=sampling,
+        use_cache=use_cache,
+        content_hash=content_hash,
+        checkpoint_interval=checkpoint_interval,
+        progress_interval=progress_interval,
+        trace_memory=trace_memory,
+        run_report=run_report,
+        num_workers=num_workers,
     )
+    return db3_to_csv.convert(options)
 
 
-def process_all_db3_files(parent_dir, output_parent_dir):
-    """处理主目录下所有 DB3 文件"""
-    for root, dirs, files in os.walk(parent_dir):
-        for file in files:
-            if file.endswith(".db3"):
-                db3_file_path = os.path.join(root, file)
-
-                # 创建输出目录，与输入目录结构一致
-                relative_path = os.path.relpath(root, parent_dir)
-                output_dir = os.path.join(output_parent_dir, relative_path)
-                os.makedirs(output_dir, exist_ok=True)
-
-                print(f"开始处理 {db3_file_path} ...")
-                process_db3_file(db3_file_path, output_dir)
-
-
-# 处理所有 DB3 文件
-process_all_db3_files(parent_dir, output_parent_dir)
+if __name__ == "__main__":
+    main()
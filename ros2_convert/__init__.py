@@ -0,0 +1,149 @@
+"""各转换脚本的统一入口：可导入的包 + 命令行（python -m ros2_convert）
+
+各转换的代码都在本包中（db3_to_csv、image_db3_to_png、db3_extract 等模块），
+每个模块提供 Options（设置名及默认值，与对应脚本开头的设置同名）和
+convert(options)；仓库各文件夹中的脚本只保留开头的设置，把它们作为 Options
+传给 convert()。设置作为参数逐层传入，进程池中的任务也把 Options 作为参数
+交给子进程，不修改模块级变量，spawn/forkserver 启动的子进程与 fork 结果相同。
+
+导入本包不导入任何转换模块，也不读写文件；pandas、OpenCV、ROS2 等依赖在
+真正用到时才导入。
+
+    import ros2_convert
+
+    ros2_convert.run_converter(
+        "db3_to_csv", parent_dir="/data/db3", output_parent_dir="/data/out", num_workers=8
+    )
+
+    from ros2_convert import db3_to_csv
+
+    db3_to_csv.convert(
+        db3_to_csv.Options(parent_dir="/data/db3", output_parent_dir="/data/out", use_cache=False)
+    )
+
+    with ros2_convert.open_reader("/data/db3/rosbag2_0.mcap") as reader:
+        for topic, data, timestamp_ns, msg_type in reader.read_messages(topics=["/imu"]):
+            ...
+
+各转换共用的模块（db3_reader、mcap_reader、bag_reader、batch_runner、
+extract_cache、split_bag 等）也在本包中。
+"""
+import importlib
+from collections import namedtuple
+
+# 转换：包中的模块名、仓库中对应的脚本（文件夹、文件名）、说明、必须指定的设置
+Converter = namedtuple("Converter", ["module", "folder", "filename", "description", "required"])
+
+# 批量处理 rosbag2 的转换必须指定输入和输出目录
+_BAG_DIRS = ("parent_dir", "output_parent_dir")
+
+CONVERTERS = {
+    "db3_to_csv": Converter(
+        "db3_to_csv",
+        "pointcloud-db3_to_csv",
+        "db3_to_csv.py",
+        "rosbag2 (db3/mcap) 中的点云 -> CSV/Parquet/Feather",
+        _BAG_DIRS,
+    ),
+    "image-db3_to_png": Converter(
+        "image_db3_to_png",
+        "image-db3_to_png",
+        "image-db3_to_png.py",
+        "rosbag2 (db3/mcap) 中的图像 -> PNG/JPG",
+        _BAG_DIRS,
+    ),
+    "db3_extract": Converter(
+        "db3_extract",
+        "multi-db3_extract",
+        "db3_extract.py",
+        "读取一遍 rosbag2，同时提取点云、图像和 IMU",
+        _BAG_DIRS,
+    ),
+    "imu2csv": Converter(
+        "imu2csv",
+        "imu-db3_to_csv",
+        "imu2csv.py",
+        "ROS1 bag 中的 IMU -> CSV/Parquet/Feather",
+        ("bag_files",),
+    ),
+    "bag2txt": Converter(
+        "bag2txt", "pointcloud-db3_to_txt", "bag2txt.py", "ROS1 bag 中的点云 -> TXT", ("bag_files",)
+    ),
+    "csv2bag": Converter(
+        "csv2bag", "imu-csv_to_db3", "csv2bag.py", "IMU CSV -> rosbag2 (db3)", ("csv_file_path",)
+    ),
+    "csv2pcd": Converter(
+        "csv2pcd",
+        "pointcloud-csv_to_pcd",
+        "csv2pcd.py",
+        "点云 CSV -> PCD",
+        ("csv_file_path", "pcd_file_path"),
+    ),
+    "pcd2csv_v1": Converter(
+        "pcd2csv_v1",
+        "pointcloud-csv_to_pcd",
+        "pcd2csv_v1.py",
+        "单个 PCD -> CSV",
+        ("input_pcd_file", "output_csv_file"),
+    ),
+    "pcd2csv_v2": Converter(
+        "pcd2csv_v2",
+        "pointcloud-csv_to_pcd",
+        "pcd2csv_v2.py",
+        "PCD 文件夹 -> CSV（增量、多进程）",
+        ("input_folder", "output_folder"),
+    ),
+}
+
+
+def load_converter(name):
+    """导入转换模块并返回，模块中有 Options 和 convert()，导入时不做任何处理"""
+    if name not in CONVERTERS:
+        raise ValueError(f"Unknown converter '{name}', expected one of {sorted(CONVERTERS)}")
+    return importlib.import_module(f"{__name__}.{CONVERTERS[name].module}")
+
+
+def converter_settings(name):
+    """转换的设置及默认值，返回 {名称: 默认值}"""
+    return load_converter(name).Options()._asdict()
+
+
+def make_options(name, **settings):
+    """按设置生成转换的 Options，未指定的设置使用默认值
+
+    不存在的设置或缺少必须指定的设置（如输入、输出路径）时抛出 ValueError，
+    避免拼错的设置被静默忽略。
+    """
+    module = load_converter(name)
+    unknown = sorted(set(settings) - set(module.Options._fields))
+    if unknown:
+        raise ValueError(f"Unknown settings {unknown} for converter '{name}'")
+    options = module.Options(**settings)
+    missing = [key for key in CONVERTERS[name].required if getattr(options, key) is None]
+    if missing:
+        raise ValueError(f"Missing settings {missing} for converter '{name}'")
+    return options
+
+
+def run_converter(name, **settings):
+    """按设置运行转换，返回 convert() 的返回值
+
+    设置名与脚本开头的变量名相同，设置只作为参数传入，不修改任何模块的变量。
+    """
+    return load_converter(name).convert(make_options(name, **settings))
+
+
+def open_reader(bag_file, index_dir=None, temp_dir=None):
+    """只读打开 bag 文件，不依赖 ROS
+
+    .bag（ROS1）返回 BagReader，.db3/.db3.zstd/.mcap（rosbag2）返回 Db3Reader/McapReader，
+    都可以用 with 语句，read_messages() 产出 (话题, 序列化数据, 时间戳, 消息类型)。
+    .db3.zstd 解压到 temp_dir（None 表示系统临时目录）中的临时文件，关闭时删除。
+    """
+    if bag_file.endswith(".bag"):
+        from .bag_reader import BagReader
+
+        return BagReader(bag_file)
+    from .db3_reader import open_reader as open_rosbag2_reader
+
+    return open_rosbag2_reader(bag_file, index_dir=index_dir, temp_dir=temp_dir)
@@ -0,0 +1,74 @@
+"""命令行入口：python -m ros2_convert <转换脚本> [设置=值 ...]
+
+    python -m ros2_convert                       # 列出所有转换脚本
+    python -m ros2_convert db3_to_csv --show     # 查看设置及默认值
+    python -m ros2_convert db3_to_csv parent_dir=/data/db3 output_parent_dir=/data/out \\
+        num_workers=8 "topics_to_process=['/lidar/points']"
+
+设置名与脚本开头的变量名相同，未指定的设置使用包中的默认值（不读取脚本
+开头的设置）；值按 Python 字面量解析（数字、None、True、列表、字典等），
+不是字面量时作为字符串。
+"""
+import argparse
+import ast
+import sys
+
+from ros2_convert import CONVERTERS, converter_settings, run_converter
+
+
+def parse_value(text):
+    """按 Python 字面量解析设置的值，不是字面量时原样作为字符串（如路径）"""
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def has_failures(result):
+    """批量处理返回 [(文件, 错误, 耗时)]，有错误时返回 True"""
+    if not isinstance(result, list):
+        return False
+    return any(isinstance(item, tuple) and len(item) == 3 and item[1] is not None for item in result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ros2_convert",
+        description="运行仓库中的转换，用 设置=值 指定设置，未指定的使用默认值",
+    )
+    parser.add_argument("converter", nargs="?", choices=sorted(CONVERTERS), help="转换脚本")
+    parser.add_argument("settings", nargs="*", metavar="设置=值", help="如 num_workers=4")
+    parser.add_argument("--show", action="store_true", help="只显示设置及默认值，不运行")
+    args = parser.parse_intermixed_args(argv)
+
+    if args.converter is None:
+        for name, converter in sorted(CONVERTERS.items()):
+            print(f"{name:<18}{converter.description}（{converter.folder}/{converter.filename}）")
+        return 0
+
+    settings = {}
+    for item in args.settings:
+        key, sep, value = item.partition("=")
+        if not sep or not key:
+            parser.error(f"expected 设置=值, got '{item}'")
+        settings[key] = parse_value(value)
+
+    try:
+        if args.show:
+            current = converter_settings(args.converter)
+            unknown = sorted(set(settings) - set(current))
+            if unknown:
+                raise ValueError(f"Unknown settings {unknown} for converter '{args.converter}'")
+            current.update(settings)
+            for key, value in current.items():
+                print(f"{key} = {value!r}")
+            return 0
+        result = run_converter(args.converter, **settings)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    return 1 if has_failures(result) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""ROS1 bag 中的点云 -> TXT
+
+设置通过 Options 显式传入，各设置的含义见 pointcloud-db3_to_txt/bag2txt.py 开头的说明。
+输出文件写到当前目录。
+"""
+import os
+from collections import namedtuple
+from .bag_reader import BagReader
+from .pointcloud_decoder import PointCloud2Decoder
+from .ros1_msgs import deserialize_message
+
+# 输出文件的写缓冲大小
+WRITE_BUFFER_SIZE = 1 << 20
+
+# 需要读取的点云消息类型
+POINTCLOUD_TYPES = ["sensor_msgs/PointCloud2", "sensor_msgs/PointCloud"]
+
+# 设置名及默认值，与 pointcloud-db3_to_txt/bag2txt.py 中的设置同名，data_mode 为 "hex" 或 "fields"
+DEFAULTS = {
+    "bag_files": None,
+    "topics_to_check": None,
+    "data_mode": "hex",
+}
+
+Options = namedtuple("Options", DEFAULTS, defaults=DEFAULTS.values())
+
+
+def format_hex(data, bytes_per_line=16):
+    """把整块数据一次转换为十六进制文本，每行 bytes_per_line 个字节"""
+    if not data:
+        return ""
+    # bytes.hex(" ") 每个字节占 3 个字符（含分隔空格），按行宽切分
+    hex_str = bytes(data).hex(" ")
+    step = bytes_per_line * 3
+    return "\n".join(
+        hex_str[i : i + step - 1] for i in range(0, len(hex_str), step)
+    ) + "\n"
+
+
+def format_columns(points):
+    """把结构化数组格式化为带表头的空格分隔文本，每列整体转换为字符串"""
+    names = points.dtype.names
+    columns = [points[name].astype(str) for name in names]
+    lines = [" ".join(names)]
+    lines.extend(" ".join(row) for row in zip(*columns))
+    return "\n".join(lines) + "\n"
+
+
+def save_pointcloud2_to_txt(msg, file, message_count, decoder=None, topic=None):
+    parts = [f"Message {message_count}:\n"]
+
+    # 写入头信息
+    parts.append("Header:\n")
+    parts.append(f"  seq: {msg.header.seq}\n")
+    parts.append(f"  stamp: {msg.header.stamp}\n")
+    parts.append(f"  frame_id: {msg.header.frame_id}\n")
+
+    # 写入 PointCloud2 的基本信息
+    parts.append(f"Height: {msg.height}\n")
+    parts.append(f"Width: {msg.width}\n")
+
+    # 写入字段信息
+    parts.append("Fields:\n")
+    for field in msg.fields:
+        parts.append(f"  - name: {field.name}\n")
+        parts.append(f"    offset: {field.offset}\n")
+        parts.append(f"    datatype: {field.datatype}\n")
+        parts.append(f"    count: {field.count}\n")
+
+    parts.append(f"Is Big Endian: {'true' if msg.is_bigendian else 'false'}\n")
+    parts.append(f"Point Step: {msg.point_step}\n")
+    parts.append(f"Row Step: {msg.row_step}\n")
+    parts.append(f"Is Dense: {'true' if msg.is_dense else 'false'}\n")
+
+    if decoder is not None:
+        # 按字段解码后输出，每个点一行
+        parts.append("Data (fields):\n")
+        parts.append(format_columns(decoder.decode(topic, msg)))
+    else:
+        # 写入点云数据（十六进制表示），每 16 个字节一行
+        parts.append("Data (hex):\n")
+        parts.append(format_hex(msg.data))
+    parts.append("\n")
+
+    file.write("".join(parts))
+
+
+def save_pointcloud_to_txt(msg, file, message_count):
+    parts = [f"Message {message_count}:\n"]
+
+    # 写入头信息
+    parts.append("Header:\n")
+    parts.append(f"  seq: {msg.header.seq}\n")
+    parts.append(f"  stamp: {msg.header.stamp.secs}.{msg.header.stamp.nsecs:09d}\n")
+    parts.append(f"  frame_id: {msg.header.frame_id}\n")
+
+    # 写入点信息
+    parts.append("Points:\n")
+    parts.extend(f"  - x: {point.x}, y: {point.y}, z: {point.z}\n" for point in msg.points)
+
+    # 写入通道信息
+    parts.append("Channels:\n")
+    for channel in msg.channels:
+        parts.append(f"  - name: {channel.name}\n")
+        parts.append("    values:\n")
+        parts.extend(f"      - {value}\n" for value in channel.values)
+
+    parts.append("\n")
+
+    file.write("".join(parts))
+
+
+def process_bag_file(bag_file, topics_to_check, mode="hex"):
+    if not os.path.isfile(bag_file):
+        print(f"Error: Bag file '{bag_file}' not found.")
+        return
+
+    bag_base_name = os.path.splitext(os.path.basename(bag_file))[0]
+    output_txt_pc2 = f"{bag_base_name}_PointCloud2.txt"
+    output_txt_pc = f"{bag_base_name}_PointCloud.txt"
+
+    # fields 模式下按字段解码 PointCloud2
+    decoder = PointCloud2Decoder(skip_nans=False) if mode == "fields" else None
+
+    # 每个输出文件在整个 bag 处理期间只打开一次，有数据时才创建
+    files = {}
+
+    def get_file(filename):
+        file = files.get(filename)
+        if file is None:
+            file = open(filename, "w", buffering=WRITE_BUFFER_SIZE)
+            files[filename] = file
+        return file
+
+    try:
+        # 不依赖 ROS 直接读取 bag，只解压包含所选话题的块
+        with BagReader(bag_file) as bag:
+            message_count = 0
+            for topic, serialized_msg, timestamp_ns, msg_type in bag.read_messages(
+                topics=topics_to_check
+            ):
+                # 与原来一样，所选话题上的每条消息都计入编号，只有点云消息需要反序列化
+                message_count += 1
+                if msg_type not in POINTCLOUD_TYPES:
+                    continue
+                msg = deserialize_message(serialized_msg, msg_type)
+
+                # 处理 PointCloud2
+                if msg._type == "sensor_msgs/PointCloud2":
+                    save_pointcloud2_to_txt(
+                        msg, get_file(output_txt_pc2), message_count, decoder, topic
+                    )
+
+                # 处理 PointCloud
+                elif msg._type == "sensor_msgs/PointCloud":
+                    save_pointcloud_to_txt(msg, get_file(output_txt_pc), message_count)
+
+            print(f"Processed {message_count} messages from {bag_file}")
+    finally:
+        for file in files.values():
+            file.close()
+
+
+def convert(options):
+    """处理 options.bag_files 中的每个 bag 文件"""
+    for bag_file in options.bag_files:
+        process_bag_file(bag_file, options.topics_to_check, options.data_mode)
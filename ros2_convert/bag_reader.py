@@ -0,0 +1,242 @@
+import bz2
+import heapq
+import struct
+from collections import namedtuple
+
+# ROS1 bag v2.0 文件头
+BAG_MAGIC = b"#ROSBAG V2.0\n"
+
+# 记录类型 (op)
+OP_MSG_DATA = 0x02
+OP_BAG_HEADER = 0x03
+OP_INDEX_DATA = 0x04
+OP_CHUNK = 0x05
+OP_CHUNK_INFO = 0x06
+OP_CONNECTION = 0x07
+
+# 连接信息，与 rosbag 的 connection 记录一致
+ConnectionInfo = namedtuple(
+    "ConnectionInfo", ["id", "topic", "type", "md5sum", "message_definition"]
+)
+
+# 块信息：块在文件中的位置、时间范围以及块内每个连接的消息数
+ChunkInfo = namedtuple(
+    "ChunkInfo", ["pos", "start_time", "end_time", "connection_counts"]
+)
+
+
+def _to_ns(data, offset=0):
+    """ROS1 time (uint32 secs, uint32 nsecs) 转换为纳秒"""
+    secs, nsecs = struct.unpack_from("<II", data, offset)
+    return secs * 1_000_000_000 + nsecs
+
+
+def _parse_header(data):
+    """解析记录头，返回 {字段名: bytes}"""
+    fields = {}
+    pos = 0
+    end = len(data)
+    while pos < end:
+        (field_len,) = struct.unpack_from("<I", data, pos)
+        pos += 4
+        field = data[pos : pos + field_len]
+        pos += field_len
+        name, sep, value = field.partition(b"=")
+        if not sep:
+            raise ValueError(f"Invalid bag record header field: {field[:32]!r}")
+        fields[name.decode()] = value
+    return fields
+
+
+def _decompress(data, compression, uncompressed_size):
+    """按块的压缩方式解压"""
+    if compression == "none":
+        return data
+    if compression == "bz2":
+        data = bz2.decompress(data)
+    elif compression == "lz4":
+        # ROS1 的 roslz4 使用标准 LZ4 frame 格式，需要 pip install lz4
+        import lz4.frame
+
+        data = lz4.frame.decompress(data)
+    else:
+        raise ValueError(f"Unsupported bag chunk compression '{compression}'")
+    if len(data) != uncompressed_size:
+        raise ValueError(
+            f"Chunk decompressed to {len(data)} bytes, expected {uncompressed_size}"
+        )
+    return data
+
+
+class BagReader:
+    """不依赖 ROS 的 ROS1 bag (v2.0) 读取器
+
+    打开时只读取文件末尾的连接记录和块信息 (chunk info)；读取消息时
+    只解压包含所需话题的块，并通过块后面的索引记录直接定位到所需消息，
+    不会解析其它话题的消息。返回的是原始序列化数据。
+    """
+
+    def __init__(self, bag_file):
+        self.bag_file = bag_file
+        self.file = open(bag_file, "rb")
+        try:
+            self._read_index()
+        except Exception:
+            self.file.close()
+            raise
+
+    def _read_record(self):
+        """读取当前位置的一条记录，返回 (header, data)"""
+        (header_len,) = struct.unpack("<I", self.file.read(4))
+        header = _parse_header(self.file.read(header_len))
+        (data_len,) = struct.unpack("<I", self.file.read(4))
+        data = self.file.read(data_len)
+        return header, data
+
+    def _read_record_header(self):
+        """只读取记录头，返回 (header, data_len)，文件指针停在数据开始处"""
+        (header_len,) = struct.unpack("<I", self.file.read(4))
+        header = _parse_header(self.file.read(header_len))
+        (data_len,) = struct.unpack("<I", self.file.read(4))
+        return header, data_len
+
+    def _read_index(self):
+        if self.file.read(len(BAG_MAGIC)) != BAG_MAGIC:
+            raise ValueError(f"'{self.bag_file}' is not a ROS1 bag v2.0 file")
+
+        header, _ = self._read_record()
+        if header["op"][0] != OP_BAG_HEADER:
+            raise ValueError(f"'{self.bag_file}' has no bag header record")
+        (index_pos,) = struct.unpack("<Q", header["index_pos"])
+        (conn_count,) = struct.unpack("<I", header["conn_count"])
+        (chunk_count,) = struct.unpack("<I", header["chunk_count"])
+        if index_pos == 0:
+            raise ValueError(
+                f"'{self.bag_file}' is not indexed, run 'rosbag reindex' first"
+            )
+
+        # 文件末尾依次为所有连接记录和块信息记录
+        self.file.seek(index_pos)
+        self.connections = {}
+        for _ in range(conn_count):
+            header, data = self._read_record()
+            (conn_id,) = struct.unpack("<I", header["conn"])
+            conn_header = _parse_header(data)
+            self.connections[conn_id] = ConnectionInfo(
+                conn_id,
+                header["topic"].decode(),
+                conn_header["type"].decode(),
+                conn_header.get("md5sum", b"").decode(),
+                conn_header.get("message_definition", b"").decode(),
+            )
+
+        self.chunks = []
+        for _ in range(chunk_count):
+            header, data = self._read_record()
+            (chunk_pos,) = struct.unpack("<Q", header["chunk_pos"])
+            (count,) = struct.unpack("<I", header["count"])
+            connection_counts = dict(
+                struct.iter_unpack("<II", data[: count * 8])
+            )
+            self.chunks.append(
+                ChunkInfo(
+                    chunk_pos,
+                    _to_ns(header["start_time"]),
+                    _to_ns(header["end_time"]),
+                    connection_counts,
+                )
+            )
+        self.chunks.sort(key=lambda chunk: (chunk.start_time, chunk.pos))
+
+    def get_all_topics_and_types(self):
+        """返回所有连接信息（同一话题可能有多个连接）"""
+        return list(self.connections.values())
+
+    def resolve_connections(self, msg_types=None, topics=None):
+        """根据消息类型和话题名筛选连接，返回 {conn_id: ConnectionInfo}"""
+        selected = {}
+        for info in self.connections.values():
+            if msg_types is not None and info.type not in msg_types:
+                continue
+            if topics is not None and info.topic not in topics:
+                continue
+            selected[info.id] = info
+        return selected
+
+    def message_count(self, msg_types=None, topics=None):
+        """根据块信息统计符合条件的消息数，不读取消息"""
+        selected = self.resolve_connections(msg_types, topics)
+        return sum(
+            count
+            for chunk in self.chunks
+            for conn_id, count in chunk.connection_counts.items()
+            if conn_id in selected
+        )
+
+    def _read_chunk(self, chunk, selected):
+        """解压块，并根据块后面的索引记录找出所需消息的 (时间, 偏移, 连接)"""
+        self.file.seek(chunk.pos)
+        header, data = self._read_record()
+        if header["op"][0] != OP_CHUNK:
+            raise ValueError(f"Expected chunk record at {chunk.pos}")
+        (uncompressed_size,) = struct.unpack("<I", header["size"])
+        data = _decompress(data, header["compression"].decode(), uncompressed_size)
+
+        # 块后面紧跟着块内每个连接的索引记录，不需要的连接直接跳过数据
+        entries = []
+        for _ in range(len(chunk.connection_counts)):
+            index_header, data_len = self._read_record_header()
+            if index_header["op"][0] != OP_INDEX_DATA:
+                raise ValueError(f"Expected index record after chunk at {chunk.pos}")
+            (conn_id,) = struct.unpack("<I", index_header["conn"])
+            if conn_id not in selected:
+                self.file.seek(data_len, 1)
+                continue
+            index_data = self.file.read(data_len)
+            for secs, nsecs, offset in struct.iter_unpack("<III", index_data):
+                entries.append((secs * 1_000_000_000 + nsecs, offset, conn_id))
+        entries.sort()
+        return data, entries
+
+    def read_messages(self, msg_types=None, topics=None):
+        """按时间顺序读取符合条件的消息（与 rosbag 的顺序相同）
+
+        返回 (topic, serialized_msg, timestamp_ns, msg_type) 的迭代器，与
+        Db3Reader.read_messages 相同；不包含所需连接的块不会被读取和解压。
+        """
+        selected = self.resolve_connections(msg_types, topics)
+        if not selected:
+            return
+
+        chunks = [
+            chunk
+            for chunk in self.chunks
+            if any(conn_id in selected for conn_id in chunk.connection_counts)
+        ]
+        # 多个话题时块的时间范围通常重叠：按开始时间读取，下一个块开始之前的消息才产出
+        heap = []
+        for i, chunk in enumerate(chunks):
+            data, entries = self._read_chunk(chunk, selected)
+            for timestamp_ns, offset, conn_id in entries:
+                # 块内的消息记录：header_len + header + data_len + data
+                (header_len,) = struct.unpack_from("<I", data, offset)
+                pos = offset + 4 + header_len
+                (data_len,) = struct.unpack_from("<I", data, pos)
+                pos += 4
+                heapq.heappush(
+                    heap, (timestamp_ns, chunk.pos, offset, conn_id, data[pos : pos + data_len])
+                )
+            next_start = chunks[i + 1].start_time if i + 1 < len(chunks) else None
+            while heap and (next_start is None or heap[0][0] < next_start):
+                timestamp_ns, _, _, conn_id, message = heapq.heappop(heap)
+                info = selected[conn_id]
+                yield info.topic, message, timestamp_ns, info.type
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
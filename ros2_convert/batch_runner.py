@@ -0,0 +1,85 @@
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# 处理的 bag 文件扩展名：rosbag2 的 sqlite3（包括 FILE 模式压缩的 .db3.zstd）和 MCAP 存储
+BAG_EXTENSIONS = (".db3", ".db3.zstd", ".mcap")
+
+
+def find_db3_files(parent_dir, output_parent_dir):
+    """遍历主目录下的 DB3/MCAP 文件，返回 [(db3_file, output_dir)]
+
+    输出目录与输入目录结构一致；按文件大小从大到小排序，
+    让大文件先开始，减少最后只剩一个大文件在跑的拖尾时间。
+    """
+    jobs = []
+    for root, dirs, files in os.walk(parent_dir):
+        for file in files:
+            if file.endswith(BAG_EXTENSIONS):
+                db3_file = os.path.join(root, file)
+                relative_path = os.path.relpath(root, parent_dir)
+                output_dir = os.path.join(output_parent_dir, relative_path)
+                jobs.append((db3_file, output_dir))
+    return sort_jobs(jobs)
+
+
+def sort_jobs(jobs):
+    """按任务第一项（bag 文件）的大小从大到小排序"""
+    return sorted(jobs, key=lambda job: os.path.getsize(job[0]), reverse=True)
+
+
+def _run_job(func, db3_file, output_dir, args):
+    """在子进程中处理单个文件，异常只记录不抛出，不影响其它文件"""
+    start = time.time()
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        func(db3_file, output_dir, *args)
+        return db3_file, None, time.time() - start
+    except Exception:
+        return db3_file, traceback.format_exc(), time.time() - start
+
+
+def run_batch(func, jobs, num_workers=None, args=()):
+    """用进程池并行执行 func(db3_file, output_dir, *args, *job_args)
+
+    jobs 中每一项为 (db3_file, output_dir, *job_args)，job_args 为每个任务自己的参数
+    （如分卷 bag 中各分卷的起始帧号）。num_workers 为 None 时使用全部 CPU 核数，
+    为 1 时在当前进程中顺序执行。返回 [(db3_file, error, elapsed)]，error 为 None 表示成功。
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    results = []
+    if num_workers <= 1 or len(jobs) <= 1:
+        for db3_file, output_dir, *job_args in jobs:
+            print(f"开始处理 {db3_file} ...")
+            results.append(_run_job(func, db3_file, output_dir, (*args, *job_args)))
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = {}
+            for db3_file, output_dir, *job_args in jobs:
+                print(f"开始处理 {db3_file} ...")
+                future = executor.submit(
+                    _run_job, func, db3_file, output_dir, (*args, *job_args)
+                )
+                futures[future] = db3_file
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # 子进程异常退出（如被 OOM kill）时，这里收到 BrokenProcessPool
+                    results.append((futures[future], repr(e), 0.0))
+
+    print_summary(results)
+    return results
+
+
+def print_summary(results):
+    """打印批量处理汇总"""
+    failed = [result for result in results if result[1] is not None]
+    print("")
+    print(f"共处理 {len(results)} 个文件，成功 {len(results) - len(failed)} 个，失败 {len(failed)} 个")
+    for db3_file, error, elapsed in failed:
+        print(f"失败: {db3_file} ({elapsed:.1f}s)")
+        print(error)
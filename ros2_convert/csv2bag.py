@@ -0,0 +1,128 @@
+"""IMU CSV -> rosbag2 (db3)
+
+设置通过 Options 显式传入，各设置的含义见 imu-csv_to_db3/csv2bag.py 开头的说明。
+"""
+import math  # 用于角度转弧度
+import numpy as np
+from collections import namedtuple
+from .db3_writer import Db3Writer
+
+# 设置名及默认值，与 imu-csv_to_db3/csv2bag.py 开头的设置同名
+DEFAULTS = {
+    'csv_file_path': None,
+    'bag_dir': 'imu_data',
+    'topic_name': '/imu/data',
+    'frame_id': 'imu_frame',
+    'timestamp_column': 7,
+    'timestamp_to_ns': 1_000_000,
+    'relative_time': True,
+    'column_mapping': {
+        'linear_acceleration_x': (1, 1.0),
+        'linear_acceleration_y': (2, 1.0),
+        'linear_acceleration_z': (3, 1.0),
+        'angular_velocity_x': (4, math.pi / 180),  # 转换为 rad/s
+        'angular_velocity_y': (5, math.pi / 180),  # 转换为 rad/s
+        'angular_velocity_z': (6, math.pi / 180),  # 转换为 rad/s
+    },
+    'chunk_rows': 200_000,
+}
+
+Options = namedtuple('Options', DEFAULTS, defaults=DEFAULTS.values())
+
+# sensor_msgs/msg/Imu 中 header 之后的 37 个 float64，顺序与消息定义一致
+IMU_FLOAT_FIELDS = (
+    ['orientation_x', 'orientation_y', 'orientation_z', 'orientation_w']
+    + [f'orientation_covariance_{i}' for i in range(9)]
+    + ['angular_velocity_x', 'angular_velocity_y', 'angular_velocity_z']
+    + [f'angular_velocity_covariance_{i}' for i in range(9)]
+    + ['linear_acceleration_x', 'linear_acceleration_y', 'linear_acceleration_z']
+    + [f'linear_acceleration_covariance_{i}' for i in range(9)]
+)
+
+
+def imu_cdr_dtype(frame_id):
+    """sensor_msgs/msg/Imu 的 CDR (小端) 布局，frame_id 固定时消息定长"""
+    frame_id_size = len(frame_id.encode()) + 1  # 含结尾的 0
+    # float64 按 8 字节对齐，对齐位置从 4 字节封装头之后开始计算
+    values_offset = 4 + ((12 + frame_id_size + 7) & ~7)
+    return np.dtype({
+        'names': ['encapsulation', 'sec', 'nanosec', 'frame_id_size', 'frame_id', 'values'],
+        'formats': [('u1', 4), '<i4', '<u4', '<u4', f'S{frame_id_size}', ('<f8', len(IMU_FLOAT_FIELDS))],
+        'offsets': [0, 4, 8, 12, 16, values_offset],
+        'itemsize': values_offset + 8 * len(IMU_FLOAT_FIELDS),
+    })
+
+
+def serialize_imu_batch(stamps_ns, values, frame_id):
+    """把一批 IMU 数据一次性序列化为 CDR，返回每条消息的 bytes 列表
+
+    values 为 (N, 37) 的 float64 数组，列顺序同 IMU_FLOAT_FIELDS。
+    """
+    dtype = imu_cdr_dtype(frame_id)
+    msgs = np.zeros(len(stamps_ns), dtype=dtype)
+    msgs['encapsulation'] = (0, 1, 0, 0)  # CDR 小端
+    msgs['sec'], msgs['nanosec'] = np.divmod(stamps_ns, 1_000_000_000)
+    msgs['frame_id_size'] = dtype.fields['frame_id'][0].itemsize
+    msgs['frame_id'] = frame_id.encode()
+    msgs['values'] = values
+
+    blob = msgs.tobytes()
+    size = dtype.itemsize
+    return [blob[i:i + size] for i in range(0, len(blob), size)]
+
+
+def stamps_to_ns(stamps, timestamp_to_ns):
+    """把时间戳列换算为 int64 纳秒
+
+    整数列乘整数系数时精确计算；浮点列（如以秒为单位的 100.25）的整数部分精确
+    换算，小数部分按 float64 乘系数后四舍五入，不丢失小数部分。
+    """
+    if not float(timestamp_to_ns).is_integer():
+        return np.rint(stamps.astype(np.float64) * timestamp_to_ns).astype(np.int64)
+    scale = int(timestamp_to_ns)
+    if np.issubdtype(stamps.dtype, np.integer):
+        return stamps.astype(np.int64) * scale
+    # 毫秒级 Unix 时间戳乘 1e6 后超出 float64 的精确范围，整数部分单独按 int64 计算
+    stamps = stamps.astype(np.float64)
+    whole = np.floor(stamps)
+    return whole.astype(np.int64) * scale + np.rint((stamps - whole) * scale).astype(np.int64)
+
+
+def csv_to_db3(csv_file_path, bag_dir, options=Options()):
+    """把 IMU CSV 转换为 rosbag2 (db3) 包，话题名、列对应关系等取自 options"""
+    import pandas as pd
+
+    timestamp_column = options.timestamp_column
+    column_mapping = options.column_mapping
+    topic_name, frame_id = options.topic_name, options.frame_id
+
+    columns = [timestamp_column] + [column for column, _ in column_mapping.values()]
+    field_index = {name: IMU_FLOAT_FIELDS.index(name) for name in column_mapping}
+    first_timestamp = None
+
+    with Db3Writer(bag_dir) as writer:
+        writer.add_topic(topic_name, 'sensor_msgs/msg/Imu')
+
+        # 跳过第一行（表头），按列批量解析，列名即列号
+        for chunk in pd.read_csv(csv_file_path, header=None, skiprows=1,
+                                 usecols=sorted(set(columns)), chunksize=options.chunk_rows):
+            stamps_ns = stamps_to_ns(chunk[timestamp_column].to_numpy(), options.timestamp_to_ns)
+            if options.relative_time:
+                # 计算相对于第一个时间戳的时间
+                if first_timestamp is None:
+                    first_timestamp = stamps_ns[0]
+                stamps_ns = stamps_ns - first_timestamp
+
+            # 填充 IMU 数据，未映射的字段（如四元数、协方差）为 0
+            values = np.zeros((len(chunk), len(IMU_FLOAT_FIELDS)), dtype=np.float64)
+            for name, (column, scale) in column_mapping.items():
+                values[:, field_index[name]] = chunk[column].to_numpy(dtype=np.float64) * scale
+
+            writer.write_batch(topic_name, stamps_ns, serialize_imu_batch(stamps_ns, values, frame_id))
+
+        print(f"Wrote {writer.message_count} IMU messages to {writer.db3_file}")
+
+
+def convert(options):
+    """把 options.csv_file_path 转换为 options.bag_dir 中的 rosbag2 包"""
+    csv_to_db3(options.csv_file_path, options.bag_dir, options)
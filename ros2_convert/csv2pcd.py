@@ -0,0 +1,57 @@
+"""点云 CSV -> PCD
+
+设置通过 Options 显式传入，各设置的含义见 pointcloud-csv_to_pcd/csv2pcd.py 开头的说明。
+"""
+from collections import namedtuple
+from .pcd_format import to_structured, write_pcd
+
+# 设置名及默认值，与 pointcloud-csv_to_pcd/csv2pcd.py 开头的设置同名
+DEFAULTS = {
+    "csv_file_path": None,
+    "pcd_file_path": None,
+    "required_columns": ("X_m", "Y_m", "Z_m", "Vx_ms", "RCS_dbm2", "Time_ms", "probability", "snr"),
+    "data_format": "ascii",
+}
+
+Options = namedtuple("Options", DEFAULTS, defaults=DEFAULTS.values())
+
+
+def csv_to_pcd(csv_file_path, pcd_file_path, required_columns, data_format="ascii", column_dtypes=None):
+    """把 CSV 的指定列转换为 PCD 文件
+
+    data_format 为 ascii、binary 或 binary_compressed；
+    SIZE/TYPE 由各列的实际 dtype 决定，column_dtypes 可以指定列的类型，
+    例如 {"X_m": "float32"}。
+    """
+    import pandas as pd
+
+    try:
+        # 读取CSV文件
+        df = pd.read_csv(csv_file_path)
+
+        # 检查是否包含所需的列
+        for col in required_columns:
+            if col not in df.columns:
+                raise ValueError(f"Missing required column: {col}")
+
+        # 按需转换列类型
+        if column_dtypes:
+            df = df.astype(column_dtypes)
+
+        # 提取点云数据为结构化数组，每列保留自己的类型
+        points = to_structured(df, required_columns)
+
+        # 写入PCD文件
+        write_pcd(pcd_file_path, points, data_format)
+
+        print(f"PCD file saved to {pcd_file_path}")
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+
+def convert(options):
+    """把 options.csv_file_path 的指定列转换为 options.pcd_file_path"""
+    csv_to_pcd(
+        options.csv_file_path, options.pcd_file_path, options.required_columns, options.data_format
+    )
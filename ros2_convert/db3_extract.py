@@ -0,0 +1,199 @@
+"""读取一遍 rosbag2 (db3/mcap)，同时提取点云、图像和 IMU
+
+设置通过 Options 显式传入，进程池中的任务也把 Options 作为参数传给子进程，
+不读取模块级变量。各设置的含义见 multi-db3_extract/db3_extract.py 开头的说明。
+"""
+import os
+import shutil
+from collections import namedtuple
+from .db3_reader import open_reader
+from .batch_runner import run_batch, sort_jobs
+from .extract_handlers import HANDLERS
+from .run_stats import RunStats, report_file
+from .split_bag import find_bags, merge_split_outputs, plan_splits
+
+# 设置名及默认值，与 multi-db3_extract/db3_extract.py 开头的设置同名
+DEFAULTS = {
+    "parent_dir": None,
+    "output_parent_dir": None,
+    "topics_to_process": None,
+    "extractors": {
+        "pointcloud": {"chunk_points": 200_000, "output_format": "csv", "layout": "flat"},
+        "image": {
+            "num_threads": 4,
+            "queue_size": 64,
+            "compressed_passthrough": False,
+            "normalize_16bit": False,
+        },
+        "imu": {"output_format": "csv"},
+    },
+    "start_time": None,
+    "end_time": None,
+    "time_base": "bag",
+    "window_relative": True,
+    "index_dir": None,
+    "progress_interval": 5,
+    "trace_memory": False,
+    "run_report": True,
+    "num_workers": None,
+}
+
+Options = namedtuple("Options", DEFAULTS, defaults=DEFAULTS.values())
+
+
+def print_results(db3_file, results):
+    """打印每个提取器的处理结果"""
+    print(f"'{db3_file}' 处理完成：")
+    for result in results:
+        print(
+            f"  [{result['name']}] 消息 {result['messages']} 条，"
+            f"话题 {len(result['topics'])} 个，错误 {result['errors']} 个"
+        )
+        for topic, count in result["topics"].items():
+            print(f"    {topic}: {count}")
+
+
+def extractor_msg_types(extractors):
+    """所有启用的提取器处理的消息类型"""
+    return [msg_type for name in extractors for msg_type in HANDLERS[name].msg_types]
+
+
+def process_db3_file(db3_file, output_dir, options, topics=None, frame_offsets=None, window=None):
+    """读取一遍 db3 文件，把点云、图像、IMU 消息分别交给对应的提取器，options 为 Options
+
+    处理分卷 bag 的一个分卷时，frame_offsets 为各话题的起始帧号（前面分卷的帧数），
+    window 为按整个 bag 换算好的 [start_ns, end_ns] 时间窗口。
+    返回每个提取器的处理结果列表。
+    """
+    if not os.path.isfile(db3_file):
+        print(f"Error: DB3 file '{db3_file}' not found.")
+        return []
+
+    # db3 直接读取 sqlite 表、mcap 按块索引读取，只查询提取器需要的消息类型
+    # FILE 模式压缩的 .db3.zstd 解压到输出目录中的临时文件，不占用内存
+    reader = open_reader(db3_file, index_dir=options.index_dir, temp_dir=output_dir)
+
+    # 打开后到进入 with 之前出错时也要关闭，删除 .db3.zstd 解压出的临时文件
+    try:
+        # 指定时间窗口时通过时间索引只读取窗口内的消息
+        if window is None:
+            start_ns, end_ns = reader.window_ns(
+                options.start_time, options.end_time, options.time_base, options.window_relative
+            )
+        else:
+            start_ns, end_ns = window
+
+        extractors = options.extractors
+        msg_types = extractor_msg_types(extractors)
+        # 各话题的消息数，用于预先分配 IMU 解码结果数组和估算剩余时间
+        message_counts = reader.topic_message_counts(
+            msg_types, topics, start_ns, end_ns, options.time_base
+        )
+        # 所有提取器共用一个 stats，按阶段、按话题统计耗时，定时输出进度
+        total = sum(message_counts.values()) if options.progress_interval is not None else None
+        stats = RunStats(
+            os.path.basename(db3_file), total, options.progress_interval, options.trace_memory
+        )
+
+        handlers = [
+            HANDLERS[name](output_dir, stats=stats, **handler_options)
+            for name, handler_options in extractors.items()
+        ]
+        for handler in handlers:
+            handler.prepare(frame_offsets, message_counts)
+        # 消息类型 -> 提取器
+        routes = {msg_type: handler for handler in handlers for msg_type in handler.msg_types}
+
+        print(f"开始处理 db3 文件 '{db3_file}'，提取器：{', '.join(extractors)}")
+    except BaseException:
+        reader.close()
+        raise
+
+    with reader:
+        try:
+            messages = reader.read_messages(
+                msg_types=msg_types,
+                topics=topics,
+                start_ns=start_ns,
+                end_ns=end_ns,
+                time_base=options.time_base,
+            )
+            for topic, serialized_msg, timestamp_ns, msg_type in stats.iterate(messages):
+                handler = routes[msg_type]
+                try:
+                    handler.handle(topic, msg_type, serialized_msg, timestamp_ns)
+                except Exception as e:
+                    handler.errors += 1
+                    print(f"Error processing message from topic '{topic}': {e}")
+                stats.message(topic, len(serialized_msg))
+        finally:
+            # 出错时也关闭所有提取器，写出已经处理的数据
+            for handler in handlers:
+                try:
+                    handler.close()
+                except Exception as e:
+                    handler.errors += 1
+                    print(f"Error closing {handler.name} extractor: {e}")
+
+    results = [handler.result() for handler in handlers]
+    print_results(db3_file, results)
+    stats.close()
+    stats.print_summary()
+    if options.run_report:
+        stats.save(report_file(output_dir, db3_file, "extract"), {"extractors": results})
+    return results
+
+
+def merge_split_bag(bag_dir, output_dir, part_root, part_dirs):
+    """把各分卷的输出合并到输出目录（IMU 的 TXT 没有表头，直接拼接）"""
+    merge_split_outputs(part_dirs, output_dir, headerless=("Imu.txt",))
+    shutil.rmtree(part_root, ignore_errors=True)
+    print(f"'{bag_dir}' 的 {len(part_dirs)} 个分卷已合并到 {output_dir}")
+
+
+def convert(options):
+    """处理 options.parent_dir 下所有 DB3 文件，多个文件由进程池并行处理
+
+    结果写入 options.output_parent_dir，返回 [(文件, 错误, 耗时)]。
+    metadata.yaml 中列出多个分卷的 bag 按整个 bag 处理：各分卷作为单独的任务并行处理，
+    每个话题的帧号从前面分卷的帧数继续编号，全部成功后合并为一份输出。
+    """
+    topics = options.topics_to_process
+
+    # 确保输出目录存在
+    os.makedirs(options.output_parent_dir, exist_ok=True)
+    jobs, bags = find_bags(options.parent_dir, options.output_parent_dir)
+
+    merges = []
+    msg_types = extractor_msg_types(options.extractors)
+    for bag in bags:
+        window, splits = plan_splits(
+            bag,
+            msg_types,
+            topics,
+            options.start_time,
+            options.end_time,
+            options.time_base,
+            options.window_relative,
+            options.index_dir,
+            bag.output_dir,
+        )
+        # 各分卷先输出到 .split_<bag 目录名> 下各自的子目录
+        part_root = os.path.join(bag.output_dir, f".split_{os.path.basename(bag.bag_dir)}")
+        part_dirs = []
+        for split_file, frame_offsets in splits:
+            part_dir = os.path.join(part_root, os.path.basename(split_file))
+            jobs.append((split_file, part_dir, frame_offsets, window))
+            part_dirs.append(part_dir)
+        merges.append((bag.bag_dir, bag.output_dir, part_root, part_dirs, bag.files))
+
+    # Options 作为参数传给子进程中的任务
+    workers = options.num_workers
+    results = run_batch(process_db3_file, sort_jobs(jobs), workers, (options, topics))
+
+    # 有分卷失败的 bag 不合并
+    failed = {db3_file for db3_file, error, _ in results if error is not None}
+    merges = [merge[:4] for merge in merges if failed.isdisjoint(merge[4])]
+    if merges:
+        results += run_batch(merge_split_bag, merges, workers)
+    return results
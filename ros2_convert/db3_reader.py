@@ -0,0 +1,458 @@
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# 话题信息，与 rosbag2_py.TopicMetadata 的 name/type 字段保持一致
+TopicInfo = namedtuple("TopicInfo", ["id", "name", "type", "serialization_format"])
+
+# 时间窗口可以按 bag 记录时间（messages.timestamp）或消息头时间（header.stamp）截取
+TIME_BASES = ("bag", "header")
+
+# 索引文件的版本，结构变化时递增，旧索引会被重建
+INDEX_VERSION = 1
+
+# 索引文件的表结构：每条消息一行，只有话题、两种时间戳和 messages.id，不含数据
+INDEX_SCHEMA_SQL = [
+    "CREATE TABLE index_info(key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    "CREATE TABLE msg_index(topic_id INTEGER NOT NULL, timestamp INTEGER NOT NULL, "
+    "header_ns INTEGER, msg_id INTEGER NOT NULL)",
+]
+INDEX_CREATE_SQL = [
+    "CREATE INDEX bag_time_idx ON msg_index (topic_id, timestamp, msg_id)",
+    "CREATE INDEX header_time_idx ON msg_index (topic_id, header_ns, msg_id)",
+]
+
+
+# zstd 帧的魔数：rosbag2 压缩模式为 MESSAGE 时每条消息的数据都是一个 zstd 帧，
+# CDR 数据的第一个字节总是 0，不会与之混淆
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+# 压缩模式为 FILE 时整个 db3 文件压缩为 <文件名>.db3.zstd
+ZSTD_FILE_SUFFIX = ".zstd"
+
+
+def decompress_message(data):
+    """解压 MESSAGE 模式压缩的消息数据，未压缩的数据原样返回（需要 pip install zstandard）"""
+    if data[:4] != ZSTD_MAGIC:
+        return data
+    import zstandard
+
+    # decompressobj 不要求帧头中写有原始大小
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def message_head(data, size=12):
+    """消息数据的前 size 个字节，压缩的消息只解压开头部分"""
+    if data[:4] != ZSTD_MAGIC:
+        return data[:size]
+    import zstandard
+
+    with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+        return reader.read(size)
+
+
+def decompress_zstd_file(path, temp_dir=None, read_size=1 << 24):
+    """把 FILE 模式压缩的 <文件名>.db3.zstd 流式解压到临时文件，返回临时文件路径
+
+    临时文件放在 temp_dir 中（None 表示系统临时目录），文件名以 . 开头，由调用方
+    用完后删除。帧头中写有原始大小时先检查剩余空间，空间不够时不开始解压。
+    """
+    import zstandard
+
+    directory = temp_dir or tempfile.gettempdir()
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "rb") as f:
+        size = zstandard.frame_content_size(f.read(18))
+        f.seek(0)
+        if size > 0 and shutil.disk_usage(directory).free < size:
+            raise OSError(
+                f"Not enough space in '{directory}' to decompress '{path}' ({size} bytes)"
+            )
+        fd, temp_file = tempfile.mkstemp(
+            prefix=f".{os.path.basename(path)}.", suffix=".db3", dir=directory
+        )
+        try:
+            with os.fdopen(fd, "wb") as out:
+                zstandard.ZstdDecompressor().copy_stream(
+                    f, out, read_size=read_size, write_size=read_size
+                )
+        except BaseException:
+            os.remove(temp_file)
+            raise
+    return temp_file
+
+
+def header_stamp_ns(head):
+    """从 CDR 数据的前 12 个字节读取 header.stamp（纳秒）
+
+    sensor_msgs 的点云、图像、IMU 消息都以 std_msgs/Header 开头：
+    4 字节封装头之后是 int32 sec 和 uint32 nanosec。数据不足时返回 None。
+    """
+    if head is None or len(head) < 12:
+        return None
+    byte_order = "<" if head[1] == 1 else ">"
+    sec, nanosec = struct.unpack_from(byte_order + "iI", head, 4)
+    return sec * 1_000_000_000 + nanosec
+
+
+def open_reader(bag_file, index_dir=None, temp_dir=None):
+    """按扩展名打开 bag 文件：.mcap 使用 McapReader，其它使用 Db3Reader，两者接口相同
+
+    temp_dir 为 .db3.zstd 解压出的临时文件所在目录，None 表示系统临时目录。
+    """
+    if bag_file.endswith(".mcap"):
+        from .mcap_reader import McapReader
+
+        return McapReader(bag_file)
+    return Db3Reader(bag_file, index_dir=index_dir, temp_dir=temp_dir)
+
+
+def _decompress_rows(rows):
+    """解压一批 (topic_id, data, ...) 查询结果中的消息数据（在工作线程中执行）"""
+    return [(row[0], decompress_message(row[1])) + row[2:] for row in rows]
+
+
+class Db3Reader:
+    """直接读取 rosbag2 sqlite3 (.db3) 文件的 messages/topics 表
+
+    与 SequentialReader 逐条读取全部消息不同，这里先把需要的消息类型/话题
+    解析为 topic_id，再只查询这些话题的行，其它话题的大块数据（如相机图像）
+    不会被读入内存。
+
+    支持 rosbag2 的两种压缩模式：FILE 模式的 <文件名>.db3.zstd 流式解压到 temp_dir
+    中的临时文件再以只读方式打开，关闭时删除（需要能放下整个 db3 文件的磁盘空间）；MESSAGE 模式的消息数据在
+    decompress_threads 个线程中按批提前解压，读取线程只负责反序列化。
+    """
+
+    def __init__(
+        self, db3_file, batch_size=256, index_dir=None, decompress_threads=4, temp_dir=None
+    ):
+        self.db3_file = db3_file
+        self.batch_size = batch_size
+        self.decompress_threads = decompress_threads
+        # 时间窗口索引（旁路文件）所在目录，None 表示放在 db3 文件旁边
+        self.index_dir = index_dir
+        # FILE 模式解压出的临时文件，索引和缓存仍以原来的 .db3.zstd 文件为准
+        self.temp_file = None
+        if db3_file.endswith(ZSTD_FILE_SUFFIX):
+            self.temp_file = decompress_zstd_file(db3_file, temp_dir)
+        # 只读方式打开，避免误写或生成 journal 文件
+        path = self.temp_file or db3_file
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            self.topics = self._load_topics()
+            # 抽查第一条消息判断是否为 MESSAGE 模式压缩
+            row = self.conn.execute("SELECT substr(data, 1, 4) FROM messages LIMIT 1").fetchone()
+        except BaseException:
+            self.close()
+            raise
+        self.compressed_messages = row is not None and row[0] == ZSTD_MAGIC
+        self._index_attached = False
+        # 最近一次产出的消息的读取位置，用于断点续读
+        self.position = None
+
+    def _load_topics(self):
+        """读取 topics 表"""
+        cursor = self.conn.execute(
+            "SELECT id, name, type, serialization_format FROM topics ORDER BY id"
+        )
+        return [TopicInfo(*row) for row in cursor.fetchall()]
+
+    def get_all_topics_and_types(self):
+        """返回所有话题信息，用法与 SequentialReader 相同"""
+        return list(self.topics)
+
+    def resolve_topics(self, msg_types=None, topics=None):
+        """根据消息类型和话题名筛选话题，返回 {topic_id: TopicInfo}
+
+        msg_types、topics 为 None 时表示不按该条件筛选。
+        """
+        selected = {}
+        for info in self.topics:
+            if msg_types is not None and info.type not in msg_types:
+                continue
+            if topics is not None and info.name not in topics:
+                continue
+            selected[info.id] = info
+        return selected
+
+    def message_count(
+        self, msg_types=None, topics=None, start_ns=None, end_ns=None, time_base="bag"
+    ):
+        """统计符合条件的消息数，指定 start_ns/end_ns 时只统计时间窗口内的消息"""
+        return sum(
+            self.topic_message_counts(msg_types, topics, start_ns, end_ns, time_base).values()
+        )
+
+    def topic_message_counts(
+        self, msg_types=None, topics=None, start_ns=None, end_ns=None, time_base="bag"
+    ):
+        """按话题统计符合条件的消息数，返回 {话题: 消息数}"""
+        return self._topic_aggregate("COUNT(*)", msg_types, topics, start_ns, end_ns, time_base)
+
+    def topic_last_timestamps(
+        self, msg_types=None, topics=None, start_ns=None, end_ns=None, time_base="bag"
+    ):
+        """按话题返回符合条件的最后一条消息的录制时间戳（纳秒），返回 {话题: 时间戳}"""
+        return self._topic_aggregate(
+            "MAX(timestamp)", msg_types, topics, start_ns, end_ns, time_base
+        )
+
+    def _topic_aggregate(self, aggregate, msg_types, topics, start_ns, end_ns, time_base):
+        """按话题对符合条件的消息做聚合（COUNT/MAX 等），返回 {话题: 结果}"""
+        selected = self.resolve_topics(msg_types, topics)
+        if not selected:
+            return {}
+        placeholders = ",".join("?" * len(selected))
+        if start_ns is None and end_ns is None:
+            cursor = self.conn.execute(
+                f"SELECT topic_id, {aggregate} FROM messages WHERE topic_id IN ({placeholders}) "
+                "GROUP BY topic_id",
+                list(selected),
+            )
+            return {selected[topic_id].name: value for topic_id, value in cursor.fetchall()}
+
+        # 时间窗口内的消息数只查询索引，不读取 messages 表
+        if time_base not in TIME_BASES:
+            raise ValueError(f"Unsupported time base '{time_base}'")
+        self.ensure_index()
+        column = "timestamp" if time_base == "bag" else "header_ns"
+        conditions = [f"topic_id IN ({placeholders})", f"{column} IS NOT NULL"]
+        params = list(selected)
+        if start_ns is not None:
+            conditions.append(f"{column} >= ?")
+            params.append(start_ns)
+        if end_ns is not None:
+            conditions.append(f"{column} <= ?")
+            params.append(end_ns)
+        cursor = self.conn.execute(
+            f"SELECT topic_id, {aggregate} FROM idx.msg_index WHERE {' AND '.join(conditions)} "
+            "GROUP BY topic_id",
+            params,
+        )
+        return {selected[topic_id].name: value for topic_id, value in cursor.fetchall()}
+
+    @property
+    def index_file(self):
+        """时间窗口索引文件路径：<db3 文件名>.index"""
+        index_dir = self.index_dir or os.path.dirname(os.path.abspath(self.db3_file))
+        return os.path.join(index_dir, os.path.basename(self.db3_file) + ".index")
+
+    def _db3_signature(self):
+        """db3 文件的大小和修改时间，用于判断索引是否过期"""
+        stat = os.stat(self.db3_file)
+        return {"version": INDEX_VERSION, "db3_size": stat.st_size, "db3_mtime_ns": stat.st_mtime_ns}
+
+    def _index_is_valid(self):
+        if not os.path.isfile(self.index_file):
+            return False
+        try:
+            conn = sqlite3.connect(f"file:{self.index_file}?mode=ro", uri=True)
+            try:
+                info = dict(conn.execute("SELECT key, value FROM index_info").fetchall())
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return False
+        return info == self._db3_signature()
+
+    def build_index(self):
+        """扫描一遍 messages 表，建立 (topic_id, 时间戳) 索引并保存为旁路文件
+
+        只读取每条消息的 id、话题、时间戳和数据的前 12 个字节（消息头时间戳；
+        MESSAGE 模式压缩时需要读取整条数据，只解压开头部分），
+        先写入临时文件，完成后再改名，中途中断不会留下不完整的索引。
+        """
+        index_file = self.index_file
+        os.makedirs(os.path.dirname(index_file), exist_ok=True)
+        tmp_file = index_file + ".tmp"
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+        out = sqlite3.connect(tmp_file)
+        try:
+            out.execute("PRAGMA journal_mode=OFF")
+            out.execute("PRAGMA synchronous=OFF")
+            for sql in INDEX_SCHEMA_SQL:
+                out.execute(sql)
+
+            head_column = "data" if self.compressed_messages else "substr(data, 1, 12)"
+            cursor = self.conn.execute(
+                f"SELECT topic_id, timestamp, {head_column}, id FROM messages"
+            )
+            while True:
+                rows = cursor.fetchmany(65536)
+                if not rows:
+                    break
+                out.executemany(
+                    "INSERT INTO msg_index VALUES (?, ?, ?, ?)",
+                    [
+                        (topic_id, timestamp_ns, header_stamp_ns(message_head(head)), msg_id)
+                        for topic_id, timestamp_ns, head, msg_id in rows
+                    ],
+                )
+            cursor.close()
+
+            for sql in INDEX_CREATE_SQL:
+                out.execute(sql)
+            out.executemany(
+                "INSERT INTO index_info VALUES (?, ?)", self._db3_signature().items()
+            )
+            out.commit()
+        finally:
+            out.close()
+        os.replace(tmp_file, index_file)
+
+    def ensure_index(self):
+        """索引不存在或 db3 文件已变化时重建，然后挂载到当前连接"""
+        if self._index_attached:
+            return
+        if not self._index_is_valid():
+            print(f"建立时间索引 '{self.index_file}' ...")
+            self.build_index()
+        self.conn.execute(
+            "ATTACH DATABASE ? AS idx", (f"file:{self.index_file}?mode=ro",)
+        )
+        self._index_attached = True
+
+    def time_range(self, time_base="bag"):
+        """返回整个 bag 的 (最早, 最晚) 时间戳（纳秒），没有消息时返回 (None, None)"""
+        if time_base == "bag":
+            # messages.timestamp 上有 rosbag2 自带的 timestamp_idx 索引
+            sql = "SELECT MIN(timestamp), MAX(timestamp) FROM messages"
+        elif time_base == "header":
+            self.ensure_index()
+            sql = "SELECT MIN(header_ns), MAX(header_ns) FROM idx.msg_index"
+        else:
+            raise ValueError(f"Unsupported time base '{time_base}'")
+        return self.conn.execute(sql).fetchone()
+
+    def window_ns(self, start_time=None, end_time=None, time_base="bag", relative=False):
+        """把以秒为单位的时间窗口换算为纳秒
+
+        relative 为 True 时 start_time/end_time 是相对 bag 最早时间戳的秒数，
+        否则为绝对时间（Unix 时间戳，秒）。None 表示该端不限制。
+        """
+        offset_ns = 0
+        if relative and (start_time is not None or end_time is not None):
+            offset_ns = self.time_range(time_base)[0] or 0
+        start_ns = None if start_time is None else offset_ns + round(start_time * 1e9)
+        end_ns = None if end_time is None else offset_ns + round(end_time * 1e9)
+        return start_ns, end_ns
+
+    def _window_query(self, selected, start_ns, end_ns, time_base, resume_after):
+        """通过索引只查询时间窗口内的消息"""
+        if time_base not in TIME_BASES:
+            raise ValueError(f"Unsupported time base '{time_base}'")
+        self.ensure_index()
+
+        column = "i.timestamp" if time_base == "bag" else "i.header_ns"
+        conditions = [f"i.topic_id IN ({','.join('?' * len(selected))})"]
+        params = list(selected)
+        if start_ns is not None:
+            conditions.append(f"{column} >= ?")
+            params.append(start_ns)
+        if end_ns is not None:
+            conditions.append(f"{column} <= ?")
+            params.append(end_ns)
+        if time_base == "header":
+            conditions.append(f"{column} IS NOT NULL")
+        if resume_after is not None:
+            conditions.append(f"({column}, i.msg_id) > (?, ?)")
+            params.extend(resume_after)
+
+        return self.conn.execute(
+            f"SELECT m.topic_id, m.data, m.timestamp, {column}, i.msg_id "
+            "FROM idx.msg_index AS i JOIN messages AS m ON m.id = i.msg_id "
+            f"WHERE {' AND '.join(conditions)} ORDER BY {column}, i.msg_id",
+            params,
+        )
+
+    def _iter_batches(self, cursor):
+        """按批产出查询结果，MESSAGE 模式压缩时后面的批在线程池中提前解压"""
+        batches = iter(lambda: cursor.fetchmany(self.batch_size), [])
+        if not self.compressed_messages:
+            yield from batches
+            return
+        if self.decompress_threads <= 0:
+            for rows in batches:
+                yield _decompress_rows(rows)
+            return
+
+        executor = ThreadPoolExecutor(self.decompress_threads)
+        pending = deque()
+        try:
+            for rows in batches:
+                pending.append(executor.submit(_decompress_rows, rows))
+                # 最多提前解压 2 * decompress_threads 批，限制内存占用
+                if len(pending) > 2 * self.decompress_threads:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def read_messages(
+        self,
+        msg_types=None,
+        topics=None,
+        start_ns=None,
+        end_ns=None,
+        time_base="bag",
+        resume_after=None,
+    ):
+        """按时间戳顺序读取符合条件的消息
+
+        返回 (topic, serialized_msg, timestamp_ns, msg_type) 的迭代器，
+        不符合条件的话题的数据行不会被查询。指定 start_ns/end_ns（闭区间）时
+        按 time_base（"bag" 或 "header"）截取时间窗口：第一次使用时建立索引，
+        之后只读取窗口内的行。
+
+        每产出一条消息，self.position 更新为该消息的读取位置（排序时间戳, 消息 id）；
+        把保存下来的 position 作为 resume_after 传入，可以从这条消息之后继续读取。
+        """
+        selected = self.resolve_topics(msg_types, topics)
+        if not selected:
+            return
+
+        if start_ns is not None or end_ns is not None:
+            cursor = self._window_query(selected, start_ns, end_ns, time_base, resume_after)
+        else:
+            condition = f"topic_id IN ({','.join('?' * len(selected))})"
+            params = list(selected)
+            if resume_after is not None:
+                condition += " AND (timestamp, id) > (?, ?)"
+                params.extend(resume_after)
+            cursor = self.conn.execute(
+                "SELECT topic_id, data, timestamp, timestamp, id FROM messages "
+                f"WHERE {condition} ORDER BY timestamp, id",
+                params,
+            )
+        try:
+            for rows in self._iter_batches(cursor):
+                for topic_id, data, timestamp_ns, order_ns, msg_id in rows:
+                    info = selected[topic_id]
+                    self.position = (order_ns, msg_id)
+                    yield info.name, data, timestamp_ns, info.type
+        finally:
+            cursor.close()
+
+    def close(self):
+        self.conn.close()
+        if self.temp_file is not None:
+            os.remove(self.temp_file)
+            self.temp_file = None
+
+    def __del__(self):
+        # 打开后没有 close（如 with 之前出错）时也删除解压出的临时文件
+        if getattr(self, "temp_file", None) is not None:
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,317 @@
+"""rosbag2 (db3/mcap) 中的点云 -> CSV/Parquet/Feather
+
+设置通过 Options 显式传入，进程池中的任务也把 Options 作为参数传给子进程，
+不读取模块级变量，spawn/forkserver 启动的子进程与 fork 结果相同。
+各设置的含义见 pointcloud-db3_to_csv/db3_to_csv.py 开头的说明。
+"""
+import os
+import shutil
+from collections import namedtuple
+from .db3_reader import open_reader
+from .batch_runner import run_batch, sort_jobs
+from .pointcloud_decoder import PointCloud2Decoder, decode_pointcloud
+from .pointcloud_writer import PointCloudWriterSet
+from .extract_cache import ExtractionJob
+from .run_stats import RunStats, report_file
+from .split_bag import find_bags, merge_split_outputs, plan_splits, previous_timestamps
+from .frame_sampler import FrameSampler
+
+# 设置名及默认值，与 pointcloud-db3_to_csv/db3_to_csv.py 开头的设置同名
+DEFAULTS = {
+    "parent_dir": None,
+    "output_parent_dir": None,
+    "topics_to_process": None,
+    "chunk_points": 200_000,
+    "output_format": "csv",
+    "output_layout": "flat",
+    "start_time": None,
+    "end_time": None,
+    "time_base": "bag",
+    "window_relative": True,
+    "index_dir": None,
+    "sampling": None,
+    "use_cache": True,
+    "content_hash": False,
+    "checkpoint_interval": 60,
+    "progress_interval": 5,
+    "trace_memory": False,
+    "run_report": True,
+    "num_workers": None,
+}
+
+Options = namedtuple("Options", DEFAULTS, defaults=DEFAULTS.values())
+
+
+# 需要提取的点云消息类型
+POINTCLOUD_TYPES = [
+    "sensor_msgs/msg/PointCloud2",
+    "sensor_msgs/msg/PointCloud",
+]
+
+
+def extract_options(options, topics=None):
+    """缓存键包含话题列表和所有影响输出的选项，任何一项变化都会重新提取"""
+    return {
+        "topics": sorted(topics) if topics is not None else None,
+        "output_format": options.output_format,
+        "output_layout": options.output_layout,
+        "window": [options.start_time, options.end_time, options.time_base, options.window_relative],
+        "sampling": options.sampling,
+    }
+
+
+def process_db3_file(
+    db3_file,
+    output_dir,
+    options,
+    topics=None,
+    frame_offsets=None,
+    window=None,
+    last_timestamps=None,
+):
+    """处理单个 DB3 文件并提取并保存点云数据，options 为 Options
+
+    处理分卷 bag 的一个分卷时，frame_offsets 为各话题的起始帧号（前面分卷的帧数），
+    window 为按整个 bag 换算好的 [start_ns, end_ns] 时间窗口，last_timestamps 为
+    前面分卷中各话题最后一条消息的录制时间戳（按录制时间抽帧时接着抽）。
+    """
+    if not os.path.isfile(db3_file):
+        print(f"Error: DB3 file '{db3_file}' not found.")
+        return
+
+    key_options = extract_options(options, topics)
+    if frame_offsets is not None:
+        key_options.update(
+            frame_offsets=frame_offsets, window_ns=window, last_timestamps=last_timestamps
+        )
+    job = ExtractionJob(
+        db3_file,
+        output_dir,
+        "pointcloud",
+        key_options,
+        options.content_hash,
+        options.checkpoint_interval if options.output_format == "csv" else None,
+    )
+    if options.use_cache and job.is_done():
+        print(f"'{db3_file}' 已经提取过，跳过")
+        return
+
+    # ROS2 的消息定义只在真正需要反序列化时导入
+    from sensor_msgs.msg import PointCloud, PointCloud2
+    from rclpy.serialization import deserialize_message
+
+    # db3 直接读取 sqlite 表、mcap 按块索引读取，只查询点云话题的消息
+    # FILE 模式压缩的 .db3.zstd 解压到输出目录中的临时文件，不占用内存
+    reader = open_reader(db3_file, index_dir=options.index_dir, temp_dir=output_dir)
+
+    # 打开后到进入 with 之前出错时也要关闭，删除 .db3.zstd 解压出的临时文件
+    try:
+        # 指定时间窗口时通过时间索引只读取窗口内的消息
+        if window is None:
+            start_ns, end_ns = reader.window_ns(
+                options.start_time, options.end_time, options.time_base, options.window_relative
+            )
+        else:
+            start_ns, end_ns = window
+
+        print(f"开始处理 db3 文件 '{db3_file}' 中的点云数据...")
+
+        # 为每个 topic 初始化独立的 frame_id，分卷从前面分卷的帧数继续编号
+        topic_frame_counters = dict(frame_offsets or {})
+
+        # 按话题抽帧，只看帧号和录制时间戳，在反序列化之前决定是否跳过
+        sampler = FrameSampler(options.sampling)
+        sampler.start_after(last_timestamps)
+
+        # PointCloud2 解码器，每个话题的 dtype 缓存复用
+        pc2_decoder = PointCloud2Decoder(skip_nans=True)
+
+        # 每个话题一个写出器，按块流式写入临时目录中各自的子目录，全部完成后再移动到输出目录
+        writers = PointCloudWriterSet(
+            job.staging_dir, options.chunk_points, options.output_format, options.output_layout
+        )
+
+        # 有断点时恢复帧号和已写出的文件，从断点之后的消息继续
+        checkpoint = job.start()
+        resume_after = None
+        if checkpoint is not None:
+            print(f"从断点继续处理 '{db3_file}'")
+            topic_frame_counters = checkpoint["frame_counters"]
+            writers.restore(checkpoint["writers"])
+            sampler.restore(checkpoint["sampler"])
+            resume_after = checkpoint["position"]
+
+        # 按阶段统计耗时，定时输出进度；从断点继续时不知道剩余条数，不估算剩余时间
+        total = None
+        if options.progress_interval is not None and resume_after is None:
+            total = reader.message_count(POINTCLOUD_TYPES, topics, start_ns, end_ns, options.time_base)
+        stats = RunStats(
+            os.path.basename(db3_file), total, options.progress_interval, options.trace_memory
+        )
+    except BaseException:
+        reader.close()
+        raise
+
+    # 读取消息，非点云话题的数据行不会被读取
+    with reader, writers:
+        messages = reader.read_messages(
+            msg_types=POINTCLOUD_TYPES,
+            topics=topics,
+            start_ns=start_ns,
+            end_ns=end_ns,
+            time_base=options.time_base,
+            resume_after=resume_after,
+        )
+        for topic, serialized_msg, timestamp_ns, msg_type in stats.iterate(messages):
+            if topic not in stats.topics:
+                print(f"Processing topic: {topic}")
+
+            # 跳过的帧只占用帧号
+            frame_id = topic_frame_counters.get(topic, 0)
+            if not sampler.keep(topic, frame_id, timestamp_ns):
+                topic_frame_counters[topic] = frame_id + 1
+                stats.message(topic, len(serialized_msg))
+                continue
+
+            try:
+                if msg_type == "sensor_msgs/msg/PointCloud2":  # 处理 PointCloud2 消息
+                    with stats.stage("deserialize", topic, len(serialized_msg)):
+                        msg = deserialize_message(serialized_msg, PointCloud2)
+                    kind = "PointCloud2"
+
+                    # 提取点云数据（向量化解码）
+                    with stats.stage("decode", topic):
+                        points = pc2_decoder.decode(topic, msg)
+
+                elif msg_type == "sensor_msgs/msg/PointCloud":  # 处理 PointCloud 消息
+                    with stats.stage("deserialize", topic, len(serialized_msg)):
+                        msg = deserialize_message(serialized_msg, PointCloud)
+                    kind = "PointCloud"
+
+                    # 提取点云数据
+                    with stats.stage("decode", topic):
+                        points = decode_pointcloud(msg, skip_nans=True)
+
+                else:
+                    continue
+
+                # 提取消息头时间戳（纳秒）
+                stamp_ns = msg.header.stamp.sec * 1_000_000_000 + msg.header.stamp.nanosec
+
+                topic_frame_counters[topic] = frame_id + 1
+
+                with stats.stage("write", topic, points.nbytes):
+                    writers.write_frame(topic, kind, frame_id, stamp_ns, points, timestamp_ns)
+
+            except Exception as e:
+                print(f"Error processing message from topic '{topic}': {e}")
+                continue
+            finally:
+                stats.message(topic, len(serialized_msg))
+
+            if job.checkpoint_due():
+                job.save_checkpoint(
+                    {
+                        "position": reader.position,
+                        "frame_counters": topic_frame_counters,
+                        "writers": writers.checkpoint(),
+                        "sampler": sampler.checkpoint(),
+                    }
+                )
+
+    # 全部写完后才移动到输出目录并记录完成
+    job.commit()
+
+    stats.close()
+    stats.print_summary()
+    if options.run_report:
+        extra = {"sampling_dropped": sampler.dropped} if sampler.enabled else None
+        stats.save(report_file(output_dir, db3_file, "pointcloud"), extra)
+
+    if not writers.writers:
+        print(f"'{db3_file}' 中没有点云数据")
+    for topic, count in sampler.dropped.items():
+        print(f"Skipped {count} frames of topic '{topic}' by sampling")
+
+
+def split_bag_job(bag_dir, output_dir, options, bag_files, topics=None):
+    """分卷 bag 整体的提取记录，各分卷的输出合并后一起移动到输出目录"""
+    return ExtractionJob(
+        bag_dir,
+        output_dir,
+        "pointcloud",
+        extract_options(options, topics),
+        options.content_hash,
+        None,
+        bag_files,
+    )
+
+
+def merge_split_bag(bag_dir, output_dir, options, topics, bag_files, part_dirs):
+    """把各分卷的输出合并到分卷 bag 的临时目录，再一起移动到输出目录"""
+    bag_job = split_bag_job(bag_dir, output_dir, options, bag_files, topics)
+    merge_split_outputs(part_dirs, bag_job.staging_dir)
+    for part_dir in part_dirs:
+        shutil.rmtree(part_dir, ignore_errors=True)
+    bag_job.commit()
+    print(f"'{bag_dir}' 的 {len(part_dirs)} 个分卷已合并到 {output_dir}")
+
+
+def convert(options):
+    """处理 options.parent_dir 下所有 DB3 文件，多个文件由进程池并行处理
+
+    结果写入 options.output_parent_dir，返回 [(文件, 错误, 耗时)]。
+    metadata.yaml 中列出多个分卷的 bag 按整个 bag 处理：各分卷作为单独的任务并行处理，
+    每个话题的帧号从前面分卷的帧数继续编号，全部成功后合并为一份输出。
+    """
+    topics = options.topics_to_process
+    time_base, index_dir = options.time_base, options.index_dir
+
+    # 抽帧设置有误时在处理任何文件之前报错
+    sampler = FrameSampler(options.sampling)
+
+    # 确保输出目录存在
+    os.makedirs(options.output_parent_dir, exist_ok=True)
+    jobs, bags = find_bags(options.parent_dir, options.output_parent_dir)
+
+    merges = []
+    for bag in bags:
+        bag_job = split_bag_job(bag.bag_dir, bag.output_dir, options, bag.files, topics)
+        if options.use_cache and bag_job.is_done():
+            print(f"'{bag.bag_dir}' 已经提取过，跳过")
+            continue
+        window, splits = plan_splits(
+            bag,
+            POINTCLOUD_TYPES,
+            topics,
+            options.start_time,
+            options.end_time,
+            time_base,
+            options.window_relative,
+            index_dir,
+            bag.output_dir,
+        )
+        # 各分卷输出到分卷 bag 临时目录下各自的子目录，分卷自己的完成记录和断点也在其中
+        # 按录制时间抽帧时，各分卷接着前面分卷最后一帧的时间段继续
+        previous = [None] * len(splits)
+        if sampler.uses_rate:
+            previous = previous_timestamps(
+                splits, POINTCLOUD_TYPES, topics, window, time_base, index_dir, bag.output_dir
+            )
+        part_dirs = []
+        for (split_file, frame_offsets), last_timestamps in zip(splits, previous):
+            part_dir = os.path.join(bag_job.staging_dir, os.path.basename(split_file))
+            jobs.append((split_file, part_dir, frame_offsets, window, last_timestamps))
+            part_dirs.append(part_dir)
+        merges.append((bag.bag_dir, bag.output_dir, bag.files, part_dirs))
+
+    # Options 作为参数传给子进程中的任务
+    workers = options.num_workers
+    results = run_batch(process_db3_file, sort_jobs(jobs), workers, (options, topics))
+
+    # 有分卷失败的 bag 不合并，已完成的分卷下次运行时跳过
+    failed = {db3_file for db3_file, error, _ in results if error is not None}
+    merges = [merge for merge in merges if failed.isdisjoint(merge[2])]
+    if merges:
+        results += run_batch(merge_split_bag, merges, workers, (options, topics))
+    return results
@@ -0,0 +1,134 @@
+import os
+import sqlite3
+
+# rosbag2 sqlite3 存储的表结构（与 Humble 的 schema_version 3 一致，Foxy 也可以读取）
+SCHEMA_SQL = [
+    "CREATE TABLE schema(schema_version INTEGER PRIMARY KEY, ros_distro TEXT NOT NULL)",
+    "CREATE TABLE topics(id INTEGER PRIMARY KEY, name TEXT NOT NULL, type TEXT NOT NULL, "
+    "serialization_format TEXT NOT NULL, offered_qos_profiles TEXT NOT NULL)",
+    "CREATE TABLE messages(id INTEGER PRIMARY KEY, topic_id INTEGER NOT NULL, "
+    "timestamp INTEGER NOT NULL, data BLOB NOT NULL)",
+]
+
+
+class Db3Writer:
+    """直接写 rosbag2 的 sqlite3 (.db3) 文件并生成 metadata.yaml
+
+    bag_dir 为 bag 目录，数据写入 <bag_dir>/<目录名>_0.db3。消息通过
+    executemany 批量插入，每 transaction_size 条提交一次；写入期间关闭
+    journal/同步，时间戳索引在全部写完后再建立。
+    """
+
+    def __init__(self, bag_dir, ros_distro="humble", transaction_size=100_000):
+        self.bag_dir = bag_dir
+        self.transaction_size = transaction_size
+        os.makedirs(bag_dir, exist_ok=True)
+        self.db3_name = f"{os.path.basename(os.path.normpath(bag_dir))}_0.db3"
+        self.db3_file = os.path.join(bag_dir, self.db3_name)
+        if os.path.exists(self.db3_file):
+            os.remove(self.db3_file)
+
+        self.conn = sqlite3.connect(self.db3_file)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        for sql in SCHEMA_SQL:
+            self.conn.execute(sql)
+        self.conn.execute("INSERT INTO schema VALUES (3, ?)", (ros_distro,))
+
+        # topic -> [id, type, serialization_format, message_count]
+        self.topics = {}
+        self.message_count = 0
+        self.start_ns = None
+        self.end_ns = None
+        self._pending = 0
+
+    def add_topic(self, name, msg_type, serialization_format="cdr"):
+        """注册话题，返回 topic_id"""
+        if name in self.topics:
+            return self.topics[name][0]
+        topic_id = len(self.topics) + 1
+        self.conn.execute(
+            "INSERT INTO topics VALUES (?, ?, ?, ?, ?)",
+            (topic_id, name, msg_type, serialization_format, ""),
+        )
+        self.topics[name] = [topic_id, msg_type, serialization_format, 0]
+        return topic_id
+
+    def write_batch(self, topic, timestamps_ns, messages):
+        """批量写入同一话题的消息，timestamps_ns 为 int 序列，messages 为 bytes 序列"""
+        info = self.topics[topic]
+        topic_id = info[0]
+        timestamps_ns = [int(t) for t in timestamps_ns]
+        if not timestamps_ns:
+            return
+
+        self.conn.executemany(
+            "INSERT INTO messages (topic_id, timestamp, data) VALUES (?, ?, ?)",
+            zip([topic_id] * len(messages), timestamps_ns, messages),
+        )
+        info[3] += len(messages)
+        self.message_count += len(messages)
+        low, high = min(timestamps_ns), max(timestamps_ns)
+        self.start_ns = low if self.start_ns is None else min(self.start_ns, low)
+        self.end_ns = high if self.end_ns is None else max(self.end_ns, high)
+
+        self._pending += len(messages)
+        if self._pending >= self.transaction_size:
+            self.conn.commit()
+            self._pending = 0
+
+    def _metadata_yaml(self):
+        start_ns = self.start_ns or 0
+        duration_ns = (self.end_ns - self.start_ns) if self.start_ns is not None else 0
+        lines = [
+            "rosbag2_bagfile_information:",
+            "  version: 5",
+            "  storage_identifier: sqlite3",
+            "  duration:",
+            f"    nanoseconds: {duration_ns}",
+            "  starting_time:",
+            f"    nanoseconds_since_epoch: {start_ns}",
+            f"  message_count: {self.message_count}",
+            "  topics_with_message_count:",
+        ]
+        for name, (topic_id, msg_type, serialization_format, count) in self.topics.items():
+            lines += [
+                "    - topic_metadata:",
+                f"        name: {name}",
+                f"        type: {msg_type}",
+                f"        serialization_format: {serialization_format}",
+                '        offered_qos_profiles: ""',
+                f"      message_count: {count}",
+            ]
+        lines += [
+            '  compression_format: ""',
+            '  compression_mode: ""',
+            "  relative_file_paths:",
+            f"    - {self.db3_name}",
+            "  files:",
+            f"    - path: {self.db3_name}",
+            "      starting_time:",
+            f"        nanoseconds_since_epoch: {start_ns}",
+            "      duration:",
+            f"        nanoseconds: {duration_ns}",
+            f"      message_count: {self.message_count}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        """提交剩余数据，建立时间戳索引并写出 metadata.yaml"""
+        if self.conn is None:
+            return
+        self.conn.commit()
+        self.conn.execute("CREATE INDEX timestamp_idx ON messages (timestamp ASC)")
+        self.conn.commit()
+        self.conn.close()
+        self.conn = None
+        with open(os.path.join(self.bag_dir, "metadata.yaml"), "w") as f:
+            f.write(self._metadata_yaml())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
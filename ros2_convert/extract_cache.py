@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+# 完成记录的版本，格式变化时递增，旧记录视为未完成
+CACHE_VERSION = 1
+
+
+def atomic_write_json(path, data):
+    """先写临时文件再替换，避免中途退出时留下损坏的文件"""
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_file, path)
+
+
+def load_json(path):
+    """读取 JSON 文件，文件不存在或损坏时返回 None"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def file_sha256(path, block_size=1 << 24):
+    """计算文件内容的 sha256（大文件会比较慢）"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def bag_identity(db3_file, content_hash=False):
+    """bag 的标识：文件名、大小、修改时间，content_hash 为 True 时加上内容的 sha256"""
+    stat = os.stat(db3_file)
+    identity = {
+        "name": os.path.basename(db3_file),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+    if content_hash:
+        identity["sha256"] = file_sha256(db3_file)
+    return identity
+
+
+def cache_key(identity, extractor, options):
+    """由 bag 标识、提取器名称和提取选项（含话题列表）计算缓存键"""
+    payload = json.dumps(
+        {
+            "version": CACHE_VERSION,
+            "bag": identity,
+            "extractor": extractor,
+            "options": options,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def done_file_path(output_dir, db3_file, extractor):
+    """单个 db3 文件的完成记录路径：<output_dir>/.<文件名>.<提取器>.done.json"""
+    base_name = os.path.splitext(os.path.basename(db3_file))[0]
+    return os.path.join(output_dir, f".{base_name}.{extractor}.done.json")
+
+
+class ExtractionJob:
+    """单个 db3 文件（或分卷 bag 的全部分卷，见 bag_files）的一次提取：完成记录、断点和临时输出目录
+
+    输出先写入 output_dir 下的临时目录 .partial_<文件名>，全部完成后
+    逐个文件 os.replace 到 output_dir，最后写入完成记录 .<文件名>.done.json，
+    因此 output_dir 中只会出现完整的文件，记录存在即表示提取完成。
+    中途退出时临时目录和其中的断点 checkpoint.json 保留，下次从断点继续。
+    """
+
+    def __init__(self, db3_file, output_dir, extractor, options, content_hash=False,
+                 checkpoint_interval=60.0, bag_files=None):
+        self.db3_file = db3_file
+        self.output_dir = output_dir
+        self.checkpoint_interval = checkpoint_interval
+        if bag_files is None:
+            base_name = os.path.splitext(os.path.basename(db3_file))[0]
+            identity = bag_identity(db3_file, content_hash)
+            self.done_file = done_file_path(output_dir, db3_file, extractor)
+        else:
+            # 分卷录制的 bag：db3_file 为 bag 目录，标识由所有分卷文件的标识组成
+            base_name = os.path.basename(os.path.normpath(db3_file))
+            identity = [bag_identity(path, content_hash) for path in bag_files]
+            self.done_file = os.path.join(output_dir, f".{base_name}.{extractor}.done.json")
+        self.key = cache_key(identity, extractor, options)
+        self.staging_dir = os.path.join(output_dir, f".partial_{base_name}.{extractor}")
+        self.checkpoint_file = os.path.join(self.staging_dir, "checkpoint.json")
+        self._last_checkpoint = time.monotonic()
+
+    def is_done(self):
+        """完成记录的键一致，且记录的输出文件都还在"""
+        record = load_json(self.done_file)
+        if not record or record.get("key") != self.key:
+            return False
+        return all(
+            os.path.isfile(os.path.join(self.output_dir, path))
+            for path in record.get("outputs", [])
+        )
+
+    def start(self):
+        """准备临时目录，返回可以继续的断点；没有断点（或选项已变化）时返回 None"""
+        checkpoint = load_json(self.checkpoint_file)
+        if checkpoint is not None and checkpoint.get("key") == self.key:
+            return checkpoint["state"]
+        # 断点不存在或不属于当前的提取选项，清空临时目录重新开始
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        os.makedirs(self.staging_dir, exist_ok=True)
+        return None
+
+    def checkpoint_due(self):
+        """距离上次保存断点超过 checkpoint_interval 秒（None 表示不保存断点）"""
+        if self.checkpoint_interval is None:
+            return False
+        return time.monotonic() - self._last_checkpoint >= self.checkpoint_interval
+
+    def save_checkpoint(self, state):
+        """保存断点，state 中需要包含继续提取所需的全部信息（可 JSON 序列化）"""
+        atomic_write_json(self.checkpoint_file, {"key": self.key, "state": state})
+        self._last_checkpoint = time.monotonic()
+
+    def commit(self, extra=None):
+        """把临时目录中的输出移动到 output_dir，写入完成记录并删除临时目录
+
+        extra 中的键值一并写入完成记录（如保存失败的帧）。
+        """
+        for path in (self.checkpoint_file, self.checkpoint_file + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+        outputs = []
+        for root, dirs, files in os.walk(self.staging_dir):
+            relative_dir = os.path.relpath(root, self.staging_dir)
+            target_dir = os.path.normpath(os.path.join(self.output_dir, relative_dir))
+            os.makedirs(target_dir, exist_ok=True)
+            for file in files:
+                os.replace(os.path.join(root, file), os.path.join(target_dir, file))
+                outputs.append(os.path.normpath(os.path.join(relative_dir, file)))
+
+        record = {"key": self.key, "db3_file": self.db3_file, "outputs": sorted(outputs)}
+        record.update(extra or {})
+        atomic_write_json(self.done_file, record)
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        return outputs
@@ -0,0 +1,226 @@
+import os
+from .imu_decoder import IMU_DTYPE, ImuBatchDecoder
+from .image_writer import ImageWriter
+from .pointcloud_decoder import PointCloud2Decoder, decode_pointcloud
+from .pointcloud_writer import PointCloudWriterSet
+from .run_stats import RunStats
+
+
+class ExtractHandler:
+    """处理一类消息的提取器
+
+    msg_types 为该提取器处理的消息类型；驱动程序开始读取前调用 prepare()
+    传入各话题的起始帧号和消息数，读取 bag 时按消息类型
+    把序列化数据交给 handle()，全部读完后调用 close() 写出剩余数据，
+    result() 返回该提取器的处理结果。各阶段（反序列化、解码、编码、写出）的
+    耗时计入 stats（RunStats），多个提取器共用驱动程序的 stats 时按阶段合计。
+    ROS2 消息定义、OpenCV、pandas 等依赖在提取器创建或写出时才导入，
+    只启用 IMU 提取器时不需要安装 ROS2。
+    """
+
+    name = None
+    msg_types = ()
+
+    def __init__(self, output_dir, stats=None):
+        self.output_dir = output_dir
+        self.stats = stats if stats is not None else RunStats(self.name, progress_interval=None)
+        self.messages = 0
+        self.errors = 0
+        # 每个话题处理的帧数
+        self.topic_counts = {}
+        # 每个话题的起始帧号（分卷 bag 中前面分卷的帧数）和本次要处理的消息数
+        self.frame_offsets = {}
+        self.message_counts = {}
+
+    def prepare(self, frame_offsets=None, message_counts=None):
+        self.frame_offsets = dict(frame_offsets or {})
+        self.message_counts = dict(message_counts or {})
+
+    def handle(self, topic, msg_type, serialized_msg, timestamp_ns):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def result(self):
+        return {
+            "name": self.name,
+            "messages": self.messages,
+            "errors": self.errors,
+            "topics": dict(self.topic_counts),
+        }
+
+    def _count(self, topic):
+        self.messages += 1
+        self.topic_counts[topic] = self.topic_counts.get(topic, 0) + 1
+
+
+class PointCloudHandler(ExtractHandler):
+    """PointCloud2/PointCloud：与 db3_to_csv.py 的输出相同"""
+
+    name = "pointcloud"
+    msg_types = ("sensor_msgs/msg/PointCloud2", "sensor_msgs/msg/PointCloud")
+
+    def __init__(
+        self, output_dir, chunk_points=200_000, output_format="csv", layout="flat", stats=None
+    ):
+        super().__init__(output_dir, stats)
+        from sensor_msgs.msg import PointCloud, PointCloud2
+        from rclpy.serialization import deserialize_message
+
+        self.msg_classes = {
+            "sensor_msgs/msg/PointCloud2": PointCloud2,
+            "sensor_msgs/msg/PointCloud": PointCloud,
+        }
+        self.deserialize = deserialize_message
+        self.decoder = PointCloud2Decoder(skip_nans=True)
+        self.writers = PointCloudWriterSet(output_dir, chunk_points, output_format, layout)
+
+    def handle(self, topic, msg_type, serialized_msg, timestamp_ns):
+        stats = self.stats
+        with stats.stage("deserialize", topic, len(serialized_msg)):
+            msg = self.deserialize(serialized_msg, self.msg_classes[msg_type])
+        if msg_type == "sensor_msgs/msg/PointCloud2":
+            kind = "PointCloud2"
+            with stats.stage("decode", topic):
+                points = self.decoder.decode(topic, msg)
+        else:
+            kind = "PointCloud"
+            with stats.stage("decode", topic):
+                points = decode_pointcloud(msg, skip_nans=True)
+
+        stamp_ns = msg.header.stamp.sec * 1_000_000_000 + msg.header.stamp.nanosec
+        frame_id = self.frame_offsets.get(topic, 0) + self.topic_counts.get(topic, 0)
+        with stats.stage("write", topic, points.nbytes):
+            self.writers.write_frame(topic, kind, frame_id, stamp_ns, points, timestamp_ns)
+        self._count(topic)
+
+    def close(self):
+        with self.stats.stage("write"):
+            self.writers.close()
+
+
+class ImageHandler(ExtractHandler):
+    """Image/CompressedImage：与 image-db3_to_png.py 的输出相同，编解码在线程池中执行"""
+
+    name = "image"
+    msg_types = ("sensor_msgs/msg/CompressedImage", "sensor_msgs/msg/Image")
+
+    def __init__(
+        self,
+        output_dir,
+        num_threads=4,
+        queue_size=64,
+        compressed_passthrough=False,
+        normalize_16bit=False,
+        stats=None,
+    ):
+        super().__init__(output_dir, stats)
+        from sensor_msgs.msg import CompressedImage, Image
+        from rclpy.serialization import deserialize_message
+
+        self.msg_classes = {
+            "sensor_msgs/msg/CompressedImage": CompressedImage,
+            "sensor_msgs/msg/Image": Image,
+        }
+        self.deserialize = deserialize_message
+        # 线程池中的解码、编码和写文件计入 "encode" 阶段
+        self.writer = ImageWriter(
+            output_dir,
+            num_threads,
+            queue_size,
+            compressed_passthrough,
+            normalize_16bit,
+            self.stats,
+        )
+
+    def prepare(self, frame_offsets=None, message_counts=None):
+        super().prepare(frame_offsets, message_counts)
+        self.writer.frame_counters = dict(self.frame_offsets)
+
+    def handle(self, topic, msg_type, serialized_msg, timestamp_ns):
+        with self.stats.stage("deserialize", topic, len(serialized_msg)):
+            msg = self.deserialize(serialized_msg, self.msg_classes[msg_type])
+        # 队列满时在这里等待，"submit" 耗时长说明瓶颈在编码
+        with self.stats.stage("submit", topic):
+            self.writer.write(topic, msg_type, msg)
+        self._count(topic)
+
+    def close(self):
+        self.writer.close()
+        # 线程池中保存失败的图像计入错误数
+        self.errors += self.writer.errors
+
+
+def save_imu_data(df_imu, output_base, output_format):
+    """按输出格式保存 IMU 数据，df_imu 的 timestamp 列为 int64 纳秒（与 imu2csv.py 相同）"""
+    if output_format == "csv":
+        # 文本输出沿用 "sec.nsec" 格式的时间戳
+        secs, nsecs = divmod(df_imu["timestamp"].to_numpy(), 1_000_000_000)
+        df_imu = df_imu.copy()
+        df_imu["timestamp"] = [f"{s}.{n:09d}" for s, n in zip(secs, nsecs)]
+        df_imu.to_csv(output_base + ".csv", index=False)
+        df_imu.to_csv(output_base + ".txt", sep=" ", index=False, header=False)
+        print(f"IMU data has been saved to {output_base}.csv")
+
+    elif output_format == "parquet":
+        df_imu.rename(columns={"timestamp": "timestamp_ns"}).to_parquet(
+            output_base + ".parquet", index=False
+        )
+        print(f"IMU data has been saved to {output_base}.parquet")
+
+    elif output_format == "feather":
+        df_imu.rename(columns={"timestamp": "timestamp_ns"}).to_feather(output_base + ".feather")
+        print(f"IMU data has been saved to {output_base}.feather")
+
+    else:
+        raise ValueError(f"Unsupported output format '{output_format}'")
+
+
+class ImuHandler(ExtractHandler):
+    """sensor_msgs/msg/Imu：不逐条反序列化，按批向量化解码 CDR 数据"""
+
+    name = "imu"
+    msg_types = ("sensor_msgs/msg/Imu",)
+
+    def __init__(self, output_dir, output_format="csv", stats=None):
+        super().__init__(output_dir, stats)
+        self.output_format = output_format
+        # 每个话题一个解码器
+        self.decoders = {}
+
+    def handle(self, topic, msg_type, serialized_msg, timestamp_ns):
+        decoder = self.decoders.get(topic)
+        if decoder is None:
+            # 按该话题的消息数一次分配好解码结果数组
+            decoder = self.decoders[topic] = ImuBatchDecoder(
+                encoding="cdr", capacity=self.message_counts.get(topic)
+            )
+        # 每攒满一批解码一次，解码耗时计入该批最后一条消息
+        with self.stats.stage("decode", topic, len(serialized_msg)):
+            decoder.add(serialized_msg)
+        self._count(topic)
+
+    def close(self):
+        import pandas as pd
+
+        for topic, decoder in self.decoders.items():
+            with self.stats.stage("decode", topic):
+                imu_data, frame_ids = decoder.finish()
+            if not len(imu_data):
+                continue
+            # 列顺序：timestamp（int64 纳秒）、frame_id、四元数、角速度、线性加速度及各自的协方差
+            df_imu = pd.DataFrame({name: imu_data[name] for name in IMU_DTYPE.names})
+            df_imu.insert(1, "frame_id", frame_ids)
+
+            topic_output_dir = os.path.join(self.output_dir, topic.replace("/", "_"))
+            os.makedirs(topic_output_dir, exist_ok=True)
+            with self.stats.stage("write", topic, imu_data.nbytes):
+                save_imu_data(df_imu, os.path.join(topic_output_dir, "Imu"), self.output_format)
+        self.decoders = {}
+
+
+# 已注册的提取器：名称 -> 类，新增消息类型时在这里注册
+HANDLERS = {
+    handler.name: handler for handler in (PointCloudHandler, ImageHandler, ImuHandler)
+}
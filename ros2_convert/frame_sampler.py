@@ -0,0 +1,104 @@
+import bisect
+
+# 抽帧规则："stride" 每 N 帧保留一帧，"rate_hz" 按录制时间限制帧率，
+# "timestamps" 只保留列出的录制时间戳（纳秒），可以用 "tolerance_ms" 放宽匹配
+SAMPLING_MODES = ("stride", "rate_hz", "timestamps")
+
+# 未单独指定规则的话题使用的默认规则
+DEFAULT_TOPIC = "*"
+
+
+def parse_sampling(sampling):
+    """检查抽帧设置 {话题: 规则}，返回 {话题: (模式, 参数)}，设置有误时抛出 ValueError"""
+    rules = {}
+    for topic, rule in (sampling or {}).items():
+        if not isinstance(rule, dict):
+            raise ValueError(f"Sampling rule of topic '{topic}' must be a dict, got {rule!r}")
+        modes = [mode for mode in SAMPLING_MODES if mode in rule]
+        unknown = sorted(set(rule) - set(SAMPLING_MODES) - {"tolerance_ms"})
+        if len(modes) != 1 or unknown:
+            raise ValueError(
+                f"Sampling rule of topic '{topic}' needs exactly one of {SAMPLING_MODES}, got {rule!r}"
+            )
+        mode = modes[0]
+        value = rule[mode]
+        if mode == "stride":
+            if not isinstance(value, int) or value < 1:
+                raise ValueError(f"Sampling stride of topic '{topic}' must be a positive int")
+            rules[topic] = (mode, value)
+        elif mode == "rate_hz":
+            if not value or value <= 0:
+                raise ValueError(f"Sampling rate of topic '{topic}' must be positive")
+            # 每个时间段的长度（纳秒）
+            rules[topic] = (mode, max(1, round(1e9 / value)))
+        else:
+            tolerance_ns = round(rule.get("tolerance_ms", 0) * 1e6)
+            rules[topic] = (mode, (sorted(int(t) for t in value), tolerance_ns))
+    return rules
+
+
+class FrameSampler:
+    """按话题抽帧，只根据帧号和 bag 录制时间戳（timestamp_ns）判断是否保留
+
+    在反序列化之前调用 keep()，被跳过的消息不反序列化、不解码、不写出。
+    帧号为该话题在 bag 中的序号（被跳过的帧也占帧号），分卷 bag 各分卷
+    按前面分卷的帧数继续编号，stride 抽帧的结果与整个 bag 一起处理时相同。
+    rate_hz 把录制时间从 Unix 零点起按 1/rate_hz 秒分段，每段保留第一帧；
+    分卷通过 start_after() 接着前面分卷最后一帧的时间段继续。
+    """
+
+    def __init__(self, sampling=None):
+        self.rules = parse_sampling(sampling)
+        # rate_hz 模式下每个话题最后保留的时间段
+        self.last_periods = {}
+        # 每个话题跳过的帧数
+        self.dropped = {}
+
+    @property
+    def enabled(self):
+        return bool(self.rules)
+
+    @property
+    def uses_rate(self):
+        """是否有话题按录制时间抽帧（分卷需要前面分卷的时间戳）"""
+        return any(mode == "rate_hz" for mode, _ in self.rules.values())
+
+    def _rule(self, topic):
+        return self.rules.get(topic) or self.rules.get(DEFAULT_TOPIC)
+
+    def start_after(self, last_timestamps):
+        """从前面分卷各话题最后一条消息的录制时间戳继续，同一时间段不再保留"""
+        for topic, timestamp_ns in (last_timestamps or {}).items():
+            rule = self._rule(topic)
+            if rule is not None and rule[0] == "rate_hz":
+                self.last_periods[topic] = timestamp_ns // rule[1]
+
+    def keep(self, topic, frame_id, timestamp_ns):
+        """返回 True 表示保留这一帧"""
+        rule = self._rule(topic)
+        if rule is None:
+            return True
+        mode, value = rule
+        if mode == "stride":
+            keep = frame_id % value == 0
+        elif mode == "rate_hz":
+            # 时间戳乱序（按消息头时间读取）时，早于已保留时间段的帧也跳过
+            period = timestamp_ns // value
+            keep = period > self.last_periods.get(topic, -1)
+            if keep:
+                self.last_periods[topic] = period
+        else:
+            timestamps, tolerance_ns = value
+            i = bisect.bisect_left(timestamps, timestamp_ns - tolerance_ns)
+            keep = i < len(timestamps) and timestamps[i] <= timestamp_ns + tolerance_ns
+        if not keep:
+            self.dropped[topic] = self.dropped.get(topic, 0) + 1
+        return keep
+
+    def checkpoint(self):
+        """断点中保存的抽帧状态"""
+        return {"last_periods": self.last_periods, "dropped": self.dropped}
+
+    def restore(self, state):
+        self.last_periods = dict(state["last_periods"])
+        self.dropped = dict(state["dropped"])
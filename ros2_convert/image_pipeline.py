@@ -0,0 +1,68 @@
+import queue
+import threading
+
+
+class ImagePipeline:
+    """读取线程 + 解码/编码线程池的流水线
+
+    读取线程调用 submit() 把任务放入有界队列，队列满时阻塞，
+    因此缓存在内存中的帧数不超过 queue_size + num_threads。
+    cv2.imdecode/cv2.imwrite 执行时会释放 GIL，多个线程可以同时编解码。
+    num_threads 为 0 时不启动线程，任务在 submit() 中直接执行。
+    """
+
+    def __init__(self, num_threads=4, queue_size=64):
+        self.num_threads = num_threads
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = [
+            threading.Thread(target=self._worker, daemon=True)
+            for _ in range(num_threads)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self, func, args):
+        try:
+            func(*args)
+        except Exception as e:
+            print(f"Error saving image: {e}")
+            with self._lock:
+                self.errors += 1
+
+    def _worker(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                self._run(*task)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, func, *args):
+        """提交任务 func(*args)，队列满时阻塞读取线程（背压）"""
+        if self.num_threads <= 0:
+            self._run(func, args)
+        else:
+            self._queue.put((func, args))
+
+    def wait(self):
+        """等待已提交的任务全部完成（工作线程继续运行），用于保存断点前"""
+        if self._threads:
+            self._queue.join()
+
+    def close(self):
+        """等待所有任务完成并结束工作线程"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,285 @@
+import os
+import threading
+import numpy as np
+from .image_pipeline import ImagePipeline
+
+# PNG 文件头，IHDR 块紧随其后
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG IHDR 中 color type 对应的通道命名，与 cv2.IMREAD_UNCHANGED 解码结果一致
+PNG_COLOR_TYPE_CHANNELS = {
+    0: "gray",  # 灰度
+    2: "rgb",  # 真彩色
+    3: "rgb",  # 调色板，解码后为 3 通道
+    4: "rgba",  # 灰度 + 透明通道，解码后为 4 通道
+    6: "rgba",  # 真彩色 + 透明通道
+}
+
+
+def png_header_info(data):
+    """从 PNG 的 IHDR 块读取 (通道命名, 位深)，不解码图像"""
+    if len(data) < 33 or bytes(data[:8]) != PNG_SIGNATURE:
+        return None, None
+    bit_depth = data[24]
+    color_type = data[25]
+    return PNG_COLOR_TYPE_CHANNELS.get(color_type), bit_depth
+
+
+def copy_compressed_image(
+    topic_output_dir, frame_id_image, timestamp, data, fmt, normalize_16bit=False
+):
+    """不解码，直接把压缩图像的数据写入 .jpg/.png 文件
+
+    返回 False 表示需要解码（16 位 PNG 需要归一化，或无法识别文件头）。
+    """
+    if fmt == "jpeg":
+        # cv2.IMREAD_COLOR 解码 JPEG 总是得到 3 通道
+        channels, extension = "rgb", "jpg"
+    elif fmt == "png":
+        channels, bit_depth = png_header_info(data)
+        if channels is None:
+            return False
+        if normalize_16bit and bit_depth == 16:
+            return False
+        extension = "png"
+    else:
+        return False
+
+    image_file_path = os.path.join(
+        topic_output_dir,
+        f"CompressedImage_{channels}_{frame_id_image}_{timestamp}.{extension}",
+    )
+    with open(image_file_path, "wb") as f:
+        f.write(data)
+    return True
+
+
+def save_compressed_image(
+    topic_output_dir,
+    frame_id_image,
+    timestamp,
+    data,
+    fmt,
+    compressed_passthrough=False,
+    normalize_16bit=False,
+):
+    """保存压缩图像（在线程池中执行）
+
+    开启 compressed_passthrough 时直接写出原始数据，只有需要转换时才解码；
+    normalize_16bit 为 True 时把 16 位图像归一化为 8 位。不支持的格式、
+    解码失败或写出失败时抛出异常，由 ImageWriter 记入 failed_frames。
+    """
+    if compressed_passthrough and copy_compressed_image(
+        topic_output_dir, frame_id_image, timestamp, data, fmt, normalize_16bit
+    ):
+        return
+
+    import cv2
+
+    # 注意，这里是按照8位深来读取的，如果是16位深请注意修改。
+    # image_data = np.frombuffer(data, dtype=np.uint16)
+    image_data = np.frombuffer(data, dtype=np.uint8)
+
+    # 解码图像数据
+    if fmt == "jpeg":
+        image = cv2.imdecode(image_data, cv2.IMREAD_COLOR)
+    elif fmt == "png":
+        image = cv2.imdecode(image_data, cv2.IMREAD_UNCHANGED)
+    else:
+        raise ValueError(f"Unsupported compressed image format: {fmt}")
+
+    if image is None:
+        raise ValueError(f"Failed to decode {fmt} image")
+
+    # 16 位图像归一化为 8 位，由 normalize_16bit 控制
+    if normalize_16bit and image.dtype == np.uint16:
+        image = cv2.normalize(image, None, 0, 255, cv2.NORM_MINMAX)
+        image = np.uint8(image)
+
+    # 根据通道数保存图像
+    if len(image.shape) == 2:  # 灰度图
+        channels = "gray"
+    elif image.shape[2] == 3:  # RGB 图像
+        channels = "rgb"
+    elif image.shape[2] == 4:  # RGBA 图像
+        channels = "rgba"
+    else:
+        raise ValueError(f"Unsupported channel configuration: {image.shape}")
+
+    image_file_path = os.path.join(
+        topic_output_dir,
+        f"CompressedImage_{channels}_{frame_id_image}_{timestamp}.png",
+    )
+    if not cv2.imwrite(image_file_path, image):
+        raise OSError(f"Failed to write '{image_file_path}'")
+
+
+def raw_image_to_array(data, height, width, encoding):
+    """根据编码方式把 sensor_msgs/Image 的数据转换为 numpy 数组"""
+    if encoding == "rgb8":
+        # RGB 8-bit 图像
+        return np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+    elif encoding == "bgr8":
+        # BGR 8-bit 图像
+        return np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+    elif encoding == "mono8":
+        # 单通道 8-bit 图像（灰度图）
+        return np.frombuffer(data, dtype=np.uint8).reshape(height, width)
+    elif encoding == "rgba8":
+        # RGBA 8-bit 图像（含透明通道）
+        return np.frombuffer(data, dtype=np.uint8).reshape(height, width, 4)
+    elif encoding == "bgra8":
+        # BGRA 8-bit 图像（含透明通道）
+        return np.frombuffer(data, dtype=np.uint8).reshape(height, width, 4)
+    elif encoding == "mono16":
+        # 单通道 16-bit 图像（灰度图）
+        return np.frombuffer(data, dtype=np.uint16).reshape(height, width)
+    elif encoding == "rgba16":
+        # RGBA 16-bit 图像（含透明通道）
+        return np.frombuffer(data, dtype=np.uint16).reshape(height, width, 4)
+    elif encoding == "bgra16":
+        # BGRA 16-bit 图像（含透明通道）
+        return np.frombuffer(data, dtype=np.uint16).reshape(height, width, 4)
+    else:
+        # 不支持的编码方式
+        raise ValueError(f"Unsupported image encoding: {encoding}")
+
+
+def save_raw_image(image_file_path, data, height, width, encoding):
+    """把普通图像保存为 PNG（在线程池中执行）"""
+    import cv2
+
+    image_data = raw_image_to_array(data, height, width, encoding)
+
+    # 如果是 16 位图像，可能需要进行归一化或调整为 8 位图像保存
+    if encoding in ["mono16", "rgba16", "bgra16"]:
+        # 归一化为 8 位
+        image_data = cv2.normalize(image_data, None, 0, 255, cv2.NORM_MINMAX)
+        image_data = np.uint8(image_data)
+
+    # 保存图像
+    if not cv2.imwrite(image_file_path, image_data):
+        raise OSError(f"Failed to write '{image_file_path}'")
+
+
+class ImageWriter:
+    """按话题保存 sensor_msgs/Image 和 CompressedImage
+
+    帧号在调用 write() 的线程中按顺序分配，与线程调度无关；图像的解码和
+    PNG 编码交给 ImagePipeline 的线程池执行。每个话题写入 output_dir 下
+    以话题名命名的子目录。传入 stats（RunStats）时，线程池中解码、编码和
+    写文件的耗时计入 "encode" 阶段。OpenCV 在创建时导入，没有安装时立即报错，
+    不会等到线程池中每一帧都保存失败。单帧保存失败（如不支持的编码）只记入
+    failed_frames，不影响其它帧。
+    """
+
+    def __init__(
+        self,
+        output_dir,
+        num_threads=4,
+        queue_size=64,
+        compressed_passthrough=False,
+        normalize_16bit=False,
+        stats=None,
+    ):
+        import cv2  # noqa: F401
+
+        self.output_dir = output_dir
+        self.stats = stats
+        self.compressed_passthrough = compressed_passthrough
+        self.normalize_16bit = normalize_16bit
+        # 为每个话题初始化独立的 frame_id_image
+        self.frame_counters = {}
+        # 保存失败的帧：[[话题, 帧号, 错误信息]]，在线程池中追加
+        self.failed_frames = []
+        self._failed_lock = threading.Lock()
+        # 每个话题的输出目录只创建一次
+        self.topic_output_dirs = {}
+        self.pipeline = ImagePipeline(num_threads, queue_size)
+
+    @property
+    def errors(self):
+        return self.pipeline.errors
+
+    def topic_output_dir(self, topic):
+        """为图像话题创建对应的输出目录"""
+        topic_output_dir = self.topic_output_dirs.get(topic)
+        if topic_output_dir is None:
+            print(f"Processing topic: {topic}")
+            topic_name = topic.replace("/", "_").strip("_")
+            topic_output_dir = os.path.join(self.output_dir, topic_name)
+            os.makedirs(topic_output_dir, exist_ok=True)
+            self.topic_output_dirs[topic] = topic_output_dir
+        return topic_output_dir
+
+    def _submit(self, topic, frame_id, nbytes, func, *args):
+        if self.stats is not None:
+            func = self.stats.timed("encode", topic, func, nbytes)
+        self.pipeline.submit(self._save, topic, frame_id, func, args)
+
+    def _save(self, topic, frame_id, func, args):
+        """在线程池中执行保存，失败时记下话题和帧号后交给 ImagePipeline 计数"""
+        try:
+            func(*args)
+        except Exception as e:
+            with self._failed_lock:
+                self.failed_frames.append([topic, frame_id, str(e)])
+            raise
+
+    def write(self, topic, msg_type, msg):
+        """提交一帧图像，msg 为反序列化后的 Image/CompressedImage 消息"""
+        topic_output_dir = self.topic_output_dir(topic)
+
+        # 获取时间戳和帧 ID
+        secs, nsecs = msg.header.stamp.sec, msg.header.stamp.nanosec
+        timestamp = f"{secs}.{nsecs:09d}"
+        frame_id_image = self.frame_counters.get(topic, 0)
+        self.frame_counters[topic] = frame_id_image + 1
+
+        if msg_type == "sensor_msgs/msg/CompressedImage":
+            self._submit(
+                topic,
+                frame_id_image,
+                len(msg.data),
+                save_compressed_image,
+                topic_output_dir,
+                frame_id_image,
+                timestamp,
+                msg.data,
+                msg.format,
+                self.compressed_passthrough,
+                self.normalize_16bit,
+            )
+        else:
+            image_file_path = os.path.join(
+                topic_output_dir,
+                f"Image_{frame_id_image}_{timestamp}.png",
+            )
+            self._submit(
+                topic,
+                frame_id_image,
+                len(msg.data),
+                save_raw_image,
+                image_file_path,
+                msg.data,
+                msg.height,
+                msg.width,
+                msg.encoding,
+            )
+
+    def skip(self, topic):
+        """跳过一帧（抽帧时），只占用帧号，不保存图像"""
+        self.frame_counters[topic] = self.frame_counters.get(topic, 0) + 1
+
+    def wait(self):
+        """等待已提交的图像全部写完"""
+        self.pipeline.wait()
+
+    def close(self):
+        self.pipeline.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
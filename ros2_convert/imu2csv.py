@@ -0,0 +1,89 @@
+"""ROS1 bag 中的 IMU -> CSV/Parquet/Feather
+
+设置通过 Options 显式传入，各设置的含义见 imu-db3_to_csv/imu2csv.py 开头的说明。
+输出文件写到当前目录。
+"""
+import os
+from collections import namedtuple
+from .bag_reader import BagReader
+from .imu_decoder import IMU_DTYPE, ImuBatchDecoder
+
+# 设置名及默认值，与 imu-db3_to_csv/imu2csv.py 开头的设置同名
+DEFAULTS = {
+    'bag_files': None,
+    'topics_to_check': ('/imu', '/imu/data_raw', '/sensor/imu'),
+    'output_format': 'csv',
+}
+
+Options = namedtuple('Options', DEFAULTS, defaults=DEFAULTS.values())
+
+
+def save_imu_data(df_imu, bag_base_name, output_format):
+    """按输出格式保存 IMU 数据，df_imu 的 timestamp 列为 int64 纳秒"""
+    if output_format == 'csv':
+        # 文本输出沿用 "sec.nsec" 格式的时间戳
+        secs, nsecs = divmod(df_imu['timestamp'].to_numpy(), 1_000_000_000)
+        df_imu = df_imu.copy()
+        df_imu['timestamp'] = [f"{s}.{n:09d}" for s, n in zip(secs, nsecs)]
+
+        output_csv_imu = f'{bag_base_name}_IMU.csv'
+        output_txt_imu = f'{bag_base_name}_IMU.txt'
+
+        # 保存为 CSV 文件
+        df_imu.to_csv(output_csv_imu, index=False)
+        print(f"IMU data has been saved to {output_csv_imu}")
+
+        # 保存为 TXT 文件
+        df_imu.to_csv(output_txt_imu, sep=' ', index=False, header=False)
+        print(f"IMU data has been saved to {output_txt_imu}")
+
+    elif output_format == 'parquet':
+        output_parquet_imu = f'{bag_base_name}_IMU.parquet'
+        df_imu.rename(columns={'timestamp': 'timestamp_ns'}).to_parquet(
+            output_parquet_imu, index=False)
+        print(f"IMU data has been saved to {output_parquet_imu}")
+
+    elif output_format == 'feather':
+        output_feather_imu = f'{bag_base_name}_IMU.feather'
+        df_imu.rename(columns={'timestamp': 'timestamp_ns'}).to_feather(
+            output_feather_imu)
+        print(f"IMU data has been saved to {output_feather_imu}")
+
+    else:
+        raise ValueError(f"Unsupported output format '{output_format}'")
+
+
+def process_bag_file(bag_file, topics_to_check, output_format='csv'):
+    # 检查文件是否存在
+    if not os.path.isfile(bag_file):
+        print(f"Error: Bag file '{bag_file}' not found.")
+        return
+
+    # 从 bag 文件名生成输出文件名
+    bag_base_name = os.path.splitext(os.path.basename(bag_file))[0]
+
+    # 收集序列化的 IMU 消息，按批向量化解码，不逐条反序列化
+    imu_decoder = ImuBatchDecoder(encoding='ros1')
+
+    # 读取当前 bag 文件
+    # 不依赖 ROS 直接读取 bag，只解压包含 IMU 话题的块
+    with BagReader(bag_file) as bag:
+        for topic, serialized_msg, t, msg_type in bag.read_messages(
+                msg_types=['sensor_msgs/Imu'], topics=topics_to_check):
+            imu_decoder.add(serialized_msg)
+
+    # 如果有 IMU 数据，保存到文件
+    imu_data, frame_ids = imu_decoder.finish()
+    if len(imu_data):
+        import pandas as pd
+
+        # 列顺序：timestamp（int64 纳秒）、frame_id、四元数、角速度、线性加速度及各自的协方差
+        df_imu = pd.DataFrame({name: imu_data[name] for name in IMU_DTYPE.names})
+        df_imu.insert(1, 'frame_id', frame_ids)
+        save_imu_data(df_imu, bag_base_name, output_format)
+
+
+def convert(options):
+    """处理 options.bag_files 中的每个 bag 文件"""
+    for bag_file in options.bag_files:
+        process_bag_file(bag_file, options.topics_to_check, options.output_format)
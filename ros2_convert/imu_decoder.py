@@ -0,0 +1,170 @@
+import struct
+import numpy as np
+
+# sensor_msgs/Imu 中 header 之后的 37 个 float64，顺序与消息定义一致
+IMU_FLOAT_FIELDS = (
+    ["orientation_x", "orientation_y", "orientation_z", "orientation_w"]
+    + [f"orientation_covariance_{i}" for i in range(9)]
+    + ["angular_velocity_x", "angular_velocity_y", "angular_velocity_z"]
+    + [f"angular_velocity_covariance_{i}" for i in range(9)]
+    + ["linear_acceleration_x", "linear_acceleration_y", "linear_acceleration_z"]
+    + [f"linear_acceleration_covariance_{i}" for i in range(9)]
+)
+
+# 解码结果：int64 纳秒时间戳 + 37 个 float64
+IMU_DTYPE = np.dtype(
+    [("timestamp", "<i8")] + [(name, "<f8") for name in IMU_FLOAT_FIELDS]
+)
+
+# 支持的序列化格式：ros1 为 ROS1 bag，cdr 为 ROS2 (rosbag2) 的 CDR
+IMU_ENCODINGS = ("ros1", "cdr")
+
+
+def imu_layout(buf, encoding):
+    """根据 frame_id 长度计算一条 Imu 消息的布局
+
+    返回 (总长度, 字节序, 时间戳偏移, frame_id 偏移, frame_id 长度, 数值偏移)。
+    除 frame_id 外 Imu 是定长的，布局相同的消息可以一起用 np.frombuffer 解码。
+    """
+    if encoding == "ros1":
+        # seq(uint32) + stamp(uint32 secs, uint32 nsecs) + frame_id(uint32 长度 + 字节)
+        (frame_id_len,) = struct.unpack_from("<I", buf, 12)
+        return len(buf), "<", 4, 16, frame_id_len, 16 + frame_id_len
+
+    if encoding == "cdr":
+        # 4 字节封装头，第 2 个字节为 1 表示小端
+        byte_order = "<" if buf[1] == 1 else ">"
+        # stamp(int32 sec, uint32 nanosec) + frame_id(uint32 长度含结尾 0 + 字节)
+        (frame_id_len,) = struct.unpack_from(byte_order + "I", buf, 12)
+        # float64 按 8 字节对齐，对齐位置从封装头之后开始计算
+        values_offset = 4 + ((12 + frame_id_len + 7) & ~7)
+        return len(buf), byte_order, 4, 16, max(frame_id_len - 1, 0), values_offset
+
+    raise ValueError(f"Unsupported IMU encoding '{encoding}'")
+
+
+def _group_dtype(layout, encoding):
+    """为同一布局的消息构建结构化 dtype"""
+    size, byte_order, stamp_offset, frame_id_offset, frame_id_len, values_offset = layout
+    sec_type = "u4" if encoding == "ros1" else "i4"
+    names = ["sec", "nanosec"] + IMU_FLOAT_FIELDS
+    formats = [byte_order + sec_type, byte_order + "u4"]
+    formats += [byte_order + "f8"] * len(IMU_FLOAT_FIELDS)
+    offsets = [stamp_offset, stamp_offset + 4]
+    offsets += [values_offset + 8 * i for i in range(len(IMU_FLOAT_FIELDS))]
+    if frame_id_len > 0:
+        names.append("frame_id")
+        formats.append(f"S{frame_id_len}")
+        offsets.append(frame_id_offset)
+    return np.dtype(
+        {"names": names, "formats": formats, "offsets": offsets, "itemsize": size}
+    )
+
+
+def decode_imu_batch(buffers, encoding="ros1", out=None):
+    """把一批序列化的 Imu 消息一次性解码
+
+    返回 (IMU_DTYPE 结构化数组, frame_id 数组)。按布局分组后，每组的数据
+    拼接为一块内存再用 np.frombuffer 解码，不逐条反序列化消息。
+    out 为长度与 buffers 相同的 (结构化数组, frame_id 数组) 时直接解码到其中。
+    """
+    count = len(buffers)
+    if out is None:
+        points = np.empty(count, dtype=IMU_DTYPE)
+        frame_ids = np.empty(count, dtype=object)
+    else:
+        points, frame_ids = out
+    if count == 0:
+        return points, frame_ids
+
+    groups = {}
+    for i, buf in enumerate(buffers):
+        groups.setdefault(imu_layout(buf, encoding), []).append(i)
+
+    for layout, indices in groups.items():
+        dtype = _group_dtype(layout, encoding)
+        raw = np.frombuffer(b"".join(bytes(buffers[i]) for i in indices), dtype=dtype)
+        indices = np.asarray(indices)
+
+        points["timestamp"][indices] = (
+            raw["sec"].astype(np.int64) * 1_000_000_000 + raw["nanosec"]
+        )
+        for name in IMU_FLOAT_FIELDS:
+            points[name][indices] = raw[name]
+
+        if "frame_id" not in raw.dtype.names:
+            frame_ids[indices] = ""
+            continue
+
+        # frame_id 通常只有少数几种取值，只对不同的取值解码一次
+        values, inverse = np.unique(raw["frame_id"], return_inverse=True)
+        decoded = np.array(
+            [value.decode("utf-8", "replace") for value in values], dtype=object
+        )
+        frame_ids[indices] = decoded[inverse.reshape(-1)]
+
+    return points, frame_ids
+
+
+class ImuBatchDecoder:
+    """收集序列化的 Imu 消息，每 batch_size 条解码一次
+
+    已知消息数时传入 capacity（如 bag 的 metadata.yaml 或按话题统计的条数），
+    结果数组一次分配好，每批直接解码到其中，finish() 时不需要再拼接；
+    实际条数超过 capacity 时多出的部分按批另外保存，最后再拼接。
+    """
+
+    def __init__(self, encoding="ros1", batch_size=8192, capacity=None):
+        if encoding not in IMU_ENCODINGS:
+            raise ValueError(f"Unsupported IMU encoding '{encoding}'")
+        self.encoding = encoding
+        self.batch_size = batch_size
+        self._buffers = []
+        self._points = []
+        self._frame_ids = []
+        # 预先分配的结果数组，_filled 为已解码的条数
+        self._filled = 0
+        self._out = None
+        if capacity:
+            self._out = (np.empty(capacity, dtype=IMU_DTYPE), np.empty(capacity, dtype=object))
+
+    def add(self, buf):
+        self._buffers.append(buf)
+        if len(self._buffers) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffers:
+            return
+        count = len(self._buffers)
+        # 已经有超出 capacity 的批时，后面的批也接在其后，保持消息顺序
+        if (
+            self._out is not None
+            and not self._points
+            and self._filled + count <= len(self._out[0])
+        ):
+            end = self._filled + count
+            out = (self._out[0][self._filled : end], self._out[1][self._filled : end])
+            decode_imu_batch(self._buffers, self.encoding, out)
+            self._filled = end
+        else:
+            points, frame_ids = decode_imu_batch(self._buffers, self.encoding)
+            self._points.append(points)
+            self._frame_ids.append(frame_ids)
+        self._buffers = []
+
+    def __len__(self):
+        return self._filled + sum(len(points) for points in self._points) + len(self._buffers)
+
+    def finish(self):
+        """解码剩余消息，返回全部的 (结构化数组, frame_id 数组)"""
+        self._flush()
+        points, frame_ids = list(self._points), list(self._frame_ids)
+        if self._out is not None:
+            points.insert(0, self._out[0][: self._filled])
+            frame_ids.insert(0, self._out[1][: self._filled])
+        if not points:
+            return np.empty(0, dtype=IMU_DTYPE), np.empty(0, dtype=object)
+        if len(points) == 1:
+            return points[0], frame_ids[0]
+        return np.concatenate(points), np.concatenate(frame_ids)
@@ -0,0 +1,460 @@
+import heapq
+import os
+import struct
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from .db3_reader import TIME_BASES, Db3Reader, TopicInfo, header_stamp_ns
+
+# MCAP 文件头/文件尾的魔数
+MCAP_MAGIC = b"\x89MCAP0\r\n"
+
+# 记录类型 (opcode)
+OP_FOOTER = 0x02
+OP_SCHEMA = 0x03
+OP_CHANNEL = 0x04
+OP_MESSAGE = 0x05
+OP_MESSAGE_INDEX = 0x07
+OP_CHUNK_INDEX = 0x08
+OP_STATISTICS = 0x0B
+
+# 记录头：opcode (uint8) + 内容长度 (uint64)
+RECORD_HEADER = struct.Struct("<BQ")
+# Footer 记录：summary_start、summary_offset_start (uint64)、summary_crc (uint32)
+FOOTER_SIZE = RECORD_HEADER.size + 20
+# Message 记录内容开头：channel_id、sequence、log_time、publish_time
+MESSAGE_HEADER = struct.Struct("<HIQQ")
+
+# 块索引：块的时间范围、在文件中的位置，以及块内每个 channel 的 MessageIndex 记录位置
+ChunkIndex = namedtuple(
+    "ChunkIndex",
+    [
+        "start_time",
+        "end_time",
+        "offset",
+        "length",
+        "message_index_offsets",
+        "message_index_length",
+        "compression",
+        "compressed_size",
+        "uncompressed_size",
+    ],
+)
+
+
+def _read_string(data, pos):
+    """读取 uint32 长度前缀的字符串，返回 (字符串, 新位置)"""
+    (length,) = struct.unpack_from("<I", data, pos)
+    pos += 4
+    return bytes(data[pos : pos + length]).decode(), pos + length
+
+
+def _read_u16_u64_map(data, pos):
+    """读取 map<uint16, uint64>（uint32 字节长度前缀），返回 (dict, 新位置)"""
+    (length,) = struct.unpack_from("<I", data, pos)
+    pos += 4
+    return dict(struct.iter_unpack("<HQ", data[pos : pos + length])), pos + length
+
+
+def _iter_records(data, pos=0, end=None):
+    """遍历 data 中的记录，产出 (opcode, 内容开始位置, 内容结束位置)"""
+    end = len(data) if end is None else end
+    while pos + RECORD_HEADER.size <= end:
+        opcode, length = RECORD_HEADER.unpack_from(data, pos)
+        start = pos + RECORD_HEADER.size
+        yield opcode, start, start + length
+        pos = start + length
+
+
+def _decompress(data, compression, uncompressed_size):
+    """按块的压缩方式解压（在工作线程中执行，zstd/lz4 解压时会释放 GIL）"""
+    if compression == "":
+        return data
+    if compression == "zstd":
+        # 需要 pip install zstandard
+        import zstandard
+
+        data = zstandard.ZstdDecompressor().decompress(data, max_output_size=uncompressed_size)
+    elif compression == "lz4":
+        # MCAP 的 lz4 块为标准 LZ4 frame 格式，需要 pip install lz4
+        import lz4.frame
+
+        data = lz4.frame.decompress(data)
+    else:
+        raise ValueError(f"Unsupported MCAP chunk compression '{compression}'")
+    if len(data) != uncompressed_size:
+        raise ValueError(
+            f"Chunk decompressed to {len(data)} bytes, expected {uncompressed_size}"
+        )
+    return data
+
+
+class McapReader:
+    """不依赖 ROS 的 MCAP (.mcap) 读取器，接口与 Db3Reader 相同
+
+    打开时只读取文件末尾的 summary 部分（schema、channel、块索引和统计信息）；
+    读取消息时只解压包含所需话题、且与时间窗口重叠的块，再通过块后面的
+    MessageIndex 记录直接定位到所需消息，不会解析其它话题的消息。
+    zstd/lz4 块在 num_threads 个线程中提前解压，最多预取 prefetch 个块。
+    """
+
+    def __init__(self, bag_file, num_threads=4, prefetch=None, index_dir=None):
+        # index_dir 只为与 Db3Reader 接口一致，MCAP 的 summary 本身就是索引
+        self.bag_file = bag_file
+        self.num_threads = num_threads
+        self.prefetch = prefetch if prefetch is not None else max(2 * num_threads, 1)
+        self.file = open(bag_file, "rb")
+        self.fd = self.file.fileno()
+        # 最近一次产出的消息的读取位置，用于断点续读
+        self.position = None
+        try:
+            self._read_summary()
+        except Exception:
+            self.file.close()
+            raise
+
+    def _pread(self, length, offset):
+        """按位置读取，不移动文件指针，可以在多个线程中同时调用"""
+        data = os.pread(self.fd, length, offset)
+        if len(data) != length:
+            raise ValueError(f"Unexpected end of MCAP file '{self.bag_file}' at {offset}")
+        return data
+
+    def _read_summary(self):
+        file_size = os.fstat(self.fd).st_size
+        if file_size < 2 * len(MCAP_MAGIC) + FOOTER_SIZE or (
+            self._pread(len(MCAP_MAGIC), 0) != MCAP_MAGIC
+            or self._pread(len(MCAP_MAGIC), file_size - len(MCAP_MAGIC)) != MCAP_MAGIC
+        ):
+            raise ValueError(f"'{self.bag_file}' is not an MCAP file")
+
+        footer_pos = file_size - len(MCAP_MAGIC) - FOOTER_SIZE
+        footer = self._pread(FOOTER_SIZE, footer_pos)
+        opcode, _ = RECORD_HEADER.unpack_from(footer)
+        (summary_start,) = struct.unpack_from("<Q", footer, RECORD_HEADER.size)
+        if opcode != OP_FOOTER:
+            raise ValueError(f"'{self.bag_file}' has no MCAP footer record")
+        if summary_start == 0:
+            raise ValueError(
+                f"'{self.bag_file}' has no summary section, run 'mcap recover' first"
+            )
+
+        summary = self._pread(footer_pos - summary_start, summary_start)
+        schemas = {}
+        channels = []
+        self.chunks = []
+        self.statistics = None
+        for opcode, pos, end in _iter_records(summary):
+            if opcode == OP_SCHEMA:
+                (schema_id,) = struct.unpack_from("<H", summary, pos)
+                schemas[schema_id], _ = _read_string(summary, pos + 2)
+            elif opcode == OP_CHANNEL:
+                channel_id, schema_id = struct.unpack_from("<HH", summary, pos)
+                topic, pos = _read_string(summary, pos + 4)
+                message_encoding, pos = _read_string(summary, pos)
+                channels.append((channel_id, schema_id, topic, message_encoding))
+            elif opcode == OP_CHUNK_INDEX:
+                start_time, end_time, offset, length = struct.unpack_from("<QQQQ", summary, pos)
+                offsets, pos = _read_u16_u64_map(summary, pos + 32)
+                (index_length,) = struct.unpack_from("<Q", summary, pos)
+                compression, pos = _read_string(summary, pos + 8)
+                compressed_size, uncompressed_size = struct.unpack_from("<QQ", summary, pos)
+                self.chunks.append(
+                    ChunkIndex(
+                        start_time,
+                        end_time,
+                        offset,
+                        length,
+                        offsets,
+                        index_length,
+                        compression,
+                        compressed_size,
+                        uncompressed_size,
+                    )
+                )
+            elif opcode == OP_STATISTICS:
+                (message_count,) = struct.unpack_from("<Q", summary, pos)
+                # 跳过 schema/channel/attachment/metadata/chunk 的数量 (2+4+4+4+4 字节)
+                start_time, end_time = struct.unpack_from("<QQ", summary, pos + 26)
+                counts, _ = _read_u16_u64_map(summary, pos + 42)
+                self.statistics = (message_count, start_time, end_time, counts)
+
+        # schema 名即消息类型（如 sensor_msgs/msg/PointCloud2），序列化格式为 channel 的 message_encoding
+        self.topics = [
+            TopicInfo(channel_id, topic, schemas.get(schema_id, ""), message_encoding)
+            for channel_id, schema_id, topic, message_encoding in sorted(channels)
+        ]
+        self.chunks.sort(key=lambda chunk: (chunk.start_time, chunk.offset))
+
+    # 话题筛选和时间窗口换算与 Db3Reader 相同
+    get_all_topics_and_types = Db3Reader.get_all_topics_and_types
+    resolve_topics = Db3Reader.resolve_topics
+    window_ns = Db3Reader.window_ns
+
+    def _select_chunks(self, selected, start_ns=None, end_ns=None):
+        """包含所需 channel 且与时间窗口（bag 时间）重叠的块"""
+        chunks = []
+        for chunk in self.chunks:
+            if start_ns is not None and chunk.end_time < start_ns:
+                continue
+            if end_ns is not None and chunk.start_time > end_ns:
+                continue
+            # 没有 MessageIndex 的块无法判断包含哪些 channel，只能读取
+            offsets = chunk.message_index_offsets
+            if offsets and not any(channel_id in offsets for channel_id in selected):
+                continue
+            chunks.append(chunk)
+        return chunks
+
+    def _message_index(self, chunk, selected, start_ns=None, end_ns=None):
+        """读取块后面所需 channel 的 MessageIndex 记录，返回 [(log_time, 块内偏移, channel_id)]"""
+        index_start = chunk.offset + chunk.length
+        data = self._pread(chunk.message_index_length, index_start)
+        entries = []
+        for channel_id, offset in chunk.message_index_offsets.items():
+            if channel_id not in selected:
+                continue
+            pos = offset - index_start + RECORD_HEADER.size
+            (length,) = struct.unpack_from("<I", data, pos + 2)
+            for log_time, message_offset in struct.iter_unpack(
+                "<QQ", data[pos + 6 : pos + 6 + length]
+            ):
+                if start_ns is not None and log_time < start_ns:
+                    continue
+                if end_ns is not None and log_time > end_ns:
+                    continue
+                entries.append((log_time, message_offset, channel_id))
+        return entries
+
+    def _load_chunk(self, chunk, selected, start_ns=None, end_ns=None):
+        """读取并解压块，返回所需消息的 [(log_time, 块位置, 块内偏移, channel_id, 数据)]
+
+        在工作线程中执行，只使用 pread，不共享文件指针。
+        """
+        raw = self._pread(chunk.length, chunk.offset)
+        # Chunk 记录内容：start/end time、uncompressed_size (uint64)、crc (uint32)、
+        # compression (string)、records (uint64 长度 + 数据)
+        pos = RECORD_HEADER.size + 28
+        _, pos = _read_string(raw, pos)
+        (records_length,) = struct.unpack_from("<Q", raw, pos)
+        pos += 8
+        records = _decompress(
+            raw[pos : pos + records_length], chunk.compression, chunk.uncompressed_size
+        )
+        del raw
+
+        if chunk.message_index_offsets:
+            entries = self._message_index(chunk, selected, start_ns, end_ns)
+        else:
+            # 没有 MessageIndex 时逐条扫描块内的记录
+            entries = []
+            for opcode, pos, _ in _iter_records(records):
+                if opcode != OP_MESSAGE:
+                    continue
+                channel_id, _, log_time, _ = MESSAGE_HEADER.unpack_from(records, pos)
+                if channel_id not in selected:
+                    continue
+                if start_ns is not None and log_time < start_ns:
+                    continue
+                if end_ns is not None and log_time > end_ns:
+                    continue
+                entries.append((log_time, pos - RECORD_HEADER.size, channel_id))
+
+        messages = []
+        for log_time, offset, channel_id in entries:
+            opcode, length = RECORD_HEADER.unpack_from(records, offset)
+            if opcode != OP_MESSAGE:
+                raise ValueError(f"Expected message record in chunk at {chunk.offset}")
+            start = offset + RECORD_HEADER.size
+            data = records[start + MESSAGE_HEADER.size : start + length]
+            messages.append((log_time, chunk.offset, offset, channel_id, data))
+        messages.sort()
+        return messages
+
+    def _iter_chunks(self, chunks, *args):
+        """按顺序产出每个块的消息，后面的块在线程池中提前读取和解压"""
+        if self.num_threads <= 0:
+            for chunk in chunks:
+                yield chunk, self._load_chunk(chunk, *args)
+            return
+
+        executor = ThreadPoolExecutor(self.num_threads)
+        pending = deque()
+        chunks = iter(chunks)
+        try:
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(self._load_chunk, chunk, *args)))
+                if len(pending) >= self.prefetch:
+                    break
+            while pending:
+                chunk, future = pending.popleft()
+                for next_chunk in chunks:
+                    pending.append(
+                        (next_chunk, executor.submit(self._load_chunk, next_chunk, *args))
+                    )
+                    break
+                yield chunk, future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def message_count(
+        self, msg_types=None, topics=None, start_ns=None, end_ns=None, time_base="bag"
+    ):
+        """统计符合条件的消息数，只读取统计信息或 MessageIndex 记录，不解压块
+
+        time_base 为 "header" 且指定了时间窗口时，消息头时间只能解压后读取，
+        需要读取所需话题的全部块逐条判断。
+        """
+        return sum(
+            self.topic_message_counts(msg_types, topics, start_ns, end_ns, time_base).values()
+        )
+
+    def topic_message_counts(
+        self, msg_types=None, topics=None, start_ns=None, end_ns=None, time_base="bag"
+    ):
+        """按话题统计符合条件的消息数，返回 {话题: 消息数}，统计方式与 message_count 相同"""
+        if time_base not in TIME_BASES:
+            raise ValueError(f"Unsupported time base '{time_base}'")
+        if time_base == "header" and (start_ns is not None or end_ns is not None):
+            counts = {}
+            for name, _, _, _ in self._header_window_messages(msg_types, topics, start_ns, end_ns):
+                counts[name] = counts.get(name, 0) + 1
+            return counts
+        selected = self.resolve_topics(msg_types, topics)
+        if start_ns is None and end_ns is None and self.statistics is not None:
+            channel_counts = self.statistics[3]
+        else:
+            channel_counts = {}
+            for chunk in self._select_chunks(selected, start_ns, end_ns):
+                if not chunk.message_index_offsets:
+                    continue
+                for _, _, channel_id in self._message_index(chunk, selected, start_ns, end_ns):
+                    channel_counts[channel_id] = channel_counts.get(channel_id, 0) + 1
+        # 同一话题可能有多个 channel
+        counts = {}
+        for channel_id, info in selected.items():
+            if channel_counts.get(channel_id):
+                counts[info.name] = counts.get(info.name, 0) + channel_counts[channel_id]
+        return counts
+
+    def topic_last_timestamps(
+        self, msg_types=None, topics=None, start_ns=None, end_ns=None, time_base="bag"
+    ):
+        """按话题返回符合条件的最后一条消息的录制时间戳（纳秒），返回 {话题: 时间戳}
+
+        只读取 MessageIndex 记录，不解压块；没有 MessageIndex 的块不计入。
+        time_base 为 "header" 且指定了时间窗口时与 message_count 相同，需要解压块。
+        """
+        if time_base not in TIME_BASES:
+            raise ValueError(f"Unsupported time base '{time_base}'")
+        if time_base == "header" and (start_ns is not None or end_ns is not None):
+            last = {}
+            for name, _, log_time, _ in self._header_window_messages(
+                msg_types, topics, start_ns, end_ns
+            ):
+                last[name] = max(last.get(name, log_time), log_time)
+            return last
+        selected = self.resolve_topics(msg_types, topics)
+        last = {}
+        for chunk in self._select_chunks(selected, start_ns, end_ns):
+            if not chunk.message_index_offsets:
+                continue
+            for log_time, _, channel_id in self._message_index(chunk, selected, start_ns, end_ns):
+                name = selected[channel_id].name
+                if log_time > last.get(name, -1):
+                    last[name] = log_time
+        return last
+
+    def _header_window_messages(self, msg_types, topics, start_ns, end_ns):
+        """按消息头时间窗口读取消息，用于统计；不改变断点续读用的 self.position"""
+        position = self.position
+        try:
+            yield from self.read_messages(msg_types, topics, start_ns, end_ns, "header")
+        finally:
+            self.position = position
+
+    def time_range(self, time_base="bag"):
+        """返回整个 bag 的 (最早, 最晚) 时间戳（纳秒），没有消息时返回 (None, None)
+
+        time_base 为 "header" 时需要读取全部消息的消息头。
+        """
+        if time_base == "bag":
+            if self.statistics is not None and self.statistics[0]:
+                return self.statistics[1], self.statistics[2]
+            if not self.chunks:
+                return None, None
+            return (
+                min(chunk.start_time for chunk in self.chunks),
+                max(chunk.end_time for chunk in self.chunks),
+            )
+        elif time_base == "header":
+            stamps = [header_stamp_ns(data[:12]) for _, data, _, _ in self.read_messages()]
+            stamps = [stamp for stamp in stamps if stamp is not None]
+            if not stamps:
+                return None, None
+            return min(stamps), max(stamps)
+        else:
+            raise ValueError(f"Unsupported time base '{time_base}'")
+
+    def read_messages(
+        self,
+        msg_types=None,
+        topics=None,
+        start_ns=None,
+        end_ns=None,
+        time_base="bag",
+        resume_after=None,
+    ):
+        """按录制时间顺序读取符合条件的消息
+
+        返回 (topic, serialized_msg, timestamp_ns, msg_type) 的迭代器，与
+        Db3Reader.read_messages 相同。time_base 为 "bag" 时只读取与窗口重叠的块；
+        为 "header" 时无法按块筛选时间，读取所需话题的块后再按消息头时间过滤。
+
+        self.position 为 (录制时间, 块位置, 块内偏移)，作为 resume_after 传入
+        可以从这条消息之后继续读取，之前结束的块不会再读取。
+        """
+        if time_base not in TIME_BASES:
+            raise ValueError(f"Unsupported time base '{time_base}'")
+        selected = self.resolve_topics(msg_types, topics)
+        if not selected:
+            return
+
+        bag_start, bag_end = (start_ns, end_ns) if time_base == "bag" else (None, None)
+        if resume_after is not None:
+            resume_after = tuple(resume_after)
+            if bag_start is None or bag_start < resume_after[0]:
+                bag_start = resume_after[0]
+        chunks = self._select_chunks(selected, bag_start, bag_end)
+
+        # 块的时间范围可能重叠：按开始时间读取，下一个块开始之前的消息才产出
+        heap = []
+        loaded = self._iter_chunks(chunks, selected, bag_start, bag_end)
+        for i, (chunk, messages) in enumerate(loaded):
+            for message in messages:
+                heapq.heappush(heap, message)
+            next_start = chunks[i + 1].start_time if i + 1 < len(chunks) else None
+            while heap and (next_start is None or heap[0][0] < next_start):
+                log_time, chunk_offset, offset, channel_id, data = heapq.heappop(heap)
+                position = (log_time, chunk_offset, offset)
+                if resume_after is not None and position <= resume_after:
+                    continue
+                if time_base == "header":
+                    stamp_ns = header_stamp_ns(data[:12])
+                    if stamp_ns is None:
+                        continue
+                    if start_ns is not None and stamp_ns < start_ns:
+                        continue
+                    if end_ns is not None and stamp_ns > end_ns:
+                        continue
+                info = selected[channel_id]
+                self.position = position
+                yield info.name, data, log_time, info.type
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
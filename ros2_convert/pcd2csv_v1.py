@@ -0,0 +1,20 @@
+"""单个 PCD -> CSV
+
+设置通过 Options 显式传入，各设置的含义见 pointcloud-csv_to_pcd/pcd2csv_v1.py 开头的说明。
+"""
+from collections import namedtuple
+from .pcd_format import pcd_to_csv
+
+# 设置名及默认值，与 pointcloud-csv_to_pcd/pcd2csv_v1.py 开头的设置同名
+DEFAULTS = {
+    "input_pcd_file": None,
+    "output_csv_file": None,
+}
+
+Options = namedtuple("Options", DEFAULTS, defaults=DEFAULTS.values())
+
+
+def convert(options):
+    pcd_to_csv(options.input_pcd_file, options.output_csv_file)
+
+    print("PCD to CSV conversion complete.")
@@ -0,0 +1,128 @@
+"""PCD 文件夹 -> CSV（增量、多进程）
+
+设置通过 Options 显式传入，各设置的含义见 pointcloud-csv_to_pcd/pcd2csv_v2.py 中的说明。
+"""
+import os
+import json
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from .pcd_format import pcd_to_csv
+
+# 转换记录文件名，保存在输出文件夹中
+MANIFEST_NAME = '.pcd2csv_manifest.json'
+# 每转换多少个文件保存一次转换记录
+MANIFEST_SAVE_INTERVAL = 1000
+
+# 设置名及默认值，与 pointcloud-csv_to_pcd/pcd2csv_v2.py 中的设置同名
+DEFAULTS = {
+    'input_folder': None,
+    'output_folder': None,
+    'num_workers': None,
+}
+
+Options = namedtuple('Options', DEFAULTS, defaults=DEFAULTS.values())
+
+
+def load_manifest(manifest_file):
+    """读取转换记录，文件不存在或损坏时返回空记录"""
+    try:
+        with open(manifest_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest_file, manifest):
+    """先写临时文件再替换，避免中途退出时记录损坏"""
+    tmp_file = manifest_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_file, manifest_file)
+
+
+def is_up_to_date(entry, stat, output_csv_file):
+    """输入文件的大小/修改时间未变，且输出 CSV 存在且大小与记录一致"""
+    if entry is None:
+        return False
+    if entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+        return False
+    try:
+        return os.path.getsize(output_csv_file) == entry['csv_size']
+    except OSError:
+        return False
+
+
+def _convert_job(job):
+    """子进程中转换单个文件，返回 (文件名, 错误信息)
+
+    成功时不逐个打印，十万级文件夹中只输出出错的文件和最后的汇总。
+    """
+    file_name, input_pcd_file, output_csv_file = job
+    try:
+        pcd_to_csv(input_pcd_file, output_csv_file)
+        return file_name, None
+    except Exception as e:
+        return file_name, f"{type(e).__name__}: {e}"
+
+
+def convert_pcd_folder_to_csv(input_folder, output_folder, workers=None, incremental=True):
+    """转换文件夹中的所有 PCD 文件
+
+    incremental 为 True 时，根据输出目录中的转换记录（MANIFEST_NAME）
+    只转换新增或有变化的文件；需要转换的文件由 workers 个进程并行处理。
+    """
+    # 如果输出文件夹不存在，则创建它
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    manifest_file = os.path.join(output_folder, MANIFEST_NAME)
+    manifest = load_manifest(manifest_file) if incremental else {}
+
+    # 遍历输入文件夹中的所有 PCD 文件，跳过未变化的文件
+    jobs = []
+    stats = {}
+    skipped = 0
+    for entry in os.scandir(input_folder):
+        if not entry.name.endswith('.pcd') or not entry.is_file():
+            continue
+        file_name = entry.name
+        output_csv_file = os.path.join(
+            output_folder, f"{file_name[:-4]}.csv")  # 使用相同的文件名，仅更改扩展名
+        stat = entry.stat()
+        if incremental and is_up_to_date(manifest.get(file_name), stat, output_csv_file):
+            skipped += 1
+            continue
+        stats[file_name] = stat
+        jobs.append((file_name, entry.path, output_csv_file))
+
+    print(f"{len(jobs)} files to convert, {skipped} up to date")
+
+    # 每完成一批文件保存一次记录，中途退出时已完成的文件不会重复转换
+    failed = []
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for file_name, error in executor.map(_convert_job, jobs, chunksize=64):
+            if error is not None:
+                print(f"Error converting {file_name}: {error}")
+                failed.append(file_name)
+                manifest.pop(file_name, None)
+            else:
+                stat = stats[file_name]
+                output_csv_file = os.path.join(output_folder, f"{file_name[:-4]}.csv")
+                manifest[file_name] = {
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'csv_size': os.path.getsize(output_csv_file),
+                }
+            done += 1
+            if done % MANIFEST_SAVE_INTERVAL == 0:
+                save_manifest(manifest_file, manifest)
+
+    save_manifest(manifest_file, manifest)
+    print(f"Converted {len(jobs) - len(failed)} files, {len(failed)} failed, {skipped} skipped")
+
+
+def convert(options):
+    convert_pcd_folder_to_csv(options.input_folder, options.output_folder, options.num_workers)
+
+    print("PCD to CSV conversion complete.")
@@ -0,0 +1,395 @@
+import struct
+import numpy as np
+
+try:
+    # python-lzf（pip install python-lzf），没有安装时使用下面的纯 Python 实现
+    import lzf
+except ImportError:
+    lzf = None
+
+# PCD 支持的数据格式
+PCD_DATA_FORMATS = ("ascii", "binary", "binary_compressed")
+
+# numpy dtype.kind 与 PCD TYPE 的对应关系
+PCD_TYPES = {"f": "F", "i": "I", "u": "U", "b": "U"}
+
+# LZF 格式限制：回溯距离最大 8192，匹配长度最大 264，字面量一段最长 32 字节
+LZF_MAX_OFF = 1 << 13
+LZF_MAX_REF = (1 << 8) + (1 << 3)
+LZF_MAX_LIT = 1 << 5
+
+# 没有 python-lzf 时只提示一次纯 Python 压缩很慢
+_slow_lzf_warned = False
+
+
+def pcd_type_of(dtype):
+    """根据 numpy dtype 返回 PCD 的 (SIZE, TYPE)"""
+    dtype = np.dtype(dtype)
+    if dtype.kind not in PCD_TYPES or dtype.itemsize not in (1, 2, 4, 8):
+        raise ValueError(f"Unsupported column dtype for PCD: {dtype}")
+    if dtype.kind == "f" and dtype.itemsize not in (4, 8):
+        raise ValueError(f"Unsupported column dtype for PCD: {dtype}")
+    return dtype.itemsize, PCD_TYPES[dtype.kind]
+
+
+def build_pcd_header(fields, sizes, types, num_points, data_format, counts=None):
+    """生成 PCD v0.7 文件头，counts 为各字段的元素个数（默认都为 1）"""
+    counts = counts or [1] * len(fields)
+    return (
+        "# .PCD v0.7 - Point Cloud Data file format\n"
+        "VERSION 0.7\n"
+        f"FIELDS {' '.join(fields)}\n"
+        f"SIZE {' '.join(str(size) for size in sizes)}\n"
+        f"TYPE {' '.join(types)}\n"
+        f"COUNT {' '.join(str(count) for count in counts)}\n"
+        f"WIDTH {num_points}\n"
+        "HEIGHT 1\n"
+        "VIEWPOINT 0 0 0 1 0 0 0\n"
+        f"POINTS {num_points}\n"
+        f"DATA {data_format}\n"
+    )
+
+
+def _lzf_literals(out, data, start, end):
+    """把 data[start:end] 作为字面量写入，每段最多 32 字节"""
+    while start < end:
+        length = min(LZF_MAX_LIT, end - start)
+        out.append(length - 1)
+        out += data[start : start + length]
+        start += length
+
+
+def _lzf_compress_py(data):
+    """纯 Python 的 LZF 压缩，输出可被 liblzf/PCL 的 lzf_decompress 解压"""
+    n = len(data)
+    out = bytearray()
+    table = {}
+    i = 0
+    literal_start = 0
+    while i < n - 2:
+        key = data[i : i + 3]
+        ref = table.get(key)
+        table[key] = i
+        if ref is None or i - ref - 1 >= LZF_MAX_OFF:
+            i += 1
+            continue
+
+        # 计算匹配长度
+        max_len = min(LZF_MAX_REF, n - i)
+        length = 3
+        while length < max_len and data[ref + length] == data[i + length]:
+            length += 1
+
+        _lzf_literals(out, data, literal_start, i)
+        off = i - ref - 1
+        length -= 2
+        if length < 7:
+            out.append((length << 5) | (off >> 8))
+        else:
+            out.append((7 << 5) | (off >> 8))
+            out.append(length - 7)
+        out.append(off & 0xFF)
+
+        i += length + 2
+        literal_start = i
+
+    _lzf_literals(out, data, literal_start, n)
+    return bytes(out)
+
+
+def _lzf_decompress_py(data, expected_size):
+    """纯 Python 的 LZF 解压"""
+    out = bytearray()
+    i = 0
+    n = len(data)
+    while i < n:
+        ctrl = data[i]
+        i += 1
+        if ctrl < LZF_MAX_LIT:
+            # 字面量
+            length = ctrl + 1
+            out += data[i : i + length]
+            i += length
+            continue
+
+        # 回溯引用
+        length = ctrl >> 5
+        if length == 7:
+            length += data[i]
+            i += 1
+        ref = len(out) - ((ctrl & 0x1F) << 8) - data[i] - 1
+        i += 1
+        length += 2
+        if ref < 0:
+            raise ValueError("Invalid LZF data: back reference out of range")
+        if ref + length <= len(out):
+            out += out[ref : ref + length]
+        else:
+            # 引用与输出重叠时逐字节复制
+            for k in range(length):
+                out.append(out[ref + k])
+
+    if len(out) != expected_size:
+        raise ValueError(
+            f"LZF decompressed size {len(out)} does not match expected {expected_size}"
+        )
+    return bytes(out)
+
+
+def lzf_decompress(data, expected_size):
+    """LZF 解压，优先使用 python-lzf"""
+    if expected_size == 0:
+        return b""
+    if lzf is not None:
+        decompressed = lzf.decompress(bytes(data), expected_size)
+        if decompressed is None:
+            raise ValueError("Invalid LZF data")
+        return decompressed
+    return _lzf_decompress_py(data, expected_size)
+
+
+def lzf_compress(data):
+    """LZF 压缩，优先使用 python-lzf，没有安装时使用纯 Python 实现（很慢，提示一次）"""
+    global _slow_lzf_warned
+    data = bytes(data)
+    if not data:
+        return b""
+    if lzf is not None:
+        # 数据不可压缩时 lzf.compress 返回 None，放宽输出长度上限
+        compressed = lzf.compress(data, len(data) + len(data) // LZF_MAX_LIT + 16)
+        if compressed is not None:
+            return compressed
+    elif not _slow_lzf_warned:
+        _slow_lzf_warned = True
+        print(
+            "Warning: python-lzf is not installed, binary_compressed uses a slow pure Python "
+            "LZF compressor (pip install python-lzf, or use data_format 'binary')"
+        )
+    return _lzf_compress_py(data)
+
+
+def format_rows(points, sep):
+    """把结构化数组格式化为文本行，每列整体转换为字符串
+
+    float32 按 float32 的最短表示输出，不会出现 0.10000000149011612 这样的尾数。
+    多元素字段（COUNT > 1）的各元素依次输出为多列。
+    """
+    columns = []
+    for name in points.dtype.names:
+        column = points[name].reshape(len(points), -1)
+        columns.extend(column[:, a].astype(str) for a in range(column.shape[1]))
+    return "".join(sep.join(row) + "\n" for row in zip(*columns))
+
+
+def to_structured(df, columns):
+    """把 DataFrame 的指定列转换为紧凑的结构化数组，各列保留原始 dtype"""
+    dtype = np.dtype([(name, df[name].to_numpy().dtype) for name in columns])
+    points = np.empty(len(df), dtype=dtype)
+    for name in columns:
+        points[name] = df[name].to_numpy()
+    return points
+
+
+def write_pcd(pcd_file_path, points, data_format="ascii"):
+    """把结构化数组写为 PCD 文件
+
+    ascii：每个点一行；binary：结构化数组按行存储后一次性写出；
+    binary_compressed：按列存储后 LZF 压缩，与 PCL 的格式一致。
+    子数组字段（如 ("feature", "<f4", (4,))）写为 COUNT > 1 的字段。
+    """
+    if data_format not in PCD_DATA_FORMATS:
+        raise ValueError(
+            f"Unsupported PCD data format '{data_format}', "
+            f"expected one of {PCD_DATA_FORMATS}"
+        )
+
+    fields = list(points.dtype.names)
+    sizes, types, counts = [], [], []
+    for name in fields:
+        field_dtype = points.dtype.fields[name][0]
+        size, pcd_type = pcd_type_of(field_dtype.base)
+        sizes.append(size)
+        types.append(pcd_type)
+        counts.append(int(np.prod(field_dtype.shape, dtype=np.int64)))
+
+    # PCD 二进制数据为小端、无填充
+    packed_dtype = np.dtype(
+        [(name, points.dtype.fields[name][0].newbyteorder("<")) for name in fields]
+    )
+    header = build_pcd_header(fields, sizes, types, len(points), data_format, counts)
+
+    with open(pcd_file_path, "wb") as f:
+        f.write(header.encode("ascii"))
+
+        if data_format == "ascii":
+            f.write(format_rows(points, " ").encode("ascii"))
+
+        elif data_format == "binary":
+            points.astype(packed_dtype).tofile(f)
+
+        else:
+            # 按列存储：先写所有点的第一个字段，再写第二个字段……
+            # COUNT > 1 的字段为一块，块内每个点的各元素连续存放
+            uncompressed = b"".join(
+                np.ascontiguousarray(points[name], dtype=packed_dtype[name].base).tobytes()
+                for name in fields
+            )
+            compressed = lzf_compress(uncompressed)
+            f.write(struct.pack("<II", len(compressed), len(uncompressed)))
+            f.write(compressed)
+
+
+# PCD 的 TYPE/SIZE 与 numpy 类型的对应关系
+PCD_NUMPY_TYPES = {
+    ("F", 4): "<f4",
+    ("F", 8): "<f8",
+    ("I", 1): "i1",
+    ("I", 2): "<i2",
+    ("I", 4): "<i4",
+    ("I", 8): "<i8",
+    ("U", 1): "u1",
+    ("U", 2): "<u2",
+    ("U", 4): "<u4",
+    ("U", 8): "<u8",
+}
+
+
+def parse_pcd_header(f):
+    """读取 PCD 文件头，返回 (header, 数据起始位置)
+
+    header 为 {关键字: [值...]}，文件指针停在 DATA 行之后。
+    """
+    header = {}
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("Invalid PCD file: missing DATA line")
+        line = line.decode("ascii", errors="replace").strip()
+        if not line or line.startswith("#"):
+            continue
+        key, *values = line.split()
+        header[key.upper()] = values
+        if key.upper() == "DATA":
+            return header, f.tell()
+
+
+def pcd_fields(header):
+    """根据 FIELDS/SIZE/TYPE/COUNT 返回 [(展开后的列名列表, numpy 类型)]，每个字段一项
+
+    COUNT > 1 的字段展开为 name_0、name_1 ...；PCL 用 "_" 命名的填充字段
+    命名为 _<序号>，由 read_pcd 去掉。
+    """
+    fields = header["FIELDS"]
+    sizes = [int(size) for size in header["SIZE"]]
+    types = [pcd_type.upper() for pcd_type in header["TYPE"]]
+    counts = [int(count) for count in header.get("COUNT", ["1"] * len(fields))]
+
+    result = []
+    for i, (name, size, pcd_type, count) in enumerate(zip(fields, sizes, types, counts)):
+        base = PCD_NUMPY_TYPES.get((pcd_type, size))
+        if base is None:
+            raise ValueError(f"Unsupported PCD field '{name}': TYPE {pcd_type} SIZE {size}")
+        if name == "_":
+            name = f"_{i}"
+        names = [f"{name}_{a}" for a in range(count)] if count > 1 else [name]
+        result.append((names, base))
+    return result
+
+
+def pcd_dtype(header):
+    """根据文件头构建按行存储的结构化 dtype，COUNT > 1 的字段展开为多列
+
+    填充字段也保留在 dtype 中（保证偏移正确），由 read_pcd 去掉。
+    """
+    names, formats = [], []
+    for field_names, base in pcd_fields(header):
+        names.extend(field_names)
+        formats.extend(base for _ in field_names)
+    return np.dtype({"names": names, "formats": formats})
+
+
+def read_pcd(pcd_file_path, keep_padding=False):
+    """读取 PCD 文件为一维结构化数组，包含文件中声明的全部字段
+
+    支持 ascii、binary（np.memmap 直接映射，不做拷贝）和 binary_compressed。
+    """
+    with open(pcd_file_path, "rb") as f:
+        header, data_offset = parse_pcd_header(f)
+        dtype = pcd_dtype(header)
+        data_format = header["DATA"][0].lower()
+        if "POINTS" in header:
+            num_points = int(header["POINTS"][0])
+        else:
+            num_points = int(header["WIDTH"][0]) * int(header["HEIGHT"][0])
+
+        if data_format == "ascii":
+            points = np.loadtxt(f, dtype=dtype, ndmin=1, max_rows=num_points)
+
+        elif data_format == "binary":
+            if num_points == 0:
+                points = np.empty(0, dtype=dtype)
+            else:
+                points = np.memmap(
+                    pcd_file_path, dtype=dtype, mode="r",
+                    offset=data_offset, shape=(num_points,),
+                )
+
+        elif data_format == "binary_compressed":
+            compressed_size, uncompressed_size = struct.unpack("<II", f.read(8))
+            data = lzf_decompress(f.read(compressed_size), uncompressed_size)
+            # 按列存储：依次为每个字段所有点的数据；COUNT > 1 的字段为一块，
+            # 块内每个点的各元素连续存放，按 (点数, COUNT) 读取后拆成各列
+            points = np.empty(num_points, dtype=dtype)
+            offset = 0
+            for field_names, base in pcd_fields(header):
+                count = len(field_names)
+                block = np.frombuffer(
+                    data, dtype=base, count=num_points * count, offset=offset
+                ).reshape(num_points, count)
+                for a, name in enumerate(field_names):
+                    points[name] = block[:, a]
+                offset += block.nbytes
+
+        else:
+            raise ValueError(f"Unsupported PCD data format '{data_format}'")
+
+    if not keep_padding:
+        names = [name for name in dtype.names if not name.startswith("_")]
+        if len(names) != len(dtype.names):
+            points = points[names]
+    return points
+
+
+def write_csv(csv_file_path, points):
+    """把结构化数组的全部字段写为 CSV 文件"""
+    with open(csv_file_path, "w") as f:
+        f.write(",".join(points.dtype.names) + "\n")
+        f.write(format_rows(points, ","))
+
+
+def pcd_to_csv(pcd_file, csv_file):
+    """把 PCD 文件转换为 CSV，保留文件中声明的全部字段（如雷达的速度、RCS）"""
+    write_csv(csv_file, read_pcd(pcd_file))
+
+
+if __name__ == "__main__":
+    # 自检：三种格式写出再读回（含 COUNT > 1 的字段），读回的数据应与写出的相同
+    import os
+    import tempfile
+
+    rng = np.random.default_rng(0)
+    points = np.zeros(1000, dtype=[("x", "<f4"), ("feature", "<f4", (3,)), ("ring", "<u2")])
+    points["x"] = rng.normal(size=len(points))
+    points["feature"] = rng.normal(size=(len(points), 3))
+    points["ring"] = np.arange(len(points)) % 32
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for data_format in PCD_DATA_FORMATS:
+            pcd_file_path = os.path.join(tmp_dir, f"{data_format}.pcd")
+            write_pcd(pcd_file_path, points, data_format)
+            result = read_pcd(pcd_file_path)
+            assert result.dtype.names == ("x", "feature_0", "feature_1", "feature_2", "ring")
+            assert np.array_equal(result["x"], points["x"]), data_format
+            assert np.array_equal(result["ring"], points["ring"]), data_format
+            for a in range(3):
+                assert np.array_equal(result[f"feature_{a}"], points["feature"][:, a]), data_format
+            print(f"{data_format}: OK")
@@ -0,0 +1,116 @@
+import numpy as np
+
+# sensor_msgs/msg/PointField 中 datatype 与 numpy 类型的对应关系
+POINTFIELD_DTYPES = {
+    1: "i1",  # INT8
+    2: "u1",  # UINT8
+    3: "i2",  # INT16
+    4: "u2",  # UINT16
+    5: "i4",  # INT32
+    6: "u4",  # UINT32
+    7: "f4",  # FLOAT32
+    8: "f8",  # FLOAT64
+}
+
+
+def dtype_from_fields(fields, point_step, is_bigendian=False):
+    """根据 PointCloud2 的 fields/point_step/is_bigendian 构建结构化 dtype
+
+    count > 1 的字段展开为 name_0、name_1 ... 与 sensor_msgs_py 的命名一致。
+    """
+    byte_order = ">" if is_bigendian else "<"
+    names = []
+    formats = []
+    offsets = []
+    for i, field in enumerate(fields):
+        if field.datatype not in POINTFIELD_DTYPES:
+            raise ValueError(
+                f"Unsupported PointField datatype {field.datatype} for '{field.name}'"
+            )
+        base = np.dtype(byte_order + POINTFIELD_DTYPES[field.datatype])
+        name = field.name if field.name else f"unnamed_field_{i}"
+        for a in range(field.count):
+            names.append(f"{name}_{a}" if field.count > 1 else name)
+            formats.append(base)
+            offsets.append(field.offset + a * base.itemsize)
+    return np.dtype(
+        {"names": names, "formats": formats, "offsets": offsets, "itemsize": point_step}
+    )
+
+
+class PointCloud2Decoder:
+    """把 PointCloud2 消息解码为 numpy 结构化数组
+
+    每个话题的 dtype 只构建一次并缓存，字段布局变化时才重新构建；
+    msg.data 通过 np.frombuffer 直接映射，不做拷贝。
+    """
+
+    def __init__(self, skip_nans=True):
+        self.skip_nans = skip_nans
+        # topic -> (layout, dtype, float_fields)
+        self._cache = {}
+
+    def _get_dtype(self, topic, msg):
+        layout = (
+            tuple((f.name, f.offset, f.datatype, f.count) for f in msg.fields),
+            msg.point_step,
+            bool(msg.is_bigendian),
+        )
+        cached = self._cache.get(topic)
+        if cached is not None and cached[0] == layout:
+            return cached[1], cached[2]
+
+        dtype = dtype_from_fields(msg.fields, msg.point_step, msg.is_bigendian)
+        float_fields = [
+            name for name in dtype.names if dtype.fields[name][0].kind == "f"
+        ]
+        self._cache[topic] = (layout, dtype, float_fields)
+        return dtype, float_fields
+
+    def decode(self, topic, msg):
+        """解码单帧点云，返回一维结构化数组（已按需去除 NaN 点）"""
+        dtype, float_fields = self._get_dtype(topic, msg)
+        num_points = msg.width * msg.height
+        if num_points == 0:
+            return np.empty(0, dtype=dtype)
+
+        if msg.height <= 1 or msg.row_step == msg.width * msg.point_step:
+            points = np.frombuffer(msg.data, dtype=dtype, count=num_points)
+        else:
+            # 行之间有填充字节时按 row_step 跨行映射
+            points = np.ndarray(
+                shape=(msg.height, msg.width),
+                dtype=dtype,
+                buffer=msg.data,
+                strides=(msg.row_step, msg.point_step),
+            ).reshape(-1)
+
+        if self.skip_nans and float_fields:
+            mask = np.ones(num_points, dtype=bool)
+            for name in float_fields:
+                mask &= ~np.isnan(points[name])
+            if not mask.all():
+                points = points[mask]
+        return points
+
+
+def decode_pointcloud(msg, skip_nans=True):
+    """把 sensor_msgs/PointCloud 消息转换为结构化数组 (x, y, z, 各通道)"""
+    num_points = len(msg.points)
+    names = ["x", "y", "z"] + [channel.name for channel in msg.channels]
+    points = np.empty(num_points, dtype=[(name, "f4") for name in names])
+    if num_points == 0:
+        return points
+
+    xyz = np.array([(p.x, p.y, p.z) for p in msg.points], dtype=np.float32)
+    points["x"], points["y"], points["z"] = xyz[:, 0], xyz[:, 1], xyz[:, 2]
+    for channel in msg.channels:
+        points[channel.name] = np.asarray(channel.values, dtype=np.float32)
+
+    if skip_nans:
+        mask = np.ones(num_points, dtype=bool)
+        for name in names:
+            mask &= ~np.isnan(points[name])
+        if not mask.all():
+            points = points[mask]
+    return points
@@ -0,0 +1,440 @@
+import os
+import numpy as np
+
+# 支持的输出格式：csv 同时输出 CSV 和空格分隔的 TXT，
+# parquet/feather 为列式存储，保留原始数据类型
+OUTPUT_FORMATS = ("csv", "parquet", "feather")
+
+# 输出布局：flat 每个点一行，每行重复 frame_id/timestamp；
+# normalized 拆分为帧表和点表，点表只包含点的字段
+OUTPUT_LAYOUTS = ("flat", "normalized")
+
+# normalized 布局中帧表的列：帧号、话题、消息头时间戳、bag 接收时间戳、
+# 点数、该帧第一个点在点表中的行号
+FRAME_COLUMNS = ["frame_id", "topic", "stamp_ns", "timestamp_ns", "num_points", "offset"]
+
+
+def frame_to_dataframe(frame_id, stamp_ns, points):
+    """把一帧点云的结构化数组转换为带 frame_id/timestamp 列的 DataFrame
+
+    timestamp 格式化为 "sec.nsec" 字符串，用于文本输出。
+    """
+    import pandas as pd
+
+    df = pd.DataFrame({name: points[name] for name in points.dtype.names})
+    secs, nsecs = divmod(stamp_ns, 1_000_000_000)
+    df.insert(0, "timestamp", f"{secs}.{nsecs:09d}")
+    df.insert(0, "frame_id", frame_id)
+    return df
+
+
+def points_to_columns(points):
+    """结构化数组的字段是带步长的视图，拷贝为连续数组后再交给 arrow"""
+    return {name: np.ascontiguousarray(points[name]) for name in points.dtype.names}
+
+
+def frame_to_table(frame_id, stamp_ns, points):
+    """把一帧点云转换为 pyarrow Table，字段保留原始类型，时间戳为 int64 纳秒"""
+    import pyarrow as pa
+
+    num_points = len(points)
+    columns = {
+        "frame_id": np.full(num_points, frame_id, dtype=np.int64),
+        "timestamp_ns": np.full(num_points, stamp_ns, dtype=np.int64),
+    }
+    columns.update(points_to_columns(points))
+    return pa.table(columns)
+
+
+def _open_arrow_sink(output_file, output_format, schema):
+    """打开 Parquet 或 Arrow IPC 写出器"""
+    import pyarrow as pa
+
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(output_file, schema)
+    return pa.ipc.new_file(output_file, schema)
+
+
+class PointCloudTopicWriter:
+    """单个话题、单种消息类型的点云流式写出器（CSV/TXT）
+
+    每帧的 DataFrame 先放入缓冲区，缓冲的点数达到 chunk_points 时
+    追加写入 CSV/TXT 并清空缓冲，因此内存占用只与 chunk_points 有关，
+    与 bag 文件大小无关。
+    """
+
+    def __init__(self, output_base, chunk_points=200_000):
+        self.output_csv = output_base + ".csv"
+        self.output_txt = output_base + ".txt"
+        self.chunk_points = chunk_points
+        self.columns = None
+        self.frames = []
+        self.buffered_points = 0
+        self.total_points = 0
+        self.total_frames = 0
+        self._started = False
+
+    def write_frame(self, frame_id, stamp_ns, points, receive_ns=None):
+        """缓存一帧点云，超过 chunk_points 时写出"""
+        df = frame_to_dataframe(frame_id, stamp_ns, points)
+        if self.columns is None:
+            self.columns = list(df.columns)
+        elif list(df.columns) != self.columns:
+            # 同一话题字段布局变化时，按第一帧的列对齐，保证文件列一致
+            df = df.reindex(columns=self.columns)
+
+        self.frames.append(df)
+        self.buffered_points += len(df)
+        self.total_frames += 1
+        if self.buffered_points >= self.chunk_points:
+            self.flush()
+
+    def flush(self):
+        """把缓冲区中的帧追加写入文件"""
+        if not self.frames:
+            return
+        import pandas as pd
+
+        df = pd.concat(self.frames, ignore_index=True)
+        self.frames = []
+        self.buffered_points = 0
+
+        # 第一次写出时覆盖旧文件并写表头，之后追加
+        mode = "a" if self._started else "w"
+        header = not self._started
+        df.to_csv(self.output_csv, mode=mode, header=header, index=False)
+        df.to_csv(self.output_txt, mode=mode, header=header, sep=" ", index=False)
+        self._started = True
+        self.total_points += len(df)
+
+    def checkpoint(self):
+        """写出缓冲区，返回断点状态（已写出的文件长度等）"""
+        self.flush()
+        state = {
+            "columns": self.columns,
+            "total_points": self.total_points,
+            "total_frames": self.total_frames,
+            "started": self._started,
+        }
+        if self._started:
+            state["csv_size"] = os.path.getsize(self.output_csv)
+            state["txt_size"] = os.path.getsize(self.output_txt)
+        return state
+
+    def restore(self, state):
+        """从断点恢复：文件截断到断点时的长度，之后继续追加"""
+        self.columns = state["columns"]
+        self.total_points = state["total_points"]
+        self.total_frames = state["total_frames"]
+        self._started = state["started"]
+        if self._started:
+            os.truncate(self.output_csv, state["csv_size"])
+            os.truncate(self.output_txt, state["txt_size"])
+
+    def close(self):
+        self.flush()
+        if self._started:
+            print(f"点云数据已保存到 {self.output_csv}")
+            print(f"点云数据已保存到 {self.output_txt}")
+
+
+class ColumnarTopicWriter:
+    """单个话题的列式写出器（Parquet/Feather）
+
+    每帧直接写出：Parquet 每帧一个 row group，Feather (Arrow IPC) 每帧一个
+    record batch，下游可以按帧读取或内存映射，不需要重新解析文本。
+    """
+
+    def __init__(self, output_base, output_format="parquet"):
+        self.output_format = output_format
+        suffix = ".parquet" if output_format == "parquet" else ".feather"
+        self.output_file = output_base + suffix
+        self.schema = None
+        self.total_points = 0
+        self.total_frames = 0
+        self._sink = None
+
+    def write_frame(self, frame_id, stamp_ns, points, receive_ns=None):
+        table = frame_to_table(frame_id, stamp_ns, points)
+        if self._sink is None:
+            self.schema = table.schema
+            self._sink = _open_arrow_sink(self.output_file, self.output_format, self.schema)
+        elif not table.schema.equals(self.schema):
+            # 同一话题字段布局变化时，按第一帧的 schema 对齐
+            table = _align_table(table, self.schema)
+
+        self._sink.write_table(table)
+        self.total_points += table.num_rows
+        self.total_frames += 1
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self._sink is None:
+            return
+        self._sink.close()
+        self._sink = None
+        print(f"点云数据已保存到 {self.output_file}")
+
+
+def _align_table(table, schema):
+    """按 schema 补齐缺失列并转换类型"""
+    import pyarrow as pa
+
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            columns.append(table.column(field.name).cast(field.type))
+        else:
+            columns.append(pa.nulls(table.num_rows, type=field.type))
+    return pa.table(columns, schema=schema)
+
+
+class NormalizedTextWriter:
+    """normalized 布局的 CSV 写出器：<kind>_frames.csv 和 <kind>_points.csv
+
+    点表只包含点的字段；帧表每帧一行，除 offset（点表中的行号）外还记录
+    byte_offset（该帧第一个点在点表文件中的字节位置），读取时可以直接 seek。
+    点表按 chunk_points 缓冲后写出，内存占用与 bag 大小无关。
+    """
+
+    def __init__(self, output_base, topic, chunk_points=200_000):
+        self.output_points = output_base + "_points.csv"
+        self.output_frames = output_base + "_frames.csv"
+        self.topic = topic
+        self.chunk_points = chunk_points
+        self.columns = None
+        self.point_offset = 0
+        self.byte_offset = 0
+        self.total_frames = 0
+        self._parts = []
+        self._frame_rows = []
+        self._buffered_points = 0
+        self._points_file = None
+        self._frames_file = None
+
+    def _open(self, columns):
+        self.columns = columns
+        self._points_file = open(self.output_points, "wb")
+        self._frames_file = open(self.output_frames, "w")
+        header = (",".join(columns) + "\n").encode()
+        self._points_file.write(header)
+        self.byte_offset = len(header)
+        self._frames_file.write(",".join(FRAME_COLUMNS + ["byte_offset"]) + "\n")
+
+    def write_frame(self, frame_id, stamp_ns, points, receive_ns=None):
+        import pandas as pd
+
+        df = pd.DataFrame({name: points[name] for name in points.dtype.names})
+        if self.columns is None:
+            self._open(list(df.columns))
+        elif list(df.columns) != self.columns:
+            # 同一话题字段布局变化时，按第一帧的列对齐，保证文件列一致
+            df = df.reindex(columns=self.columns)
+
+        data = df.to_csv(header=False, index=False).encode() if len(df) else b""
+        self._frame_rows.append(
+            f"{frame_id},{self.topic},{stamp_ns},{receive_ns},"
+            f"{len(df)},{self.point_offset},{self.byte_offset}\n"
+        )
+        self._parts.append(data)
+        self.point_offset += len(df)
+        self.byte_offset += len(data)
+        self._buffered_points += len(df)
+        self.total_frames += 1
+        if self._buffered_points >= self.chunk_points:
+            self.flush()
+
+    def flush(self):
+        if self._points_file is None:
+            return
+        self._points_file.write(b"".join(self._parts))
+        self._frames_file.write("".join(self._frame_rows))
+        self._parts = []
+        self._frame_rows = []
+        self._buffered_points = 0
+
+    def checkpoint(self):
+        """写出缓冲区，返回断点状态（已写出的文件长度、行号/字节位置等）"""
+        if self._points_file is None:
+            return None
+        self.flush()
+        self._points_file.flush()
+        self._frames_file.flush()
+        return {
+            "columns": self.columns,
+            "point_offset": self.point_offset,
+            "byte_offset": self.byte_offset,
+            "total_frames": self.total_frames,
+            "points_size": self._points_file.tell(),
+            "frames_size": self._frames_file.tell(),
+        }
+
+    def restore(self, state):
+        """从断点恢复：文件截断到断点时的长度，之后继续追加"""
+        if state is None:
+            return
+        self.columns = state["columns"]
+        self.point_offset = state["point_offset"]
+        self.byte_offset = state["byte_offset"]
+        self.total_frames = state["total_frames"]
+        os.truncate(self.output_points, state["points_size"])
+        os.truncate(self.output_frames, state["frames_size"])
+        self._points_file = open(self.output_points, "ab")
+        self._frames_file = open(self.output_frames, "a")
+
+    def close(self):
+        if self._points_file is None:
+            return
+        self.flush()
+        self._points_file.close()
+        self._frames_file.close()
+        self._points_file = None
+        print(f"点云数据已保存到 {self.output_points}")
+        print(f"帧索引已保存到 {self.output_frames}")
+
+
+class NormalizedColumnarWriter:
+    """normalized 布局的列式写出器（Parquet/Feather）
+
+    点表每帧一个 row group / record batch，只包含点的字段；
+    帧表在结束时写出，offset 为该帧第一个点在点表中的行号。
+    """
+
+    def __init__(self, output_base, topic, output_format="parquet"):
+        self.output_format = output_format
+        suffix = ".parquet" if output_format == "parquet" else ".feather"
+        self.output_points = output_base + "_points" + suffix
+        self.output_frames = output_base + "_frames" + suffix
+        self.topic = topic
+        self.schema = None
+        self.point_offset = 0
+        self.total_frames = 0
+        self._frames = {name: [] for name in FRAME_COLUMNS}
+        self._sink = None
+
+    def write_frame(self, frame_id, stamp_ns, points, receive_ns=None):
+        import pyarrow as pa
+
+        table = pa.table(points_to_columns(points))
+        if self._sink is None:
+            self.schema = table.schema
+            self._sink = _open_arrow_sink(self.output_points, self.output_format, self.schema)
+        elif not table.schema.equals(self.schema):
+            table = _align_table(table, self.schema)
+        self._sink.write_table(table)
+
+        for name, value in zip(
+            FRAME_COLUMNS,
+            (frame_id, self.topic, stamp_ns, receive_ns, table.num_rows, self.point_offset),
+        ):
+            self._frames[name].append(value)
+        self.point_offset += table.num_rows
+        self.total_frames += 1
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self._sink is None:
+            return
+        import pyarrow as pa
+
+        self._sink.close()
+        self._sink = None
+
+        frames = pa.table(
+            {
+                name: pa.array(values, type=pa.string() if name == "topic" else pa.int64())
+                for name, values in self._frames.items()
+            }
+        )
+        sink = _open_arrow_sink(self.output_frames, self.output_format, frames.schema)
+        sink.write_table(frames)
+        sink.close()
+        print(f"点云数据已保存到 {self.output_points}")
+        print(f"帧索引已保存到 {self.output_frames}")
+
+
+class PointCloudWriterSet:
+    """按 (话题, 消息类型) 管理点云写出器，每个话题写入自己的子目录"""
+
+    def __init__(self, output_dir, chunk_points=200_000, output_format="csv", layout="flat"):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"Unsupported output format '{output_format}', "
+                f"expected one of {OUTPUT_FORMATS}"
+            )
+        if layout not in OUTPUT_LAYOUTS:
+            raise ValueError(
+                f"Unsupported output layout '{layout}', expected one of {OUTPUT_LAYOUTS}"
+            )
+        self.output_dir = output_dir
+        self.chunk_points = chunk_points
+        self.output_format = output_format
+        self.layout = layout
+        self.writers = {}
+
+    def get(self, topic, kind):
+        """获取话题的写出器，kind 为 PointCloud2 或 PointCloud"""
+        key = (topic, kind)
+        writer = self.writers.get(key)
+        if writer is None:
+            # 将话题名称中的斜杠替换为下划线
+            topic_output_dir = os.path.join(self.output_dir, topic.replace("/", "_"))
+            os.makedirs(topic_output_dir, exist_ok=True)
+            output_base = os.path.join(topic_output_dir, kind)
+            if self.layout == "normalized":
+                if self.output_format == "csv":
+                    writer = NormalizedTextWriter(output_base, topic, self.chunk_points)
+                else:
+                    writer = NormalizedColumnarWriter(output_base, topic, self.output_format)
+            elif self.output_format == "csv":
+                writer = PointCloudTopicWriter(output_base, self.chunk_points)
+            else:
+                writer = ColumnarTopicWriter(output_base, self.output_format)
+            self.writers[key] = writer
+        return writer
+
+    def write_frame(self, topic, kind, frame_id, stamp_ns, points, receive_ns=None):
+        """写入一帧，stamp_ns 为消息头时间戳，receive_ns 为 bag 中的接收时间戳"""
+        self.get(topic, kind).write_frame(frame_id, stamp_ns, points, receive_ns)
+
+    @property
+    def resumable(self):
+        """csv 文件可以截断到断点后继续追加；parquet/feather 的文件尾
+        要在关闭时才写出，中断后的文件无法继续写，因此不支持断点续写"""
+        return self.output_format == "csv"
+
+    def checkpoint(self):
+        """写出所有缓冲区，返回 [[话题, 类型, 写出器状态]]（仅 csv 格式）"""
+        return [
+            [topic, kind, writer.checkpoint()]
+            for (topic, kind), writer in self.writers.items()
+        ]
+
+    def restore(self, states):
+        """按 checkpoint() 返回的状态恢复所有写出器"""
+        for topic, kind, state in states:
+            self.get(topic, kind).restore(state)
+
+    def close(self):
+        """关闭所有写出器，有写出失败时在全部关闭后抛出异常，避免不完整的输出被当作完成"""
+        failed = []
+        for (topic, kind), writer in self.writers.items():
+            try:
+                writer.close()
+            except Exception as e:
+                print(f"Error saving PointCloud data: {e}")
+                failed.append(topic)
+        if failed:
+            raise RuntimeError(f"Failed to save point clouds of topics {failed}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
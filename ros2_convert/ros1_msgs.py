@@ -0,0 +1,143 @@
+import struct
+from types import SimpleNamespace
+
+
+class Time:
+    """ROS1 time，属性与 rospy.Time 一致，str() 输出纳秒整数"""
+
+    __slots__ = ("secs", "nsecs")
+
+    def __init__(self, secs, nsecs):
+        self.secs = secs
+        self.nsecs = nsecs
+
+    def to_nsec(self):
+        return self.secs * 1_000_000_000 + self.nsecs
+
+    def to_sec(self):
+        return self.secs + self.nsecs * 1e-9
+
+    def __str__(self):
+        return str(self.to_nsec())
+
+    __repr__ = __str__
+
+
+class Ros1Buffer:
+    """按 ROS1 序列化格式（小端、无对齐）顺序读取数据"""
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return values
+
+    def uint8(self):
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def uint32(self):
+        return self.unpack("<I")[0]
+
+    def string(self):
+        length = self.uint32()
+        value = bytes(self.data[self.pos : self.pos + length]).decode("utf-8", "replace")
+        self.pos += length
+        return value
+
+    def raw(self):
+        """uint8[]：返回 bytes"""
+        length = self.uint32()
+        value = bytes(self.data[self.pos : self.pos + length])
+        self.pos += length
+        return value
+
+    def float64_array(self, count):
+        return list(self.unpack(f"<{count}d"))
+
+    def header(self):
+        seq, secs, nsecs = self.unpack("<III")
+        frame_id = self.string()
+        return SimpleNamespace(seq=seq, stamp=Time(secs, nsecs), frame_id=frame_id)
+
+
+def _vector3(buf):
+    x, y, z = buf.unpack("<3d")
+    return SimpleNamespace(x=x, y=y, z=z)
+
+
+def deserialize_imu(data):
+    """sensor_msgs/Imu"""
+    buf = Ros1Buffer(data)
+    msg = SimpleNamespace(_type="sensor_msgs/Imu")
+    msg.header = buf.header()
+    x, y, z, w = buf.unpack("<4d")
+    msg.orientation = SimpleNamespace(x=x, y=y, z=z, w=w)
+    msg.orientation_covariance = buf.float64_array(9)
+    msg.angular_velocity = _vector3(buf)
+    msg.angular_velocity_covariance = buf.float64_array(9)
+    msg.linear_acceleration = _vector3(buf)
+    msg.linear_acceleration_covariance = buf.float64_array(9)
+    return msg
+
+
+def deserialize_pointcloud2(data):
+    """sensor_msgs/PointCloud2"""
+    buf = Ros1Buffer(data)
+    msg = SimpleNamespace(_type="sensor_msgs/PointCloud2")
+    msg.header = buf.header()
+    msg.height, msg.width = buf.unpack("<II")
+    msg.fields = []
+    for _ in range(buf.uint32()):
+        name = buf.string()
+        offset = buf.uint32()
+        datatype = buf.uint8()
+        count = buf.uint32()
+        msg.fields.append(
+            SimpleNamespace(name=name, offset=offset, datatype=datatype, count=count)
+        )
+    msg.is_bigendian = bool(buf.uint8())
+    msg.point_step, msg.row_step = buf.unpack("<II")
+    msg.data = buf.raw()
+    msg.is_dense = bool(buf.uint8())
+    return msg
+
+
+def deserialize_pointcloud(data):
+    """sensor_msgs/PointCloud"""
+    buf = Ros1Buffer(data)
+    msg = SimpleNamespace(_type="sensor_msgs/PointCloud")
+    msg.header = buf.header()
+    num_points = buf.uint32()
+    coords = buf.unpack(f"<{num_points * 3}f")
+    msg.points = [
+        SimpleNamespace(x=coords[i], y=coords[i + 1], z=coords[i + 2])
+        for i in range(0, len(coords), 3)
+    ]
+    msg.channels = []
+    for _ in range(buf.uint32()):
+        name = buf.string()
+        num_values = buf.uint32()
+        values = list(buf.unpack(f"<{num_values}f"))
+        msg.channels.append(SimpleNamespace(name=name, values=values))
+    return msg
+
+
+# 支持的消息类型及其反序列化函数
+DESERIALIZERS = {
+    "sensor_msgs/Imu": deserialize_imu,
+    "sensor_msgs/PointCloud2": deserialize_pointcloud2,
+    "sensor_msgs/PointCloud": deserialize_pointcloud,
+}
+
+
+def deserialize_message(data, msg_type):
+    """把 ROS1 序列化数据反序列化为消息对象，属性名与 rospy 消息一致"""
+    deserializer = DESERIALIZERS.get(msg_type)
+    if deserializer is None:
+        raise ValueError(f"Unsupported ROS1 message type '{msg_type}'")
+    return deserializer(data)
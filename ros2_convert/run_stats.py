@@ -0,0 +1,174 @@
+import json
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+def report_file(output_dir, db3_file, extractor):
+    """运行报告文件路径：<output_dir>/<db3 文件名>.<提取器>.report.json"""
+    base_name = os.path.splitext(os.path.basename(db3_file))[0]
+    return os.path.join(output_dir, f"{base_name}.{extractor}.report.json")
+
+
+def _new_stage():
+    return {"seconds": 0.0, "bytes": 0, "count": 0}
+
+
+class RunStats:
+    """按阶段、按话题累计耗时和字节数，定时输出进度，结束时生成运行报告
+
+    各阶段的耗时为累计值；在线程池中执行的阶段（如图像编码）是所有线程的
+    耗时之和，可能超过总耗时。progress_interval 秒内最多输出一行进度，
+    不再每条消息输出一行。trace_memory 为 True 时用 tracemalloc 统计
+    Python 分配的内存峰值（会明显变慢）。
+    """
+
+    def __init__(self, label, total=None, progress_interval=5.0, trace_memory=False):
+        self.label = label
+        self.total = total
+        self.progress_interval = progress_interval
+        self.trace_memory = trace_memory
+        self.messages = 0
+        self.bytes = 0
+        self.stages = {}
+        self.topics = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._last_progress = self._start
+        self._started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._peak_traced = 0
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _topic(self, topic):
+        info = self.topics.get(topic)
+        if info is None:
+            info = self.topics[topic] = {"messages": 0, "bytes": 0, "stages": {}}
+        return info
+
+    def add(self, stage, seconds, nbytes=0, topic=None):
+        """累计一次阶段耗时，可以在工作线程中调用"""
+        with self._lock:
+            entries = [self.stages.setdefault(stage, _new_stage())]
+            if topic is not None:
+                entries.append(self._topic(topic)["stages"].setdefault(stage, _new_stage()))
+            for entry in entries:
+                entry["seconds"] += seconds
+                entry["bytes"] += nbytes
+                entry["count"] += 1
+
+    @contextmanager
+    def stage(self, stage, topic=None, nbytes=0):
+        """with stats.stage("decode", topic): ... 统计代码块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, nbytes, topic)
+
+    def timed(self, stage, topic, func, nbytes=0):
+        """包装 func，调用时统计耗时（用于提交到线程池的任务）"""
+
+        def wrapper(*args):
+            with self.stage(stage, topic, nbytes):
+                return func(*args)
+
+        return wrapper
+
+    def iterate(self, iterable, stage="read"):
+        """逐条产出 iterable 的元素，取下一条的时间计入 stage"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - start)
+                return
+            self.add(stage, time.perf_counter() - start)
+            yield item
+
+    def message(self, topic, nbytes):
+        """记录处理了一条消息，需要时输出进度"""
+        with self._lock:
+            self.messages += 1
+            self.bytes += nbytes
+            info = self._topic(topic)
+            info["messages"] += 1
+            info["bytes"] += nbytes
+        if self.progress_interval is not None:
+            now = time.perf_counter()
+            if now - self._last_progress >= self.progress_interval:
+                self._last_progress = now
+                self.print_progress(now)
+
+    def _sample_memory(self):
+        if self.trace_memory and tracemalloc.is_tracing():
+            self._peak_traced = max(self._peak_traced, tracemalloc.get_traced_memory()[1])
+
+    def print_progress(self, now=None):
+        """输出一行进度：条数、百分比、速率、剩余时间"""
+        elapsed = (now or time.perf_counter()) - self._start
+        rate = self.messages / elapsed if elapsed > 0 else 0.0
+        line = f"[{self.label}] {self.messages}"
+        if self.total:
+            percent = 100.0 * self.messages / self.total
+            line += f"/{self.total} ({percent:.1f}%)"
+        line += f" 条，{rate:.1f} 条/秒，{self.bytes / 1e6 / max(elapsed, 1e-9):.1f} MB/秒"
+        if self.total and rate > 0:
+            line += f"，剩余约 {max(self.total - self.messages, 0) / rate:.0f} 秒"
+        self._sample_memory()
+        if self.trace_memory:
+            line += f"，内存峰值 {self._peak_traced / 1e6:.1f} MB"
+        print(line)
+
+    def report(self):
+        """运行报告（可 JSON 序列化）"""
+        elapsed = time.perf_counter() - self._start
+        self._sample_memory()
+        report = {
+            "label": self.label,
+            "started": self._started_at,
+            "elapsed_s": elapsed,
+            "messages": self.messages,
+            "bytes": self.bytes,
+            "messages_per_s": self.messages / elapsed if elapsed > 0 else 0.0,
+            "mb_per_s": self.bytes / 1e6 / elapsed if elapsed > 0 else 0.0,
+            # Linux 上 ru_maxrss 单位为 KB
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "stages": self.stages,
+            "topics": self.topics,
+        }
+        if self.trace_memory:
+            report["peak_traced_mb"] = self._peak_traced / 1e6
+        return report
+
+    def print_summary(self):
+        """输出各阶段耗时占比，找出时间花在哪里"""
+        report = self.report()
+        print(
+            f"[{self.label}] 共 {report['messages']} 条，{report['bytes'] / 1e6:.1f} MB，"
+            f"耗时 {report['elapsed_s']:.1f} 秒"
+        )
+        for stage, entry in sorted(self.stages.items(), key=lambda item: -item[1]["seconds"]):
+            share = 100.0 * entry["seconds"] / report["elapsed_s"] if report["elapsed_s"] else 0.0
+            print(f"  {stage:<12}{entry['seconds']:>10.2f} 秒 {share:>6.1f}%")
+
+    def save(self, report_file, extra=None):
+        """先写临时文件再替换，保存 JSON 运行报告，extra 中的键值一并写入"""
+        report = self.report()
+        if extra:
+            report.update(extra)
+        os.makedirs(os.path.dirname(os.path.abspath(report_file)), exist_ok=True)
+        tmp_file = report_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, report_file)
+
+    def close(self):
+        if self.trace_memory and tracemalloc.is_tracing():
+            self._sample_memory()
+            tracemalloc.stop()
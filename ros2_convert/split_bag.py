@@ -0,0 +1,317 @@
+import os
+import shutil
+from collections import namedtuple
+from .batch_runner import find_db3_files
+from .db3_reader import open_reader
+
+# rosbag2 录制目录中的元数据文件，记录分卷顺序和各话题的消息数
+METADATA_FILE = "metadata.yaml"
+
+# 分卷录制的 bag：bag 目录、按录制顺序排列的分卷文件、输出目录、
+# metadata.yaml 中整个 bag 各话题的消息数
+SplitBag = namedtuple("SplitBag", ["bag_dir", "files", "output_dir", "topic_counts"])
+
+# normalized 布局的帧表/点表，合并时帧表中的行号、字节位置要加上前面分卷的点数/字节数
+FRAMES_SUFFIX = "_frames"
+POINTS_SUFFIX = "_points"
+
+
+def read_metadata(bag_dir):
+    """读取 bag 目录中的 metadata.yaml，返回 (分卷文件列表, {话题: 消息数})
+
+    没有 metadata.yaml 时返回 None。分卷文件按 relative_file_paths 的顺序（即录制顺序）；
+    FILE 模式压缩后分卷为 .db3.zstd，列出的文件不存在时也查找加上 .zstd 的文件。
+    """
+    metadata_file = os.path.join(bag_dir, METADATA_FILE)
+    if not os.path.isfile(metadata_file):
+        return None
+    # 需要 pip install pyyaml
+    import yaml
+
+    with open(metadata_file, "r") as f:
+        info = (yaml.safe_load(f) or {}).get("rosbag2_bagfile_information") or {}
+
+    files = []
+    for relative_path in info.get("relative_file_paths") or []:
+        path = os.path.join(bag_dir, relative_path)
+        if not os.path.isfile(path) and os.path.isfile(path + ".zstd"):
+            path += ".zstd"
+        files.append(os.path.normpath(path))
+
+    topic_counts = {}
+    for entry in info.get("topics_with_message_count") or []:
+        name = entry["topic_metadata"]["name"]
+        topic_counts[name] = topic_counts.get(name, 0) + entry.get("message_count", 0)
+    return files, topic_counts
+
+
+def find_bags(parent_dir, output_parent_dir):
+    """查找主目录下的 bag 文件，返回 (jobs, bags)
+
+    jobs 为单独处理的文件 [(db3_file, output_dir)]，与 find_db3_files 相同；
+    bags 为 metadata.yaml 中列出多个分卷的 bag（SplitBag），这些分卷不再出现在
+    jobs 中，而是作为一个整体处理，输出目录为 bag 目录对应的输出目录。
+    """
+    jobs = find_db3_files(parent_dir, output_parent_dir)
+    bags = []
+    split_files = set()
+    for bag_dir in sorted({os.path.dirname(db3_file) for db3_file, _ in jobs}):
+        metadata = read_metadata(bag_dir)
+        if metadata is None:
+            continue
+        files, topic_counts = metadata
+        missing = [path for path in files if not os.path.isfile(path)]
+        if missing:
+            print(f"Warning: splits {missing} listed in '{bag_dir}/{METADATA_FILE}' not found")
+            continue
+        if len(files) < 2:
+            continue
+        output_dir = os.path.join(output_parent_dir, os.path.relpath(bag_dir, parent_dir))
+        bags.append(SplitBag(bag_dir, files, output_dir, topic_counts))
+        split_files.update(files)
+    jobs = [job for job in jobs if os.path.normpath(job[0]) not in split_files]
+    return jobs, bags
+
+
+def plan_splits(
+    bag,
+    msg_types,
+    topics=None,
+    start_time=None,
+    end_time=None,
+    time_base="bag",
+    relative=False,
+    index_dir=None,
+    temp_dir=None,
+):
+    """为分卷 bag 的每个分卷计算起始帧号，返回 (window, splits)
+
+    window 为整个 bag 的 [start_ns, end_ns]：relative 为 True 时从所有分卷中最早的
+    时间戳算起，而不是各分卷自己的最早时间戳。splits 为 [(分卷文件, {话题: 起始帧号})]，
+    起始帧号为前面各分卷中该话题（时间窗口内）的消息数，各分卷可以并行处理，
+    合并后每个话题的帧号连续。窗口内没有所需消息的分卷不会出现在 splits 中。
+    metadata.yaml 只有整个 bag 的消息数，各分卷的消息数由读取器按话题统计。
+    temp_dir 为 .db3.zstd 分卷解压出的临时文件所在目录。
+    """
+    start_ns, end_ns = None, None
+    if start_time is not None or end_time is not None:
+        offset_ns = 0
+        if relative:
+            starts = []
+            for split_file in bag.files:
+                with open_reader(split_file, index_dir=index_dir, temp_dir=temp_dir) as reader:
+                    starts.append(reader.time_range(time_base)[0])
+            starts = [start for start in starts if start is not None]
+            offset_ns = min(starts) if starts else 0
+        start_ns = None if start_time is None else offset_ns + round(start_time * 1e9)
+        end_ns = None if end_time is None else offset_ns + round(end_time * 1e9)
+
+    splits = []
+    frame_offsets = {}
+    for split_file in bag.files:
+        with open_reader(split_file, index_dir=index_dir, temp_dir=temp_dir) as reader:
+            counts = reader.topic_message_counts(msg_types, topics, start_ns, end_ns, time_base)
+        if counts:
+            splits.append((split_file, dict(frame_offsets)))
+        for topic, count in counts.items():
+            frame_offsets[topic] = frame_offsets.get(topic, 0) + count
+
+    # 不限制时间窗口时，各分卷合计的消息数应与 metadata.yaml 一致
+    if start_ns is None and end_ns is None:
+        for topic, count in frame_offsets.items():
+            expected = bag.topic_counts.get(topic)
+            if expected is not None and expected != count:
+                print(
+                    f"Warning: topic '{topic}' has {count} messages in the splits of "
+                    f"'{bag.bag_dir}', {METADATA_FILE} says {expected}"
+                )
+    return [start_ns, end_ns], splits
+
+
+def previous_timestamps(
+    splits, msg_types, topics=None, window=None, time_base="bag", index_dir=None, temp_dir=None
+):
+    """与 plan_splits 返回的 splits 一一对应：前面各分卷中每个话题最后一条消息的录制时间戳
+
+    按录制时间抽帧时，分卷从前面分卷最后一帧所在的时间段之后继续，跨分卷边界的
+    时间段不会在两个分卷中各保留一帧。只查询时间索引/MessageIndex，不读取消息数据。
+    """
+    start_ns, end_ns = window or (None, None)
+    last = {}
+    result = []
+    for split_file, _ in splits:
+        result.append(dict(last))
+        with open_reader(split_file, index_dir=index_dir, temp_dir=temp_dir) as reader:
+            timestamps = reader.topic_last_timestamps(msg_types, topics, start_ns, end_ns, time_base)
+        for topic, timestamp_ns in timestamps.items():
+            last[topic] = max(last.get(topic, timestamp_ns), timestamp_ns)
+    return result
+
+
+def _relative_files(part_dir):
+    """分卷输出目录中的文件（相对路径），跳过完成记录、临时目录等以 . 开头的文件"""
+    files = []
+    for root, dirs, names in os.walk(part_dir):
+        dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+        relative_dir = os.path.relpath(root, part_dir)
+        for name in sorted(names):
+            if not name.startswith("."):
+                files.append(os.path.normpath(os.path.join(relative_dir, name)))
+    return files
+
+
+def _concat_text(paths, target, header=True):
+    """拼接 CSV/TXT 文件，header 为 True 时只保留第一个文件的表头"""
+    first_header = None
+    with open(target, "wb") as out:
+        for i, path in enumerate(paths):
+            with open(path, "rb") as f:
+                if header:
+                    line = f.readline()
+                    if i == 0:
+                        first_header = line
+                        out.write(line)
+                    elif line != first_header:
+                        raise ValueError(f"Columns of '{path}' differ from the first split")
+                shutil.copyfileobj(f, out, 1 << 24)
+
+
+def _iter_arrow_tables(path):
+    """逐个产出 Parquet 文件的 row group / Arrow IPC 文件的 record batch"""
+    import pyarrow as pa
+
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for i in range(parquet_file.num_row_groups):
+            yield parquet_file.read_row_group(i)
+        return
+
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            yield pa.Table.from_batches([reader.get_batch(i)])
+
+
+def _concat_arrow(paths, target, offset_column=None, offsets=None):
+    """按 row group / record batch 拼接 Parquet/Feather 文件，不整体读入内存
+
+    offset_column 不为 None 时，第 i 个文件中该列加上 offsets[i]。返回总行数列表（每个文件一项）。
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    writer = None
+    schema = None
+    rows = []
+    try:
+        for i, path in enumerate(paths):
+            rows.append(0)
+            for table in _iter_arrow_tables(path):
+                if offset_column is not None and offsets[i]:
+                    index = table.schema.get_field_index(offset_column)
+                    column = pc.add(table.column(offset_column), offsets[i])
+                    table = table.set_column(index, offset_column, column)
+                if writer is None:
+                    schema = table.schema
+                    if target.endswith(".parquet"):
+                        import pyarrow.parquet as pq
+
+                        writer = pq.ParquetWriter(target, schema)
+                    else:
+                        writer = pa.ipc.new_file(target, schema)
+                elif not table.schema.equals(schema):
+                    table = table.cast(schema)
+                writer.write_table(table)
+                rows[-1] += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def _merge_normalized_text(frame_paths, point_paths, frames_target, points_target):
+    """合并 normalized 布局的 CSV：帧表的 offset/byte_offset 加上前面分卷的点数/字节数"""
+    point_offset = 0
+    points_header = None
+    with open(points_target, "wb") as points_out, open(frames_target, "w") as frames_out:
+        for i, (frames_path, points_path) in enumerate(zip(frame_paths, point_paths)):
+            with open(points_path, "rb") as f:
+                header = f.readline()
+                if i == 0:
+                    points_header = header
+                    points_out.write(header)
+                elif header != points_header:
+                    raise ValueError(f"Columns of '{points_path}' differ from the first split")
+                # 该分卷的第一个点在合并后文件中的字节位置 - 在分卷文件中的字节位置
+                byte_shift = points_out.tell() - len(header)
+                shutil.copyfileobj(f, points_out, 1 << 24)
+
+            with open(frames_path, "r") as f:
+                columns = f.readline()
+                if i == 0:
+                    frames_out.write(columns)
+                columns = columns.rstrip("\n").split(",")
+                num_points = columns.index("num_points")
+                offset = columns.index("offset")
+                byte_offset = columns.index("byte_offset")
+                split_points = 0
+                for line in f:
+                    values = line.rstrip("\n").split(",")
+                    split_points += int(values[num_points])
+                    values[offset] = str(int(values[offset]) + point_offset)
+                    values[byte_offset] = str(int(values[byte_offset]) + byte_shift)
+                    frames_out.write(",".join(values) + "\n")
+            point_offset += split_points
+
+
+def merge_split_outputs(part_dirs, target_dir, headerless=()):
+    """把各分卷的输出目录（按分卷顺序）合并到 target_dir
+
+    只在一个分卷中出现的文件（如图像、各分卷的运行报告）直接移动；多个分卷中
+    同名的 CSV/TXT 按顺序拼接，只保留第一个文件的表头（headerless 中的文件名
+    没有表头，直接拼接）；Parquet/Feather 按 row group / record batch 拼接；
+    normalized 布局的帧表和点表一起合并，帧表中的点表位置换算为合并后的位置。
+    其它同名文件无法合并，抛出 ValueError。
+    """
+    files = {}
+    for part_dir in part_dirs:
+        for relative_path in _relative_files(part_dir):
+            files.setdefault(relative_path, []).append(part_dir)
+
+    for relative_path, dirs in files.items():
+        base, extension = os.path.splitext(relative_path)
+        if base.endswith(POINTS_SUFFIX) and (
+            base[: -len(POINTS_SUFFIX)] + FRAMES_SUFFIX + extension in files
+        ):
+            # 与帧表一起合并
+            continue
+
+        target = os.path.join(target_dir, relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        paths = [os.path.join(part_dir, relative_path) for part_dir in dirs]
+
+        points_path = base[: -len(FRAMES_SUFFIX)] + POINTS_SUFFIX + extension
+        if base.endswith(FRAMES_SUFFIX) and points_path in files:
+            if files[points_path] != dirs:
+                raise ValueError(f"'{relative_path}' and '{points_path}' are in different splits")
+            point_paths = [os.path.join(part_dir, points_path) for part_dir in dirs]
+            points_target = os.path.join(target_dir, points_path)
+            if len(dirs) == 1:
+                os.replace(point_paths[0], points_target)
+                os.replace(paths[0], target)
+            elif extension == ".csv":
+                _merge_normalized_text(paths, point_paths, target, points_target)
+            else:
+                rows = _concat_arrow(point_paths, points_target)
+                offsets = [sum(rows[:i]) for i in range(len(rows))]
+                _concat_arrow(paths, target, "offset", offsets)
+        elif len(dirs) == 1:
+            os.replace(paths[0], target)
+        elif extension in (".csv", ".txt"):
+            _concat_text(paths, target, os.path.basename(relative_path) not in headerless)
+        elif extension in (".parquet", ".feather"):
+            _concat_arrow(paths, target)
+        else:
+            raise ValueError(f"Cannot merge '{relative_path}' written by several splits")
@@ -18,8 +18,6 @@ output_parent_dir = "/media/sax/新加卷/processed_images"
 #     # 添加其他你需要处理的话题
 # ]
 
-os.makedirs(output_parent_dir, exist_ok=True)
-
 
 def process_db3_file(db3_file, output_dir):
     """处理单个 DB3 文件，提取并保存图像数据"""
@@ -213,6 +211,7 @@ def process_db3_file(db3_file, output_dir):
 
 def process_all_db3_files(parent_dir, output_parent_dir):
     """处理所有 DB3 文件"""
+    os.makedirs(output_parent_dir, exist_ok=True)
     for root, dirs, files in os.walk(parent_dir):
         for file in files:
             if file.endswith(".db3"):
@@ -228,5 +227,6 @@ def process_all_db3_files(parent_dir, output_parent_dir):
                 process_db3_file(db3_file_path, output_dir)
 
 
-# 示例：调用函数来处理所有 db3 文件
-process_all_db3_files(parent_dir, output_parent_dir)
+if __name__ == "__main__":
+    # 示例：调用函数来处理所有 db3 文件
+    process_all_db3_files(parent_dir, output_parent_dir)